@@ -3,6 +3,7 @@ RustPlus, An API wrapper for interfacing with the Rust+ App API
 """
 
 from .rust_api import RustSocket
+from .pool import RustSocketPool, ShardedRustSocketPool
 from .identification import ServerDetails
 from .annotations import (
     Command,
@@ -15,6 +16,24 @@ from .annotations import (
 from .remote.fcm import FCMListener
 from .remote.camera import MovementControls, CameraMovementOptions
 from .remote.nexus import NexusInterface, Realm
+from .remote.websocket import DispatchOptions, OverflowPolicy, ReconnectOptions
+from .remote.ratelimiter import (
+    RateLimiter,
+    RequestPriority,
+    SharedBucketStore,
+    AdaptiveOptions,
+)
+from .remote.recording import FrameRecorder, FrameReplayer
+from .remote.cache import ResponseCache, MapCache
+from .metrics import Metrics
+from .rendering import (
+    RenderExecutor,
+    GridCache,
+    AvatarService,
+    MapRenderer,
+    MapTiles,
+    prewarm_icons,
+)
 from .commands import CommandOptions, ChatCommand
 from .events import ChatEventPayload, TeamEventPayload, EntityEventPayload
 from .utils import convert_event_type_to_name, Emoji, convert_coordinates
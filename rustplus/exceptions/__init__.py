@@ -9,4 +9,6 @@ from .exceptions import (
     RequestError,
     SmartDeviceRegistrationError,
     ServerSwitchDisallowedError,
+    WorkerError,
+    RequestShedError,
 )
@@ -62,3 +62,15 @@ class ServerSwitchDisallowedError(Error):
     """Raised when you are using the test server and attempt to swap server"""
 
     pass
+
+
+class WorkerError(Error):
+    """Raised when a request fails inside a worker process"""
+
+    pass
+
+
+class RequestShedError(RateLimitError):
+    """Raised when a background request is dropped because the rate limit is nearly spent"""
+
+    pass
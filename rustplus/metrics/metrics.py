@@ -0,0 +1,183 @@
+import bisect
+import logging
+from typing import Callable, Dict, List, Sequence, Tuple, Union
+
+
+class Histogram:
+    # Upper bounds in seconds, from a fast local response up to the default timeout
+    DEFAULT_BUCKETS = (
+        0.0001,
+        0.0005,
+        0.001,
+        0.0025,
+        0.005,
+        0.01,
+        0.025,
+        0.05,
+        0.1,
+        0.25,
+        0.5,
+        1,
+        2.5,
+        5,
+        10,
+    )
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS) -> None:
+        self.buckets: Tuple[float, ...] = tuple(sorted(buckets))
+        # The last count is for values above every bucket
+        self.counts: List[int] = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def get_quantile(self, quantile: float) -> float:
+        """
+        Estimates a quantile as the upper bound of the bucket it falls in
+
+        :param quantile: Between 0 and 1, e.g. 0.99 for the 99th percentile
+        :return float: The estimate, or infinity if it is beyond the last bucket
+        """
+        target = quantile * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= target and seen > 0:
+                return bound
+        return float("inf")
+
+    @property
+    def mean(self) -> float:
+        return self.sum / self.count if self.count else 0.0
+
+
+class Metrics:
+    """
+    Collects latency histograms and counters, labelled by request or broadcast type.
+    Pass one to a RustSocket to have it record:
+
+    - the wire round trip time of each request
+    - how long each request waited on the rate limiter
+    - how long each received frame took to decode
+    - how long handle_message spent on each broadcast
+    - timed out and failed requests
+    """
+
+    REQUEST_RTT = "rustplus_request_rtt_seconds"
+    RATELIMIT_WAIT = "rustplus_ratelimit_wait_seconds"
+    DECODE_TIME = "rustplus_decode_seconds"
+    HANDLER_TIME = "rustplus_handler_seconds"
+    REQUEST_TIMEOUTS = "rustplus_request_timeouts_total"
+    REQUEST_ERRORS = "rustplus_request_errors_total"
+
+    DESCRIPTIONS: Dict[str, str] = {
+        REQUEST_RTT: "Time from sending a request to receiving its response",
+        RATELIMIT_WAIT: "Time a request waited for rate limiter tokens",
+        DECODE_TIME: "Time taken to decode a received message",
+        HANDLER_TIME: "Time spent handling a received message",
+        REQUEST_TIMEOUTS: "Requests that received no response in time",
+        REQUEST_ERRORS: "Requests that failed to send or received an error",
+    }
+
+    def __init__(
+        self, enabled: bool = True, buckets: Sequence[float] = Histogram.DEFAULT_BUCKETS
+    ) -> None:
+        """
+        :param enabled: Whether anything is recorded, this can be changed at any time
+        :param buckets: The histogram bucket upper bounds, in seconds
+        """
+        self.enabled = enabled
+        self.buckets = buckets
+        self.logger: logging.Logger = logging.getLogger("rustplus.py")
+
+        self.histograms: Dict[Tuple[str, str], Histogram] = {}
+        self.counters: Dict[Tuple[str, str], int] = {}
+        self._callbacks: List[Callable[[str, str, float], None]] = []
+
+    def observe(self, name: str, label: str, value: float) -> None:
+        if not self.enabled:
+            return
+
+        key = (name, label)
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = Histogram(self.buckets)
+
+        histogram.observe(value)
+        self._notify(name, label, value)
+
+    def increment(self, name: str, label: str, amount: int = 1) -> None:
+        if not self.enabled:
+            return
+
+        key = (name, label)
+        self.counters[key] = self.counters.get(key, 0) + amount
+        self._notify(name, label, amount)
+
+    def add_callback(self, callback: Callable[[str, str, float], None]) -> None:
+        """
+        Registers a function that is called with (metric name, type, value) for every
+        observation and counter increment, e.g. to forward them to a StatsD client
+        """
+        self._callbacks.append(callback)
+
+    def remove_callback(self, callback: Callable[[str, str, float], None]) -> None:
+        if callback in self._callbacks:
+            self._callbacks.remove(callback)
+
+    def get_histogram(self, name: str, label: str) -> Union[Histogram, None]:
+        return self.histograms.get((name, label))
+
+    def get_counter(self, name: str, label: str) -> int:
+        return self.counters.get((name, label), 0)
+
+    def reset(self) -> None:
+        self.histograms.clear()
+        self.counters.clear()
+
+    def to_prometheus(self) -> str:
+        """
+        :return str: Every metric in the Prometheus text exposition format
+        """
+        lines = []
+
+        for name in sorted({name for name, _ in self.histograms}):
+            lines.append(f"# HELP {name} {self.DESCRIPTIONS.get(name, name)}")
+            lines.append(f"# TYPE {name} histogram")
+
+            for (metric, label), histogram in sorted(self.histograms.items()):
+                if metric != name:
+                    continue
+
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    lines.append(
+                        f'{name}_bucket{{type="{label}",le="{bound}"}} {cumulative}'
+                    )
+                lines.append(
+                    f'{name}_bucket{{type="{label}",le="+Inf"}} {histogram.count}'
+                )
+                lines.append(f'{name}_sum{{type="{label}"}} {histogram.sum}')
+                lines.append(f'{name}_count{{type="{label}"}} {histogram.count}')
+
+        for name in sorted({name for name, _ in self.counters}):
+            lines.append(f"# HELP {name} {self.DESCRIPTIONS.get(name, name)}")
+            lines.append(f"# TYPE {name} counter")
+
+            for (metric, label), value in sorted(self.counters.items()):
+                if metric == name:
+                    lines.append(f'{name}{{type="{label}"}} {value}')
+
+        return "\n".join(lines) + "\n" if lines else ""
+
+    def _notify(self, name: str, label: str, value: float) -> None:
+        for callback in self._callbacks:
+            try:
+                callback(name, label, value)
+            except Exception as e:
+                self.logger.exception("An Error occurred in a metrics callback: %s", e)
@@ -0,0 +1,2 @@
+from .socket_pool import RustSocketPool
+from .sharded_pool import ShardedRustSocketPool, RemoteRustSocket
@@ -0,0 +1,142 @@
+import asyncio
+import base64
+import logging
+import threading
+from multiprocessing.connection import Connection
+from typing import Any, Dict, List, Set, Union
+
+import betterproto
+
+from .socket_pool import RustSocketPool
+from ..events import ProtobufEventPayload
+from ..identification import ServerDetails, RegisteredListener
+from ..remote.websocket import LazyAppMessage, MessageKind
+from ..structs.serialization import Serializable
+
+# Broadcasts that are handled inside the worker rather than sent to the parent
+LOCAL_KINDS = (MessageKind.RESPONSE, MessageKind.ERROR, MessageKind.CAMERA_RAYS)
+
+
+def run_shard(
+    connection: Connection, servers: List[ServerDetails], socket_options: Dict
+) -> None:
+    """
+    Entry point of a worker process started by ShardedRustSocketPool
+    """
+    asyncio.run(ShardWorker(connection, servers, socket_options).run())
+
+
+def to_picklable(value: Any) -> Any:
+    """
+    Replaces the betterproto enums in a result, such as a marker's type, with plain
+    ints, as they pickle but cannot be unpickled. Structs are copied rather than
+    changed, as the socket may have cached them.
+    """
+    if isinstance(value, betterproto.Enum):
+        return int(value)
+
+    if isinstance(value, list):
+        return [to_picklable(element) for element in value]
+
+    if isinstance(value, tuple):
+        return tuple(to_picklable(element) for element in value)
+
+    if isinstance(value, dict):
+        return {key: to_picklable(element) for key, element in value.items()}
+
+    if isinstance(value, Serializable):
+        copy = object.__new__(type(value))
+        copy.__dict__.update(
+            (key, to_picklable(element)) for key, element in value.__dict__.items()
+        )
+        return copy
+
+    return value
+
+
+class ShardWorker:
+    """
+    Runs the sockets for a subset of the pool's servers inside a worker process. It
+    answers requests from the parent and forwards broadcasts back to it as raw frames,
+    so that the parent's event and command handlers see them.
+    """
+
+    def __init__(
+        self, connection: Connection, servers: List[ServerDetails], socket_options: Dict
+    ) -> None:
+        self.connection = connection
+        self.logger: logging.Logger = logging.getLogger("rustplus.py")
+        self.use_test_server: bool = socket_options.get("use_test_server", False)
+
+        self.pool = RustSocketPool()
+        self.sockets = [
+            self.pool.add_socket(server_details, **socket_options)
+            for server_details in servers
+        ]
+
+        self.loop: Union[asyncio.AbstractEventLoop, None] = None
+        self.stopping: Union[asyncio.Event, None] = None
+        self.tasks: Set[asyncio.Task] = set()
+
+    async def run(self) -> None:
+        self.loop = asyncio.get_running_loop()
+        self.stopping = asyncio.Event()
+
+        for index, socket in enumerate(self.sockets):
+            ProtobufEventPayload.HANDLER_LIST.register(
+                RegisteredListener("shard", self._create_forwarder(index)),
+                socket.server_details,
+            )
+
+        connected = await self.pool.connect_all()
+        self.send(
+            ("connected", [connected[socket.server_details] for socket in self.sockets])
+        )
+
+        threading.Thread(
+            target=self._read, name="[RustPlus.py] Shard Reader", daemon=True
+        ).start()
+
+        await self.stopping.wait()
+        await self.pool.disconnect_all()
+        self.send(("stopped",))
+
+    def send(self, message: tuple) -> None:
+        self.connection.send(message)
+
+    def _create_forwarder(self, index: int):
+        async def forward(data: Union[str, bytes]) -> None:
+            raw = base64.b64decode(data) if self.use_test_server else data
+            if LazyAppMessage(raw).kind not in LOCAL_KINDS:
+                self.send(("frame", index, data))
+
+        return forward
+
+    def _read(self) -> None:
+        while True:
+            try:
+                message = self.connection.recv()
+            except (EOFError, OSError):
+                message = ("stop",)
+
+            self.loop.call_soon_threadsafe(self._handle, message)
+
+            if message[0] == "stop":
+                return
+
+    def _handle(self, message: tuple) -> None:
+        if message[0] == "stop":
+            self.stopping.set()
+        elif message[0] == "call":
+            task = asyncio.create_task(self._call(*message[1:]))
+            self.tasks.add(task)
+            task.add_done_callback(self.tasks.discard)
+
+    async def _call(
+        self, call_id: int, index: int, method: str, args: tuple, kwargs: Dict
+    ) -> None:
+        try:
+            result: Any = await getattr(self.sockets[index], method)(*args, **kwargs)
+            self.send(("result", call_id, to_picklable(result)))
+        except Exception as e:
+            self.send(("error", call_id, f"{type(e).__name__}: {e}"))
@@ -0,0 +1,343 @@
+import asyncio
+import itertools
+import logging
+import multiprocessing
+import os
+import threading
+from typing import Any, Callable, Coroutine, Dict, List, Optional, Union
+
+from .shard_worker import run_shard
+from ..commands import CommandOptions
+from ..exceptions import WorkerError, ClientNotConnectedError
+from ..identification import ServerDetails
+from ..remote.websocket import RustWebsocket, Dispatcher, DispatchOptions
+
+# The RustSocket methods that can be called across the process boundary. Camera
+# managers hold live state in the worker, so they are not available.
+REMOTE_METHODS = frozenset(
+    (
+        "get_time",
+        "get_info",
+        "get_team_chat",
+        "get_team_info",
+        "get_markers",
+        "get_map",
+        "get_map_info",
+        "get_entity_info",
+        "get_contents",
+        "check_subscription_to_entity",
+        "get_clan_info",
+        "get_clan_chat",
+        "get_nexus_auth",
+        "send_team_message",
+        "send_clan_message",
+        "set_clan_motd",
+        "set_entity_value",
+        "set_subscription_to_entity",
+        "promote_to_team_leader",
+    )
+)
+
+
+class _Shard:
+    def __init__(self, index: int, servers: List[ServerDetails]) -> None:
+        self.index = index
+        self.servers = servers
+        self.process: Union[multiprocessing.Process, None] = None
+        self.connection = None
+        self.pending: Dict[int, asyncio.Future] = {}
+        self.connected: Union[asyncio.Future, None] = None
+        self.stopped: Union[asyncio.Future, None] = None
+
+
+class RemoteRustSocket:
+    """
+    Stands in for a RustSocket that lives in a worker process. Requests are forwarded
+    to the worker, and broadcasts it receives are handled here in the parent, so
+    ChatEvent, EntityEvent, TeamEvent and Command handlers work as normal.
+    """
+
+    def __init__(
+        self,
+        pool: "ShardedRustSocketPool",
+        shard: _Shard,
+        index: int,
+        server_details: ServerDetails,
+        ws: RustWebsocket,
+    ) -> None:
+        self._pool = pool
+        self._shard = shard
+        self._index = index
+        self.server_details = server_details
+        self.ws = ws
+
+    def __getattr__(self, name: str) -> Callable[..., Coroutine]:
+        if name not in REMOTE_METHODS:
+            raise AttributeError(f"{name} is not available on a RemoteRustSocket")
+
+        async def call(*args: Any, **kwargs: Any) -> Any:
+            return await self._pool._call(self._shard, self._index, name, args, kwargs)
+
+        call.__name__ = name
+        return call
+
+
+class ShardedRustSocketPool:
+    """
+    Spreads server connections across worker processes, each running its own event
+    loop and set of RustSockets, so that decoding and rendering can use more than one
+    core. Results and broadcasts are sent back to this process over a pipe per worker.
+    """
+
+    # Seconds stop waits for each worker to disconnect its sockets and exit
+    STOP_TIMEOUT = 10
+
+    def __init__(
+        self,
+        workers: Union[int, None] = None,
+        dispatch_options: Union[DispatchOptions, None] = None,
+        call_timeout: Optional[float] = None,
+        **socket_options: Any,
+    ) -> None:
+        """
+        :param workers: The number of worker processes, defaults to the number of CPUs
+        :param dispatch_options: Options for dispatching broadcasts to handlers in this process
+        :param call_timeout: Seconds to wait for a worker to answer a call, defaults to RustWebsocket.RESPONSE_TIMEOUT, or the call's own timeout if longer
+        :param socket_options: RustSocket constructor arguments used in every worker, they must be picklable
+        """
+        self.workers = workers if workers is not None else (os.cpu_count() or 1)
+        self.call_timeout = call_timeout
+        self.socket_options = socket_options
+        self.socket_options.setdefault("lazy_decoding", True)
+        self.dispatcher: Dispatcher = Dispatcher(dispatch_options, "Shard Dispatch")
+        self.logger: logging.Logger = logging.getLogger("rustplus.py")
+
+        self._servers: Dict[ServerDetails, Union[CommandOptions, None]] = {}
+        self._sockets: Dict[ServerDetails, RemoteRustSocket] = {}
+        self._shards: List[_Shard] = []
+        self._call_ids = itertools.count()
+        self._loop: Union[asyncio.AbstractEventLoop, None] = None
+        self._frames: Union[asyncio.Queue, None] = None
+        self._frame_task: Union[asyncio.Task, None] = None
+
+    def add_socket(
+        self,
+        server_details: ServerDetails,
+        command_options: Union[CommandOptions, None] = None,
+    ) -> None:
+        """
+        Adds a server to the pool. This must be done before the pool is started.
+
+        :param server_details: The server to connect to
+        :param command_options: The command options for the server, commands run in this process
+        """
+        if self._shards:
+            raise RuntimeError("Servers cannot be added once the pool has started")
+
+        self._servers[server_details] = command_options
+
+    def get_socket(self, server_details: ServerDetails) -> RemoteRustSocket:
+        if server_details not in self._sockets:
+            raise ClientNotConnectedError(
+                f"{server_details.get_server_string()} is not in a started pool"
+            )
+        return self._sockets[server_details]
+
+    async def start(self) -> Dict[ServerDetails, bool]:
+        """
+        Starts the worker processes and connects every server
+
+        :return Dict[ServerDetails, bool]: Whether each server connected
+        """
+        self._loop = asyncio.get_running_loop()
+        self.dispatcher.start()
+        self._frames = asyncio.Queue()
+        self._frame_task = asyncio.create_task(
+            self._process_frames(), name="[RustPlus.py] Shard Frame Task"
+        )
+
+        servers = list(self._servers)
+        worker_count = max(1, min(self.workers, len(servers)))
+        # spawn so that workers do not inherit this process's event loop and threads
+        context = multiprocessing.get_context("spawn")
+
+        for index in range(worker_count):
+            shard = _Shard(index, servers[index::worker_count])
+            parent_connection, child_connection = context.Pipe()
+
+            shard.connection = parent_connection
+            shard.connected = self._loop.create_future()
+            shard.stopped = self._loop.create_future()
+            shard.process = context.Process(
+                target=run_shard,
+                args=(child_connection, shard.servers, self.socket_options),
+                name=f"[RustPlus.py] Shard {index}",
+                daemon=True,
+            )
+            shard.process.start()
+            child_connection.close()
+
+            for server_index, server_details in enumerate(shard.servers):
+                self._sockets[server_details] = RemoteRustSocket(
+                    self,
+                    shard,
+                    server_index,
+                    server_details,
+                    RustWebsocket(
+                        server_details,
+                        self._servers[server_details],
+                        False,
+                        self.socket_options.get("use_test_server", False),
+                        self.socket_options.get("debug", False),
+                        lazy_decoding=True,
+                        dispatcher=self.dispatcher,
+                    ),
+                )
+
+            threading.Thread(
+                target=self._read,
+                args=(shard,),
+                name=f"[RustPlus.py] Shard {index} Reader",
+                daemon=True,
+            ).start()
+            self._shards.append(shard)
+
+        results = {}
+        for shard in self._shards:
+            connected = await shard.connected
+            results.update(zip(shard.servers, connected))
+
+        return results
+
+    async def stop(self) -> None:
+        for shard in self._shards:
+            try:
+                shard.connection.send(("stop",))
+            except OSError:
+                pass  # The worker has already gone
+
+        for shard in self._shards:
+            try:
+                await asyncio.wait_for(asyncio.shield(shard.stopped), self.STOP_TIMEOUT)
+            except asyncio.TimeoutError:
+                self.logger.warning(
+                    "Shard %d did not stop in time, terminating it", shard.index
+                )
+                shard.process.terminate()
+
+            await self._loop.run_in_executor(
+                None, shard.process.join, self.STOP_TIMEOUT
+            )
+            shard.connection.close()
+
+        self._shards = []
+        self._sockets = {}
+
+        # None if the pool was never started, or has already been stopped
+        if self._frame_task is not None:
+            self._frame_task.cancel()
+            try:
+                await self._frame_task
+            except asyncio.CancelledError:
+                pass
+            self._frame_task = None
+
+        await self.dispatcher.stop()
+
+    def get_health(self) -> Dict[ServerDetails, bool]:
+        """
+        :return Dict[ServerDetails, bool]: Whether the worker process for each server is alive
+        """
+        return {
+            server_details: socket._shard.process.is_alive()
+            for server_details, socket in self._sockets.items()
+        }
+
+    async def _call(
+        self, shard: _Shard, index: int, method: str, args: tuple, kwargs: Dict
+    ) -> Any:
+        if shard.stopped.done():
+            raise WorkerError(f"Shard {shard.index} has stopped")
+
+        call_id = next(self._call_ids)
+        future = self._loop.create_future()
+        shard.pending[call_id] = future
+
+        timeout = (
+            self.call_timeout
+            if self.call_timeout is not None
+            else RustWebsocket.RESPONSE_TIMEOUT
+        )
+        if kwargs.get("timeout") is not None:
+            timeout = max(timeout, kwargs["timeout"])
+
+        try:
+            shard.connection.send(("call", call_id, index, method, args, kwargs))
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            raise WorkerError(
+                f"Shard {shard.index} did not answer {method} within {timeout} seconds"
+            )
+        finally:
+            shard.pending.pop(call_id, None)
+
+    async def _process_frames(self) -> None:
+        while True:
+            server_details, data = await self._frames.get()
+
+            socket = self._sockets.get(server_details)
+            if socket is not None:
+                # Decodes the frame and queues it on the dispatcher for the handlers
+                await socket.ws.process_frame(data)
+
+    def _read(self, shard: _Shard) -> None:
+        # Blocking reads happen on this thread, everything else on the event loop
+        while True:
+            try:
+                message = shard.connection.recv()
+            except (EOFError, OSError):
+                message = ("stopped",)
+            except Exception as e:
+                # Most likely a result that could not be unpickled. Which call it
+                # answered is lost, so the shard is given up on rather than leaving
+                # its calls to wait forever
+                self.logger.exception(
+                    "Could not read from shard %d: %s", shard.index, e
+                )
+                message = ("stopped",)
+
+            self._loop.call_soon_threadsafe(self._handle, shard, message)
+
+            if message[0] == "stopped":
+                return
+
+    def _handle(self, shard: _Shard, message: tuple) -> None:
+        kind = message[0]
+
+        if kind == "frame":
+            self._frames.put_nowait((shard.servers[message[1]], message[2]))
+
+        elif kind in ("result", "error"):
+            future = shard.pending.get(message[1])
+            if future is None or future.done():
+                return
+
+            if kind == "result":
+                future.set_result(message[2])
+            else:
+                future.set_exception(WorkerError(message[2]))
+
+        elif kind == "connected":
+            if not shard.connected.done():
+                shard.connected.set_result(message[1])
+
+        elif kind == "stopped":
+            if not shard.connected.done():
+                shard.connected.set_result([False] * len(shard.servers))
+
+            for future in shard.pending.values():
+                if not future.done():
+                    future.set_exception(WorkerError("Worker process stopped"))
+
+            if not shard.stopped.done():
+                shard.stopped.set_result(None)
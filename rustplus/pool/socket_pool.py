@@ -0,0 +1,155 @@
+import asyncio
+import logging
+from typing import Any, Dict, Iterator, List, Union
+
+from ..identification import ServerDetails
+from ..remote.ratelimiter import RateLimiter
+from ..remote.websocket import Dispatcher, DispatchOptions
+from ..rust_api import RustSocket
+
+
+class RustSocketPool:
+    """
+    Owns the RustSockets for many servers on a single event loop. Every socket in the
+    pool shares one rate limiter and one dispatcher, so adding a server only costs its
+    websocket connection and polling task.
+    """
+
+    def __init__(
+        self,
+        ratelimiter: Union[RateLimiter, None] = None,
+        dispatch_options: Union[DispatchOptions, None] = None,
+        connect_stagger: float = 0.05,
+        max_concurrent_connects: int = 16,
+    ) -> None:
+        """
+        :param ratelimiter: The rate limiter shared by every socket, a new one by default
+        :param dispatch_options: Options for the dispatcher shared by every socket
+        :param connect_stagger: Seconds between starting each connection in connect_all
+        :param max_concurrent_connects: How many connections may be opening at once
+        """
+        self.ratelimiter: RateLimiter = (
+            ratelimiter if ratelimiter is not None else RateLimiter()
+        )
+        self.dispatcher: Dispatcher = Dispatcher(dispatch_options, "Pool Dispatch")
+        self.connect_stagger = connect_stagger
+        self.max_concurrent_connects = max_concurrent_connects
+        self.logger: logging.Logger = logging.getLogger("rustplus.py")
+
+        self._sockets: Dict[ServerDetails, RustSocket] = {}
+
+    def add_socket(self, server_details: ServerDetails, **kwargs: Any) -> RustSocket:
+        """
+        Creates a RustSocket for the server that uses the pool's rate limiter and dispatcher.
+
+        :param server_details: The server to connect to
+        :param kwargs: Any other RustSocket constructor arguments
+        :return RustSocket: The socket, which is not yet connected
+        """
+        if server_details in self._sockets:
+            return self._sockets[server_details]
+
+        socket = RustSocket(
+            server_details,
+            ratelimiter=self.ratelimiter,
+            dispatcher=self.dispatcher,
+            **kwargs,
+        )
+        self._sockets[server_details] = socket
+        return socket
+
+    async def remove_socket(self, server_details: ServerDetails) -> None:
+        socket = self._sockets.pop(server_details, None)
+        if socket is None:
+            return
+
+        await socket.disconnect()
+        await self.ratelimiter.remove(server_details)
+
+    def get_socket(self, server_details: ServerDetails) -> Union[RustSocket, None]:
+        return self._sockets.get(server_details)
+
+    async def connect_all(self) -> Dict[ServerDetails, bool]:
+        """
+        Connects every socket in the pool, staggering the connection attempts so that a
+        large pool does not open hundreds of connections in the same instant
+
+        :return Dict[ServerDetails, bool]: Whether each socket connected
+        """
+        self.dispatcher.start()
+        semaphore = asyncio.Semaphore(self.max_concurrent_connects)
+
+        async def connect(delay: float, socket: RustSocket) -> bool:
+            await asyncio.sleep(delay)
+            async with semaphore:
+                try:
+                    return await socket.connect()
+                except Exception as e:
+                    self.logger.warning(
+                        "Failed to connect to %s: %s",
+                        socket.server_details.get_server_string(),
+                        e,
+                    )
+                    return False
+
+        sockets = list(self._sockets.values())
+        results = await asyncio.gather(
+            *(
+                connect(index * self.connect_stagger, socket)
+                for index, socket in enumerate(sockets)
+            )
+        )
+
+        return {
+            socket.server_details: result for socket, result in zip(sockets, results)
+        }
+
+    async def disconnect_all(self) -> None:
+        await asyncio.gather(
+            *(socket.disconnect() for socket in self._sockets.values())
+        )
+        await self.dispatcher.stop()
+
+    def get_health(self) -> Dict[ServerDetails, bool]:
+        """
+        :return Dict[ServerDetails, bool]: Whether each socket currently has a live connection
+        """
+        return {
+            server_details: socket.ws.open and socket.ws.connection is not None
+            for server_details, socket in self._sockets.items()
+        }
+
+    def get_metrics(self) -> Dict[str, int]:
+        """
+        :return Dict[str, int]: Totals across every socket in the pool, plus the shared dispatcher's metrics
+        """
+        health = self.get_health()
+        sockets = self._sockets.values()
+
+        metrics = {
+            "sockets": len(self._sockets),
+            "connected_sockets": sum(health.values()),
+            "pending_responses": sum(len(socket.ws.responses) for socket in sockets),
+            "late_responses": sum(socket.ws.late_responses for socket in sockets),
+            "timed_out_requests": sum(
+                socket.ws.timed_out_requests for socket in sockets
+            ),
+        }
+        metrics.update(self.dispatcher.get_metrics())
+        return metrics
+
+    @property
+    def sockets(self) -> List[RustSocket]:
+        return list(self._sockets.values())
+
+    def __getitem__(self, server_details: ServerDetails) -> RustSocket:
+        return self._sockets[server_details]
+
+    def __contains__(self, server_details: ServerDetails) -> bool:
+        return server_details in self._sockets
+
+    def __iter__(self) -> Iterator[RustSocket]:
+        return iter(list(self._sockets.values()))
+
+    def __len__(self) -> int:
+        return len(self._sockets)
@@ -0,0 +1,2 @@
+from .response_cache import ResponseCache
+from .map_cache import MapCache
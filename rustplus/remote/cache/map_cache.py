@@ -0,0 +1,178 @@
+import hashlib
+import logging
+import mmap
+import os
+import struct
+from pathlib import Path
+from typing import Union
+
+from PIL import Image
+
+from ..rustplus_proto import AppMap
+from ...structs import RustInfo
+from ...utils import atomic_write
+
+
+class MapCache:
+    """
+    Keeps server maps on disk between runs, as a map only changes when the server
+    wipes. Both the AppMap sent by the server and the base image rendered from it are
+    kept, under a key made from the server, its wipe time, map name and size. Files
+    are read through mmap and written atomically, so several processes can share a
+    directory. Once the directory grows past its limit, the least recently used maps
+    are removed.
+
+    socket = RustSocket(server_details, map_cache=MapCache())
+    """
+
+    MAP_SUFFIX = ".map"
+    IMAGE_SUFFIX = ".base"
+    # width, height of the raw RGB pixels that follow
+    IMAGE_HEADER = struct.Struct("<II")
+
+    def __init__(
+        self,
+        directory: Union[str, Path, None] = None,
+        max_bytes: int = 512 * 1024 * 1024,
+    ) -> None:
+        """
+        :param directory: Where the maps are kept, rustplus-maps in the user's cache directory by default
+        :param max_bytes: How large the directory may grow before the least recently used maps are removed
+        """
+        if max_bytes <= 0:
+            raise ValueError("The cache size must be positive")
+
+        if directory is None:
+            directory = (
+                Path(os.environ.get("XDG_CACHE_HOME", Path.home() / ".cache"))
+                / "rustplus-maps"
+            )
+
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.logger: logging.Logger = logging.getLogger("rustplus.py")
+
+    @staticmethod
+    def get_key(server_string: str, info: RustInfo) -> str:
+        """
+        :return str: The key of the map the server is currently running
+        """
+        ident = f"{server_string}|{info.wipe_time}|{info.map}|{info.size}"
+        return hashlib.sha1(ident.encode("utf-8")).hexdigest()
+
+    def get_map(self, key: str) -> Union[AppMap, None]:
+        data = self._read(key + self.MAP_SUFFIX)
+        if data is None:
+            return None
+
+        try:
+            with data:
+                return AppMap().parse(data)
+        except Exception as e:
+            self.logger.warning("Discarding unreadable cached map %s: %s", key, e)
+            self._remove(key + self.MAP_SUFFIX)
+            return None
+
+    def set_map(self, key: str, app_map: AppMap) -> None:
+        self._write(key + self.MAP_SUFFIX, bytes(app_map))
+
+    def get_base_image(
+        self, key: str, size: Union[int, None] = None
+    ) -> Union[Image.Image, None]:
+        """
+        :param size: The size the map was rendered at, if not full size
+        :return Image: The cropped and resized map, in RGB
+        """
+        name = self._get_image_name(key, size)
+        data = self._read(name)
+        if data is None:
+            return None
+
+        try:
+            with data:
+                if len(data) < self.IMAGE_HEADER.size:
+                    raise ValueError("the header is cut short")
+
+                width, height = self.IMAGE_HEADER.unpack_from(data, 0)
+                if len(data) != self.IMAGE_HEADER.size + width * height * 3:
+                    raise ValueError(f"the size does not match {width}x{height}")
+
+                return Image.frombytes(
+                    "RGB", (width, height), data[self.IMAGE_HEADER.size :]
+                )
+        except (struct.error, ValueError) as e:
+            self.logger.warning("Discarding unreadable cached image %s: %s", name, e)
+            self._remove(name)
+            return None
+
+    def set_base_image(
+        self, key: str, image: Image.Image, size: Union[int, None] = None
+    ) -> None:
+        image = image.convert("RGB")
+        self._write(
+            self._get_image_name(key, size),
+            self.IMAGE_HEADER.pack(*image.size) + image.tobytes(),
+        )
+
+    def clear(self) -> None:
+        for path in self._entries():
+            self._remove(path.name)
+
+    def _get_image_name(self, key: str, size: Union[int, None]) -> str:
+        return (key if size is None else f"{key}-{size}") + self.IMAGE_SUFFIX
+
+    def _entries(self):
+        return [
+            path
+            for path in self.directory.iterdir()
+            if path.suffix in (self.MAP_SUFFIX, self.IMAGE_SUFFIX)
+        ]
+
+    def _read(self, name: str) -> Union[mmap.mmap, None]:
+        path = self.directory / name
+        try:
+            with open(path, "rb") as file:
+                data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            # The modification time orders the files for eviction
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        except ValueError:  # An empty file, which nothing complete is written as
+            self._remove(name)
+            return None
+        return data
+
+    def _write(self, name: str, data: bytes) -> None:
+        if len(data) > self.max_bytes:
+            return
+
+        try:
+            atomic_write(self.directory / name, data)
+        except OSError as e:
+            self.logger.warning("Could not cache map file %s: %s", name, e)
+            return
+
+        self._evict()
+
+    def _evict(self) -> None:
+        files = []
+        for path in self._entries():
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.max_bytes:
+                break
+            self._remove(path.name)
+            total -= size
+
+    def _remove(self, name: str) -> None:
+        try:
+            os.remove(self.directory / name)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,121 @@
+import time
+from typing import Any, Dict, Hashable, Tuple, Union
+
+from ...identification import ServerDetails
+
+
+class ResponseCache:
+    """
+    Keeps the responses of RustSocket's read only requests for a short time, so that
+    repeated calls are answered without spending rate limit tokens. Broadcasts from the
+    server clear the entries they make stale, e.g. a team change clears the team info.
+    Entries are held per server and player, so one cache can be shared by the sockets
+    of a pool.
+
+    socket = RustSocket(server_details, response_cache=ResponseCache({"get_time": 5}))
+    """
+
+    # Seconds each method's response is kept for
+    DEFAULT_TTLS: Dict[str, float] = {
+        "get_info": 10,
+        "get_time": 1,
+        "get_team_info": 5,
+        "get_map_info": 3600,
+        "get_clan_info": 30,
+    }
+
+    def __init__(self, ttls: Union[Dict[str, float], None] = None) -> None:
+        """
+        :param ttls: Seconds to keep the responses of each method for, merged over the defaults. A ttl of 0 turns caching off for that method
+        """
+        self.ttls: Dict[str, float] = dict(self.DEFAULT_TTLS)
+        if ttls is not None:
+            for method, ttl in ttls.items():
+                if method not in self.DEFAULT_TTLS:
+                    raise ValueError(f"{method} cannot be cached")
+                if ttl < 0:
+                    raise ValueError("A ttl cannot be negative")
+                self.ttls[method] = ttl
+
+        # server -> method -> key -> (expiry, value), so that a broadcast only
+        # touches the entries of its own server
+        self.entries: Dict[
+            ServerDetails, Dict[str, Dict[Hashable, Tuple[float, Any]]]
+        ] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, server: ServerDetails, method: str, key: Hashable = None) -> Any:
+        """
+        :param server: The details of the socket the response belongs to
+        :return Any: The cached response, or None if there is no fresh one
+        """
+        entry = self._get_entry(server, method, key)
+        if entry is not None:
+            if entry[0] > time.monotonic():
+                self.hits += 1
+                return entry[1]
+            self._remove(server, method, key)
+
+        self.misses += 1
+        return None
+
+    def set(
+        self, server: ServerDetails, method: str, value: Any, key: Hashable = None
+    ) -> None:
+        ttl = self.ttls.get(method, 0)
+        if ttl > 0:
+            self.entries.setdefault(server, {}).setdefault(method, {})[key] = (
+                time.monotonic() + ttl,
+                value,
+            )
+
+    def is_fresh(
+        self, server: ServerDetails, method: str, key: Hashable = None
+    ) -> bool:
+        """
+        :return bool: Whether get would return a cached response, without counting as a hit or miss
+        """
+        entry = self._get_entry(server, method, key)
+        return entry is not None and entry[0] > time.monotonic()
+
+    def has(self, server: ServerDetails, method: str) -> bool:
+        """
+        :return bool: Whether anything, fresh or not, is held for the method on the server
+        """
+        return method in self.entries.get(server, {})
+
+    def invalidate(
+        self, server: Union[ServerDetails, None] = None, method: Union[str, None] = None
+    ) -> None:
+        """
+        Drops the cached responses of a method, or of every method if none is given,
+        on the given server, or on every server if none is given
+        """
+        servers = list(self.entries) if server is None else [server]
+        for cached_server in servers:
+            methods = self.entries.get(cached_server)
+            if methods is None:
+                continue
+
+            if method is None:
+                methods.clear()
+            else:
+                methods.pop(method, None)
+
+            if not methods:
+                del self.entries[cached_server]
+
+    def _get_entry(
+        self, server: ServerDetails, method: str, key: Hashable
+    ) -> Union[Tuple[float, Any], None]:
+        return self.entries.get(server, {}).get(method, {}).get(key)
+
+    def _remove(self, server: ServerDetails, method: str, key: Hashable) -> None:
+        methods = self.entries[server]
+        del methods[method][key]
+        # Empty dicts are dropped, so servers that are gone are not held on to
+        if not methods[method]:
+            del methods[method]
+            if not methods:
+                del self.entries[server]
@@ -1,3 +1,4 @@
+import asyncio
 import time
 from typing import Iterable, Union, List, Coroutine, Set, Callable
 from PIL import Image
@@ -12,6 +13,7 @@ from ..rustplus_proto import (
     AppCameraRays,
     AppCameraSubscribe,
 )
+from ..ratelimiter import RequestPriority
 from ...structs import Vector
 from .structures import CameraInfo, Entity, LimitedQueue
 
@@ -33,9 +35,10 @@ class CameraManager:
         )
         self.time_since_last_subscribe: float = time.time()
         self.frame_callbacks: Set[Callable[[Image.Image], Coroutine]] = set()
+        self._render_lock: asyncio.Lock = asyncio.Lock()
         CameraManager.ACTIVE_INSTANCE = self
 
-    async def add_packet(self, packet: AppCameraRays) -> None:
+    async def add_packet(self, packet: Union[AppCameraRays, bytes]) -> None:
         self._last_packets.add(packet)
 
         if len(self.frame_callbacks) == 0:
@@ -52,6 +55,19 @@ class CameraManager:
         self.frame_callbacks.add(coro)
         return coro
 
+    @staticmethod
+    def _decode_packet(
+        packet: Union[AppCameraRays, bytes, None]
+    ) -> Union[AppCameraRays, None]:
+        # Packets from a lazily decoding websocket arrive as raw bytes
+        if isinstance(packet, bytes):
+            return AppCameraRays().parse(packet)
+        return packet
+
+    @property
+    def is_open(self) -> bool:
+        return self._open
+
     def has_frame_data(self) -> bool:
         return self._last_packets is not None and len(self._last_packets) > 0
 
@@ -70,26 +86,50 @@ class CameraManager:
         if not self._open:
             raise Exception("Camera is closed")
 
-        for i in range(len(self._last_packets)):
-            self.parser.handle_camera_ray_data(self._last_packets.get(i))
-            self.parser.step()
+        packets = [
+            self._decode_packet(self._last_packets.get(i))
+            for i in range(len(self._last_packets))
+        ]
 
-        last_packet = self._last_packets.get_last()
+        last_packet = packets[-1]
 
         self._last_packets.clear()
         self._last_packets.add(last_packet)
 
+        # Frames build on the parser's state, so they are rendered one at a time
+        async with self._render_lock:
+            return await self.rust_socket.render_executor.run_in_thread(
+                self._render_frame,
+                packets,
+                render_entities,
+                entity_render_distance,
+                (
+                    max_entity_amount
+                    if max_entity_amount is not None
+                    else len(last_packet.entities)
+                ),
+            )
+
+    def _render_frame(
+        self,
+        packets: List[AppCameraRays],
+        render_entities: bool,
+        entity_render_distance: float,
+        max_entity_amount: float,
+    ) -> Image.Image:
+        for packet in packets:
+            self.parser.handle_camera_ray_data(packet)
+            self.parser.step()
+
+        last_packet = packets[-1]
+
         return self.parser.render(
             render_entities,
             last_packet.entities,
             last_packet.vertical_fov,
             self._cam_info_message.far_plane,
             entity_render_distance,
-            (
-                max_entity_amount
-                if max_entity_amount is not None
-                else len(self._last_packets.get_last().entities)
-            ),
+            max_entity_amount,
         )
 
     async def get_frame(
@@ -127,7 +167,9 @@ class CameraManager:
         for movement in movements:
             value = value | movement
 
-        app_request: AppRequest = await self.rust_socket._generate_request(0.01)
+        app_request: AppRequest = await self.rust_socket._generate_request(
+            0.01, RequestPriority.INTERACTIVE
+        )
         cam_input = AppCameraInput()
 
         cam_input.buttons = value
@@ -159,7 +201,7 @@ class CameraManager:
 
         self.time_since_last_subscribe = time.time()
         self._open = True
-        self.ACTIVE_INSTANCE = self
+        CameraManager.ACTIVE_INSTANCE = self
 
     async def get_entities_in_frame(self) -> List[Entity]:
         if self._last_packets is None:
@@ -168,7 +210,7 @@ class CameraManager:
         if len(self._last_packets) == 0:
             return []
 
-        return self._last_packets.get_last().entities
+        return self._decode_packet(self._last_packets.get_last()).entities
 
     async def get_distance_from_player(self) -> float:
         if self._last_packets is None:
@@ -177,7 +219,7 @@ class CameraManager:
         if len(self._last_packets) == 0:
             return float("inf")
 
-        return self._last_packets.get_last().distance
+        return self._decode_packet(self._last_packets.get_last()).distance
 
     async def get_max_distance(self) -> float:
         return self._cam_info_message.far_plane
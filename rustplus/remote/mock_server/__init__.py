@@ -0,0 +1,2 @@
+from .fixtures import MockServerFixtures
+from .mock_server import MockRustServer, BroadcastRates, run_mock_server
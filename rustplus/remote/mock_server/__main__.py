@@ -0,0 +1,34 @@
+import argparse
+import asyncio
+import logging
+
+from .mock_server import BroadcastRates, run_mock_server
+
+parser = argparse.ArgumentParser(description="Runs a local mock Rust+ server")
+parser.add_argument("--host", default="127.0.0.1")
+parser.add_argument("--port", type=int, default=28082)
+parser.add_argument("--entity-changed", type=float, default=0)
+parser.add_argument("--team-changed", type=float, default=0)
+parser.add_argument("--camera-rays", type=float, default=0)
+parser.add_argument("--team-message", type=float, default=0)
+parser.add_argument("--no-rate-limits", action="store_true")
+args = parser.parse_args()
+
+logging.basicConfig(level=logging.INFO)
+
+try:
+    asyncio.run(
+        run_mock_server(
+            broadcast_rates=BroadcastRates(
+                args.entity_changed,
+                args.team_changed,
+                args.camera_rays,
+                args.team_message,
+            ),
+            host=args.host,
+            port=args.port,
+            emulate_rate_limits=not args.no_rate_limits,
+        )
+    )
+except KeyboardInterrupt:
+    pass
@@ -0,0 +1,146 @@
+from io import BytesIO
+from typing import Dict, List, Union
+
+from PIL import Image
+
+from ..rustplus_proto import (
+    AppInfo,
+    AppTime,
+    AppMap,
+    AppMapMonument,
+    AppMapMarkers,
+    AppMarker,
+    AppMarkerType,
+    AppTeamInfo,
+    AppTeamInfoMember,
+    AppTeamChat,
+    AppEntityInfo,
+    AppEntityType,
+    AppEntityPayload,
+    AppCameraInfo,
+    AppCameraRays,
+    AppClanInfo,
+)
+
+
+class MockServerFixtures:
+    """
+    The data a MockRustServer answers requests with. Every field can be replaced
+    before the server is started, and entities can be added with add_entity.
+    """
+
+    def __init__(self, map_size: int = 3000, image_size: int = 2000) -> None:
+        """
+        :param map_size: The map size reported by get_info
+        :param image_size: The width and height of the generated map image, including the ocean margin
+        """
+        self.info = AppInfo(
+            name="RustPlus.py Mock Server",
+            header_image="",
+            url="",
+            map="Procedure Map",
+            map_size=map_size,
+            wipe_time=1700000000,
+            players=1,
+            max_players=100,
+            queued_players=0,
+            seed=1234,
+            salt=5678,
+        )
+        self.time = AppTime(
+            day_length_minutes=60, time_scale=1, sunrise=7.5, sunset=19.5, time=12
+        )
+        self.map = AppMap(
+            width=image_size,
+            height=image_size,
+            jpg_image=b"",
+            ocean_margin=500,
+            monuments=[
+                AppMapMonument(token="airfield_display_name", x=1000, y=1000),
+                AppMapMonument(token="train_yard_display_name", x=2000, y=1500),
+            ],
+            background="#12404D",
+        )
+        self.markers = AppMapMarkers(
+            markers=[
+                AppMarker(id=1, type=AppMarkerType.Player, x=1500, y=1500),
+                AppMarker(
+                    id=2, type=AppMarkerType.VendingMachine, x=1200, y=800, name="Shop"
+                ),
+                AppMarker(id=3, type=AppMarkerType.CargoShip, x=200, y=2800),
+            ]
+        )
+        self.team_info = AppTeamInfo(
+            leader_steam_id=76561198000000000,
+            members=[
+                AppTeamInfoMember(
+                    steam_id=76561198000000000,
+                    name="Mock Player",
+                    x=1500,
+                    y=1500,
+                    is_online=True,
+                    is_alive=True,
+                )
+            ],
+        )
+        self.team_chat = AppTeamChat(messages=[])
+        self.clan_info: Union[AppClanInfo, None] = None
+        self.entities: Dict[int, AppEntityInfo] = {}
+        self.camera_info = AppCameraInfo(
+            width=160, height=90, near_plane=0, far_plane=250, control_flags=0
+        )
+        self.camera_rays = AppCameraRays(
+            vertical_fov=65,
+            sample_offset=0,
+            ray_data=self._generate_rays(160 * 90),
+            distance=250,
+            entities=[],
+            time_of_day=0.5,
+        )
+
+        self.add_entity(1, AppEntityType.Switch, False)
+
+    @staticmethod
+    def _generate_rays(count: int) -> bytes:
+        """
+        Rays in the uncompressed four byte form: a marker byte, then a 10 bit
+        distance, 6 bit alignment and 8 bit material
+        """
+        data = bytearray()
+        for ray in range(count):
+            distance = ray % 1024
+            alignment = ray % 64
+            material = ray % 8
+            data += bytes(
+                (255, distance >> 2, ((distance & 3) << 6) | alignment, material)
+            )
+        return bytes(data)
+
+    def add_entity(
+        self,
+        entity_id: int,
+        entity_type: AppEntityType = AppEntityType.Switch,
+        value: bool = False,
+        capacity: int = 0,
+    ) -> AppEntityInfo:
+        entity = AppEntityInfo(
+            type=entity_type,
+            payload=AppEntityPayload(value=value, items=[], capacity=capacity),
+        )
+        self.entities[entity_id] = entity
+        return entity
+
+    @property
+    def entity_ids(self) -> List[int]:
+        return list(self.entities)
+
+    def get_map(self) -> AppMap:
+        # The image is only generated the first time it is asked for, as most load
+        # tests never request the map
+        if not self.map.jpg_image:
+            image = Image.new("RGB", (self.map.width, self.map.height), (18, 64, 77))
+            with BytesIO() as buffer:
+                image.save(buffer, "JPEG")
+                self.map.jpg_image = buffer.getvalue()
+
+        return self.map
@@ -0,0 +1,459 @@
+import asyncio
+import base64
+import logging
+import time
+from typing import Any, Dict, Set, Union
+
+import betterproto
+import websockets
+
+from .fixtures import MockServerFixtures
+from ..ratelimiter import RateLimiter, TokenBucket
+from ..rustplus_proto import (
+    AppMessage,
+    AppRequest,
+    AppResponse,
+    AppBroadcast,
+    AppError,
+    AppFlag,
+    AppSuccess,
+    AppEntityChanged,
+    AppTeamChanged,
+    AppNewTeamMessage,
+    AppTeamMessage,
+)
+from ...identification import ServerDetails
+from ...utils.utils import get_request_type
+
+
+class BroadcastRates:
+    def __init__(
+        self,
+        entity_changed: float = 0,
+        team_changed: float = 0,
+        camera_rays: float = 0,
+        team_message: float = 0,
+    ) -> None:
+        """
+        Broadcasts sent to every connection, in messages per second. Zero disables a broadcast.
+
+        :param entity_changed: Entity changes, cycling through the fixture entities
+        :param team_changed: Team changes carrying the fixture team info
+        :param camera_rays: Camera frames, sent whether or not a camera is subscribed
+        :param team_message: Team chat messages
+        """
+        self.rates: Dict[str, float] = {
+            "entity_changed": entity_changed,
+            "team_changed": team_changed,
+            "camera_rays": camera_rays,
+            "team_message": team_message,
+        }
+        for rate in self.rates.values():
+            if rate < 0:
+                raise ValueError("Broadcast rates cannot be negative")
+
+
+class _Connection:
+    def __init__(self, websocket) -> None:
+        self.websocket = websocket
+        self.subscriptions: Set[int] = set()
+        self.text = False
+
+
+class MockRustServer:
+    """
+    A local websocket server that speaks the Rust+ protocol, answering requests from
+    MockServerFixtures and sending broadcasts at fixed rates. It applies the same
+    per player and server wide token buckets as a real server, replying with a
+    "rate_limit" error when they run dry. Used to load test RustSocket offline.
+    """
+
+    # Tokens each request costs, anything not listed costs 1
+    REQUEST_COSTS: Dict[str, int] = {
+        "get_map": 5,
+        "send_team_message": 2,
+        "send_clan_message": 2,
+    }
+    # Responses that only depend on the fixtures, and their AppResponse field numbers.
+    # These are serialised once, as betterproto serialisation dominates under load.
+    CACHED_RESPONSES: Dict[str, int] = {
+        "get_info": 6,
+        "get_time": 7,
+        "get_map": 8,
+        "get_team_info": 9,
+        "get_map_markers": 13,
+    }
+    # The most broadcasts of one kind sent to a connection before yielding
+    MAX_BROADCAST_BATCH = 100
+
+    def __init__(
+        self,
+        fixtures: Union[MockServerFixtures, None] = None,
+        broadcast_rates: Union[BroadcastRates, None] = None,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        emulate_rate_limits: bool = True,
+    ) -> None:
+        """
+        :param fixtures: The data to answer with, the defaults if not given
+        :param broadcast_rates: The broadcasts to send, none if not given
+        :param host: The address to listen on
+        :param port: The port to listen on, 0 to pick a free one
+        :param emulate_rate_limits: Whether requests are subject to the server's rate limits
+        """
+        self.fixtures = fixtures if fixtures is not None else MockServerFixtures()
+        self.broadcast_rates = (
+            broadcast_rates if broadcast_rates is not None else BroadcastRates()
+        )
+        self.host = host
+        self.port = port
+        self.emulate_rate_limits = emulate_rate_limits
+        self.logger: logging.Logger = logging.getLogger("rustplus.py")
+
+        self.server_bucket = TokenBucket(
+            RateLimiter.SERVER_LIMIT,
+            RateLimiter.SERVER_LIMIT,
+            1,
+            RateLimiter.SERVER_REFRESH_AMOUNT,
+        )
+        self.player_buckets: Dict[int, TokenBucket] = {}
+        self.connections: Set[_Connection] = set()
+        self.requests_handled = 0
+        self.requests_rate_limited = 0
+        self.broadcasts_sent = 0
+
+        self._server = None
+        self._cache: Dict[Any, bytes] = {}
+
+    async def start(self) -> None:
+        self._server = await websockets.serve(
+            self._handle_connection,
+            self.host,
+            self.port,
+            max_size=1_000_000_000,
+            ping_interval=None,
+        )
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def stop(self) -> None:
+        if self._server is None:
+            return
+
+        self._server.close()
+        await self._server.wait_closed()
+        self._server = None
+
+    def clear_cache(self) -> None:
+        """
+        Forgets the serialised responses and broadcasts, which must be done after
+        changing the fixtures while the server is running
+        """
+        self._cache.clear()
+
+    def get_server_details(
+        self, player_id: int = 76561198000000000, player_token: int = 1
+    ) -> ServerDetails:
+        """
+        :return ServerDetails: Details for connecting a RustSocket to this server
+        """
+        return ServerDetails(self.host, self.port, player_id, player_token)
+
+    def get_metrics(self) -> Dict[str, int]:
+        return {
+            "connections": len(self.connections),
+            "requests_handled": self.requests_handled,
+            "requests_rate_limited": self.requests_rate_limited,
+            "broadcasts_sent": self.broadcasts_sent,
+        }
+
+    async def broadcast(self, broadcast: AppBroadcast) -> None:
+        """
+        Sends a broadcast to every connection
+        """
+        data = bytes(AppMessage(broadcast=broadcast))
+        for connection in list(self.connections):
+            await self._send(connection, data)
+
+    async def __aenter__(self) -> "MockRustServer":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *args) -> None:
+        await self.stop()
+
+    async def _handle_connection(self, websocket, *args) -> None:
+        connection = _Connection(websocket)
+        self.connections.add(connection)
+
+        tasks = [
+            asyncio.create_task(
+                self._broadcast_loop(connection, kind, rate),
+                name=f"[RustPlus.py] Mock Server {kind} Broadcasts",
+            )
+            for kind, rate in self.broadcast_rates.rates.items()
+            if rate > 0
+        ]
+
+        try:
+            async for data in websocket:
+                if isinstance(data, str):
+                    # Test server clients send base64 text
+                    connection.text = True
+                    data = base64.b64decode(data)
+
+                await self._send(
+                    connection,
+                    await self._handle_request(connection, AppRequest().parse(data)),
+                )
+        except websockets.exceptions.ConnectionClosed:
+            pass
+        finally:
+            self.connections.discard(connection)
+            for task in tasks:
+                task.cancel()
+
+    async def _send(self, connection: _Connection, data: bytes) -> None:
+        try:
+            if connection.text:
+                await connection.websocket.send(base64.b64encode(data).decode("utf-8"))
+            else:
+                await connection.websocket.send(data)
+        except websockets.exceptions.ConnectionClosed:
+            self.connections.discard(connection)
+
+    def _consume(self, player_id: int, cost: int) -> bool:
+        if player_id not in self.player_buckets:
+            self.player_buckets[player_id] = TokenBucket(
+                RateLimiter.SOCKET_LIMIT,
+                RateLimiter.SOCKET_LIMIT,
+                1,
+                RateLimiter.SOCKET_REFRESH_AMOUNT,
+            )
+
+        buckets = (self.player_buckets[player_id], self.server_bucket)
+        for bucket in buckets:
+            bucket.refresh()
+            if not bucket.can_consume(cost):
+                return False
+
+        for bucket in buckets:
+            bucket.consume(cost)
+        return True
+
+    async def _handle_request(
+        self, connection: _Connection, request: AppRequest
+    ) -> bytes:
+        """
+        :return bytes: The serialised AppMessage to reply with
+        """
+        name = get_request_type(request)
+
+        if self.emulate_rate_limits and not self._consume(
+            request.player_id, self.REQUEST_COSTS.get(name, 1)
+        ):
+            self.requests_rate_limited += 1
+            return bytes(
+                AppMessage(
+                    response=AppResponse(
+                        seq=request.seq, error=AppError(error="rate_limit")
+                    )
+                )
+            )
+
+        self.requests_handled += 1
+
+        if name in self.CACHED_RESPONSES:
+            if name not in self._cache:
+                self._cache[name] = bytes(self._get_fixture(name))
+            return _frame_response(
+                request.seq, self.CACHED_RESPONSES[name], self._cache[name]
+            )
+
+        response = AppResponse(seq=request.seq)
+        fixtures = self.fixtures
+
+        if name == "get_team_chat":
+            response.team_chat = fixtures.team_chat
+        elif name == "get_clan_info":
+            if fixtures.clan_info is None:
+                response.error = AppError(error="no_clan")
+            else:
+                response.clan_info = fixtures.clan_info
+        elif name == "camera_subscribe":
+            response.camera_subscribe_info = fixtures.camera_info
+        elif name in ("get_entity_info", "set_entity_value", "check_subscription"):
+            entity = fixtures.entities.get(request.entity_id)
+            if entity is None:
+                response.error = AppError(error="not_found")
+            elif name == "get_entity_info":
+                response.entity_info = entity
+            elif name == "check_subscription":
+                response.flag = AppFlag(
+                    value=request.entity_id in connection.subscriptions
+                )
+            else:
+                entity.payload.value = request.set_entity_value.value
+                response.success = AppSuccess()
+                await self._send_entity_changed(request.entity_id)
+        elif name == "set_subscription":
+            if request.set_subscription.value:
+                connection.subscriptions.add(request.entity_id)
+            else:
+                connection.subscriptions.discard(request.entity_id)
+            response.success = AppSuccess()
+        elif name == "send_team_message":
+            message = self._create_team_message(request.send_team_message.message)
+            fixtures.team_chat.messages.append(message)
+            response.success = AppSuccess()
+            await self.broadcast(
+                AppBroadcast(team_message=AppNewTeamMessage(message=message))
+            )
+        elif name in (
+            "promote_to_leader",
+            "camera_unsubscribe",
+            "camera_input",
+            "set_clan_motd",
+            "send_clan_message",
+        ):
+            response.success = AppSuccess()
+        else:
+            response.error = AppError(error="unknown")
+
+        return bytes(AppMessage(response=response))
+
+    def _get_fixture(self, name: str) -> betterproto.Message:
+        if name == "get_info":
+            return self.fixtures.info
+        if name == "get_time":
+            return self.fixtures.time
+        if name == "get_map":
+            return self.fixtures.get_map()
+        if name == "get_team_info":
+            return self.fixtures.team_info
+        return self.fixtures.markers
+
+    def _create_team_message(self, text: str) -> AppTeamMessage:
+        return AppTeamMessage(
+            steam_id=self.fixtures.team_info.leader_steam_id,
+            name="Mock Player",
+            message=text,
+            color="#5af",
+            time=int(time.time()),
+        )
+
+    async def _send_entity_changed(self, entity_id: int) -> None:
+        data = self._get_entity_changed(entity_id)
+        for connection in list(self.connections):
+            if entity_id in connection.subscriptions:
+                await self._send(connection, data)
+
+    def _get_entity_changed(self, entity_id: int) -> bytes:
+        payload = self.fixtures.entities[entity_id].payload
+        key = ("entity_changed", entity_id, payload.value)
+
+        if key not in self._cache:
+            self._cache[key] = bytes(
+                AppMessage(
+                    broadcast=AppBroadcast(
+                        entity_changed=AppEntityChanged(
+                            entity_id=entity_id, payload=payload
+                        )
+                    )
+                )
+            )
+        return self._cache[key]
+
+    def _create_broadcast(self, kind: str, count: int) -> bytes:
+        fixtures = self.fixtures
+
+        if kind == "entity_changed":
+            entity_ids = fixtures.entity_ids
+            entity_id = entity_ids[count % len(entity_ids)]
+            entity = fixtures.entities[entity_id]
+            entity.payload.value = not entity.payload.value
+            return self._get_entity_changed(entity_id)
+
+        # Chat messages carry the time, so they are only reused within the same second
+        key = ("team_message", int(time.time())) if kind == "team_message" else kind
+        if key in self._cache:
+            return self._cache[key]
+
+        if kind == "team_changed":
+            broadcast = AppBroadcast(
+                team_changed=AppTeamChanged(
+                    player_id=fixtures.team_info.leader_steam_id,
+                    team_info=fixtures.team_info,
+                )
+            )
+        elif kind == "camera_rays":
+            broadcast = AppBroadcast(camera_rays=fixtures.camera_rays)
+        else:
+            self._cache.pop(("team_message", key[1] - 1), None)
+            broadcast = AppBroadcast(
+                team_message=AppNewTeamMessage(
+                    message=self._create_team_message("Mock message")
+                )
+            )
+
+        self._cache[key] = bytes(AppMessage(broadcast=broadcast))
+        return self._cache[key]
+
+    async def _broadcast_loop(
+        self, connection: _Connection, kind: str, rate: float
+    ) -> None:
+        interval = 1 / rate
+        next_send = time.monotonic()
+        count = 0
+
+        while True:
+            # Send every broadcast that is due in one go, so that rates above the
+            # event loop's timer resolution are still met
+            now = time.monotonic()
+            batch = 0
+            while next_send <= now and batch < self.MAX_BROADCAST_BATCH:
+                await self._send(connection, self._create_broadcast(kind, count))
+                self.broadcasts_sent += 1
+                count += 1
+                batch += 1
+                next_send += interval
+
+            # If the server cannot keep up, give up on the backlog rather than
+            # bursting to catch up with it
+            if next_send < now - 1:
+                next_send = now
+
+            await asyncio.sleep(max(0.0, next_send - time.monotonic()))
+
+
+def _encode_varint(value: int) -> bytes:
+    data = bytearray()
+    while value > 0x7F:
+        data.append((value & 0x7F) | 0x80)
+        value >>= 7
+    data.append(value)
+    return bytes(data)
+
+
+def _frame_response(seq: int, field_number: int, payload: bytes) -> bytes:
+    """
+    Wraps an already serialised AppResponse field in an AppMessage, so that only the
+    seq has to be encoded for each request
+    """
+    response = (
+        b"\x08"
+        + _encode_varint(seq)
+        + _encode_varint(field_number << 3 | 2)
+        + _encode_varint(len(payload))
+        + payload
+    )
+    return b"\x0a" + _encode_varint(len(response)) + response
+
+
+async def run_mock_server(*args: Any, **kwargs: Any) -> None:
+    """
+    Runs a MockRustServer until cancelled, taking the same arguments as its constructor
+    """
+    server = MockRustServer(*args, **kwargs)
+    async with server:
+        server.logger.info("Mock Rust+ server listening on port %s", server.port)
+        await asyncio.Future()
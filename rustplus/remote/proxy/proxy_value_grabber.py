@@ -1,5 +1,6 @@
 import requests
 import logging
+import threading
 import time
 
 
@@ -7,26 +8,49 @@ class ProxyValueGrabber:
 
     VALUE = -1
     LAST_FETCHED = -1
+    # When the last fetch failed, so that a server that is down is not asked again
+    # by every connection attempt until FAILURE_BACKOFF seconds have passed
+    LAST_FAILED = -1
+    FAILURE_BACKOFF = 60
+    FALLBACK_VALUE = 9999999999999
+
+    # Connections opened at once wait for one fetch, rather than each making one
+    _lock = threading.Lock()
 
     @staticmethod
     def get_value() -> int:
-
-        if (
-            ProxyValueGrabber.VALUE != -1
-            and ProxyValueGrabber.LAST_FETCHED >= time.time() - 600
-        ):
-            return ProxyValueGrabber.VALUE
-
-        data = requests.get("https://companion-rust.facepunch.com/api/version")
-
-        if data.status_code == 200:
-            publish_time = data.json().get("minPublishedTime", None)
-            if publish_time is not None:
-                ProxyValueGrabber.VALUE = publish_time + 1
-                ProxyValueGrabber.LAST_FETCHED = time.time()
+        """
+        Blocks while the value is fetched, so should be run in an executor from async code
+        """
+        with ProxyValueGrabber._lock:
+            if (
+                ProxyValueGrabber.VALUE != -1
+                and ProxyValueGrabber.LAST_FETCHED >= time.time() - 600
+            ):
                 return ProxyValueGrabber.VALUE
 
-        logging.getLogger("rustplus.py").warning(
-            "Failed to get magic value from RustPlus Server"
-        )
-        return 9999999999999
+            if (
+                ProxyValueGrabber.LAST_FAILED
+                >= time.time() - ProxyValueGrabber.FAILURE_BACKOFF
+            ):
+                return ProxyValueGrabber.FALLBACK_VALUE
+
+            try:
+                data = requests.get(
+                    "https://companion-rust.facepunch.com/api/version", timeout=10
+                )
+            except requests.RequestException:
+                data = None
+
+            if data is not None and data.status_code == 200:
+                publish_time = data.json().get("minPublishedTime", None)
+                if publish_time is not None:
+                    ProxyValueGrabber.VALUE = publish_time + 1
+                    ProxyValueGrabber.LAST_FETCHED = time.time()
+                    return ProxyValueGrabber.VALUE
+
+            ProxyValueGrabber.LAST_FAILED = time.time()
+            logging.getLogger("rustplus.py").warning(
+                "Failed to get magic value from RustPlus Server"
+            )
+            return ProxyValueGrabber.FALLBACK_VALUE
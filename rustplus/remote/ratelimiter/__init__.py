@@ -1,38 +1,15 @@
+import asyncio
+import contextlib
 import math
-import time
-import threading
-from typing import Dict
+from typing import Dict, Iterable, List, Tuple, Union
 
-from ...exceptions.exceptions import RateLimitError
+from .adaptive import AdaptiveOptions, AdaptiveRate
+from .shared_bucket import SharedBucketStore, SharedTokenBucket
+from .token_bucket import TokenBucket, RequestPriority, _Waiter
+from ...exceptions.exceptions import RateLimitError, RequestShedError
 from ...identification import ServerDetails
 
 
-class TokenBucket:
-    def __init__(
-        self, current: float, maximum: float, refresh_rate: float, refresh_amount: float
-    ) -> None:
-        self.current = current
-        self.max = maximum
-        self.refresh_rate = refresh_rate
-        self.refresh_amount = refresh_amount
-        self.last_update = time.time()
-        self.refresh_per_second = self.refresh_amount / self.refresh_rate
-
-    def can_consume(self, amount) -> bool:
-        return (self.current - amount) >= 0
-
-    def consume(self, amount: int = 1) -> None:
-        self.current -= amount
-
-    def refresh(self) -> None:
-        time_now = time.time()
-        time_delta = time_now - self.last_update
-        self.last_update = time_now
-        self.current = min(
-            self.current + time_delta * self.refresh_per_second, self.max
-        )
-
-
 class RateLimiter:
     SOCKET_LIMIT = 25
     SOCKET_REFRESH_AMOUNT = 3
@@ -46,10 +23,29 @@ class RateLimiter:
         """
         return cls()
 
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        background_reserve: float = 0.2,
+        shed_background: bool = False,
+        shared_store: Union[SharedBucketStore, None] = None,
+        adaptive_options: Union[AdaptiveOptions, None] = None,
+    ) -> None:
+        """
+        :param background_reserve: The fraction of each bucket that background requests leave for everything else
+        :param shed_background: Whether background requests that would have to wait raise RequestShedError instead
+        :param shared_store: Where to keep the buckets so that other processes on the host share them, in this process by default
+        :param adaptive_options: Settings for learning the refill rates from the server's rate limit errors, fixed rates if not given
+        """
+        if not 0 <= background_reserve < 1:
+            raise ValueError("The background reserve must be between 0 and 1")
+
+        self.background_reserve = background_reserve
+        self.shed_background = shed_background
+        self.shared_store = shared_store
+        self.adaptive_options = adaptive_options
+        self._adaptive_rates: Dict[TokenBucket, AdaptiveRate] = {}
         self.socket_buckets: Dict[ServerDetails, TokenBucket] = {}
         self.server_buckets: Dict[str, TokenBucket] = {}
-        self.lock = threading.Lock()
 
     def add_socket(
         self,
@@ -59,46 +55,138 @@ class RateLimiter:
         refresh_rate: float,
         refresh_amount: float,
     ) -> None:
-        with self.lock:
-            if server_details not in self.socket_buckets:
-                self.socket_buckets[server_details] = TokenBucket(
-                    current, maximum, refresh_rate, refresh_amount
-                )
-            if server_details.get_server_string() not in self.server_buckets:
-                self.server_buckets[server_details.get_server_string()] = TokenBucket(
-                    self.SERVER_LIMIT, self.SERVER_LIMIT, 1, self.SERVER_REFRESH_AMOUNT
+        server_str = server_details.get_server_string()
+
+        if server_details not in self.socket_buckets:
+            self.socket_buckets[server_details] = self._create_bucket(
+                f"{server_str}/{server_details.player_id}",
+                current,
+                maximum,
+                refresh_rate,
+                refresh_amount,
+            )
+        if server_str not in self.server_buckets:
+            self.server_buckets[server_str] = self._create_bucket(
+                server_str,
+                self.SERVER_LIMIT,
+                self.SERVER_LIMIT,
+                1,
+                self.SERVER_REFRESH_AMOUNT,
+            )
+
+    def _create_bucket(
+        self,
+        key: str,
+        current: float,
+        maximum: float,
+        refresh_rate: float,
+        refresh_amount: float,
+    ) -> TokenBucket:
+        if self.shared_store is not None:
+            return self.shared_store.create_bucket(
+                key, current, maximum, refresh_rate, refresh_amount
+            )
+        return TokenBucket(current, maximum, refresh_rate, refresh_amount)
+
+    def _get_buckets(self, server_details: ServerDetails) -> Tuple[TokenBucket, ...]:
+        return (
+            self.socket_buckets[server_details],
+            self.server_buckets[server_details.get_server_string()],
+        )
+
+    def get_capacity(self, server_details: ServerDetails) -> float:
+        """
+        Returns the most tokens that a single acquire can take for the socket
+        """
+        return min(bucket.max for bucket in self._get_buckets(server_details))
+
+    async def acquire(
+        self,
+        server_details: ServerDetails,
+        amount: float = 1,
+        priority: int = RequestPriority.NORMAL,
+    ) -> None:
+        """
+        Waits until the amount of tokens can be taken from both the socket and server
+        buckets, then takes them from both at once. Higher priorities are served first,
+        and waiters of the same priority are served in the order they called. Each is
+        woken as soon as its tokens are available.
+
+        A request first waits on its socket's bucket, and only queues at the shared
+        server bucket once the socket bucket can cover it, so a socket that is out of
+        tokens never holds up other sockets' requests to the same server.
+
+        Background requests only take tokens while the buckets stay above the
+        background reserve, so that interactive requests are not left waiting.
+        """
+        buckets = self._get_buckets(server_details)
+
+        for bucket in buckets:
+            if amount > bucket.max:
+                raise RateLimitError(
+                    f"{amount} tokens is more than a bucket can hold ({bucket.max})"
                 )
 
+        if not any(bucket.has_waiters(priority) for bucket in buckets):
+            with self._hold(buckets):
+                if self._get_delay(buckets, amount, priority) == 0:
+                    for bucket in buckets:
+                        bucket.consume(amount)
+                    return
+
+        if priority == RequestPriority.BACKGROUND and self.shed_background:
+            raise RequestShedError("Not enough tokens for a background request")
+
+        waiter = _Waiter(
+            amount, priority, buckets, asyncio.get_running_loop().create_future()
+        )
+        buckets[0].waiters[priority].append(waiter)
+
+        self._wake(buckets)
+
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # Granted just before the cancellation landed, so hand the tokens back
+                for bucket in buckets:
+                    bucket.give_back(amount)
+            else:
+                for bucket in buckets:
+                    bucket.remove_waiter(waiter)
+
+            self._wake(buckets)
+            raise
+
     async def can_consume(self, server_details: ServerDetails, amount: int = 1) -> bool:
         """
         Returns whether the user can consume the amount of tokens provided
         """
-        with self.lock:
-            for bucket in [
-                self.socket_buckets.get(server_details),
-                self.server_buckets.get(server_details.get_server_string()),
-            ]:
-                bucket.refresh()
-                if not bucket.can_consume(amount):
-                    return False
+        buckets = self._get_buckets(server_details)
+
+        # Queued requests are ahead of anything asking now
+        if any(bucket.has_waiters() for bucket in buckets):
+            return False
+
+        for bucket in buckets:
+            bucket.refresh()
+            if not bucket.can_consume(amount):
+                return False
         return True
 
     async def consume(self, server_details: ServerDetails, amount: int = 1) -> None:
         """
         Consumes an amount of tokens from the bucket. You should first check to see whether it is possible with can_consume
         """
-        with self.lock:
-            for bucket in [
-                self.socket_buckets.get(server_details),
-                self.server_buckets.get(server_details.get_server_string()),
-            ]:
+        buckets = self._get_buckets(server_details)
+
+        with self._hold(buckets):
+            for bucket in buckets:
                 bucket.refresh()
                 if not bucket.can_consume(amount):
                     raise RateLimitError("Not Enough Tokens")
-            for bucket in [
-                self.socket_buckets.get(server_details),
-                self.server_buckets.get(server_details.get_server_string()),
-            ]:
+
+            for bucket in buckets:
                 bucket.consume(amount)
 
     async def get_estimated_delay_time(
@@ -107,36 +195,203 @@ class RateLimiter:
         """
         Returns how long until the amount of tokens needed will be available
         """
-
-        with self.lock:
-            delay = 0
-            for bucket in [
-                self.socket_buckets.get(server_details),
-                self.server_buckets.get(server_details.get_server_string()),
-            ]:
-                bucket.refresh()
-                val = (
-                    math.ceil(
-                        (
-                            ((target_cost - bucket.current) / bucket.refresh_per_second)
-                            + 0.1
-                        )
-                        * 100
-                    )
-                    / 100
-                )
-                if val > delay:
-                    delay = val
+        delay = 0
+        for bucket in self._get_buckets(server_details):
+            val = math.ceil((bucket.time_until(target_cost) + 0.1) * 100) / 100
+            if val > delay:
+                delay = val
         return delay
 
+    def report_throttled(self, server_details: ServerDetails) -> None:
+        """
+        Tells an adaptive limiter that the server rejected a request for exceeding its
+        rate limit. The refill rates are cut and the buckets emptied.
+        """
+        if self.adaptive_options is None or server_details not in self.socket_buckets:
+            return
+
+        buckets = self._get_buckets(server_details)
+        for bucket in buckets:
+            if self._get_adaptive_rate(bucket).decrease():
+                with bucket.hold():
+                    bucket.refresh()
+                    bucket.current = min(bucket.current, 0)
+                self._apply_rate(bucket)
+
+        self._wake(buckets)
+
+    def report_success(self, server_details: ServerDetails) -> None:
+        """
+        Tells an adaptive limiter that a request was answered, so the rates can grow
+        """
+        if self.adaptive_options is None or server_details not in self.socket_buckets:
+            return
+
+        buckets = self._get_buckets(server_details)
+        changed = False
+        for bucket in buckets:
+            if self._get_adaptive_rate(bucket).increase():
+                self._apply_rate(bucket)
+                changed = True
+
+        if changed:
+            self._wake(buckets)
+
+    def get_learned_rates(self, server_details: ServerDetails) -> Dict[str, float]:
+        """
+        :return Dict[str, float]: The current refill rates of the socket and server buckets, in tokens per second
+        """
+        socket_bucket, server_bucket = self._get_buckets(server_details)
+        return {
+            "socket": socket_bucket.refresh_per_second,
+            "server": server_bucket.refresh_per_second,
+        }
+
+    def _get_adaptive_rate(self, bucket: TokenBucket) -> AdaptiveRate:
+        if bucket not in self._adaptive_rates:
+            self._adaptive_rates[bucket] = AdaptiveRate(
+                bucket.refresh_per_second, self.adaptive_options
+            )
+        return self._adaptive_rates[bucket]
+
+    def _apply_rate(self, bucket: TokenBucket) -> None:
+        with bucket.hold():
+            # Tokens earned so far count at the old rate
+            bucket.refresh()
+            bucket.refresh_per_second = self._adaptive_rates[bucket].rate
+
     async def remove(self, server_details: ServerDetails) -> None:
         """
         Removes the limiter
         """
-        with self.lock:
-            del self.socket_buckets[server_details]
-            server_str = server_details.get_server_string()
-            if not any(
-                d.get_server_string() == server_str for d in self.socket_buckets
-            ):
-                del self.server_buckets[server_str]
+        bucket = self.socket_buckets.pop(server_details)
+        server_str = server_details.get_server_string()
+        self._fail_waiters(bucket, "Socket removed from the rate limiter")
+        self._adaptive_rates.pop(bucket, None)
+        bucket.close()
+
+        if not any(d.get_server_string() == server_str for d in self.socket_buckets):
+            bucket = self.server_buckets.pop(server_str)
+            self._fail_waiters(bucket, "Server removed")
+            self._adaptive_rates.pop(bucket, None)
+            bucket.close()
+        elif self.server_buckets[server_str].has_waiters():
+            self._wake((self.server_buckets[server_str],))
+
+    @staticmethod
+    def _hold(buckets: Iterable[TokenBucket]) -> contextlib.ExitStack:
+        """
+        Holds every bucket, so that checking and taking tokens is atomic even when
+        some of them are shared with other processes
+        """
+        stack = contextlib.ExitStack()
+        for bucket in buckets:
+            stack.enter_context(bucket.hold())
+        return stack
+
+    def _get_delay(
+        self, buckets: Iterable[TokenBucket], amount: float, priority: int
+    ) -> float:
+        delay = 0.0
+        for bucket in buckets:
+            needed = amount
+            if priority == RequestPriority.BACKGROUND:
+                needed = min(amount + bucket.max * self.background_reserve, bucket.max)
+            delay = max(delay, bucket.time_until(needed))
+        return delay
+
+    def _wake(self, buckets: Iterable[TokenBucket]) -> None:
+        """
+        Grants tokens to the waiters at the front of the given buckets' queues for as
+        long as they are available, then sets a timer for when the next one will be.
+
+        A waiter's first bucket is its own. Once that can cover it, the waiter is moved
+        on to queue at its shared buckets too, and it is moved back if its own bucket
+        runs short again, so only waiters held up by the shared buckets queue there.
+        """
+        pending: List[TokenBucket] = list(buckets)
+
+        while pending:
+            bucket = pending.pop()
+            if bucket.timer is not None:
+                bucket.timer.cancel()
+                bucket.timer = None
+
+            while (waiter := bucket.get_next_waiter()) is not None:
+                own, shared = waiter.buckets[0], waiter.buckets[1:]
+
+                if waiter.future.done():
+                    # Cancelled, its task will not be back to take the tokens
+                    for other in waiter.buckets:
+                        other.remove_waiter(waiter)
+                        if other is not bucket:
+                            pending.append(other)
+                    continue
+
+                if bucket is own and waiter.promoted:
+                    # Next in line here, and waiting on the shared buckets
+                    break
+
+                with own.hold():
+                    own_delay = self._get_delay((own,), waiter.amount, waiter.priority)
+
+                if bucket is own:
+                    if own_delay > 0:
+                        bucket.timer = asyncio.get_running_loop().call_later(
+                            own_delay, self._wake, (own,)
+                        )
+                        break
+
+                    waiter.promoted = True
+                    for other in shared:
+                        other.waiters[waiter.priority].append(waiter)
+                        pending.append(other)
+                    break
+
+                if own.get_next_waiter() is not waiter or own_delay > 0:
+                    # Its own bucket ran short, so give up the place in the shared queues
+                    waiter.promoted = False
+                    for other in shared:
+                        other.remove_waiter(waiter)
+                        if other is not bucket:
+                            pending.append(other)
+                    pending.append(own)
+                    continue
+
+                # A waiter is only served once it is next in line at every bucket
+                # it needs, the bucket it is behind in will wake it
+                if any(other.get_next_waiter() is not waiter for other in shared):
+                    break
+
+                with self._hold(waiter.buckets):
+                    delay = self._get_delay(
+                        waiter.buckets, waiter.amount, waiter.priority
+                    )
+                    if delay == 0:
+                        for other in waiter.buckets:
+                            other.consume(waiter.amount)
+
+                if delay > 0:
+                    bucket.timer = asyncio.get_running_loop().call_later(
+                        delay, self._wake, waiter.buckets
+                    )
+                    break
+
+                for other in waiter.buckets:
+                    other.remove_waiter(waiter)
+                    if other is not bucket:
+                        pending.append(other)
+
+                waiter.future.set_result(None)
+
+    @staticmethod
+    def _fail_waiters(bucket: TokenBucket, reason: str) -> None:
+        if bucket.timer is not None:
+            bucket.timer.cancel()
+            bucket.timer = None
+
+        while (waiter := bucket.get_next_waiter()) is not None:
+            for other in waiter.buckets:
+                other.remove_waiter(waiter)
+            if not waiter.future.done():
+                waiter.future.set_exception(RateLimitError(reason))
@@ -0,0 +1,86 @@
+import time
+
+
+class AdaptiveOptions:
+    def __init__(
+        self,
+        decrease_factor: float = 0.5,
+        increase_fraction: float = 0.05,
+        increase_interval: float = 5,
+        decrease_cooldown: float = 1,
+        min_fraction: float = 0.1,
+        max_fraction: float = 2,
+    ) -> None:
+        """
+        Settings for learning the refill rates from the server's rate limit errors. Rates
+        are cut multiplicatively when the server throttles a request, and grow back
+        additively while requests succeed (AIMD).
+
+        :param decrease_factor: What the refill rate is multiplied by when a request is throttled
+        :param increase_fraction: How much of the configured rate is added back after each quiet interval
+        :param increase_interval: Seconds without throttling between each increase
+        :param decrease_cooldown: Seconds after a decrease during which further errors are ignored, as they are for requests already sent
+        :param min_fraction: The lowest the rate may fall, as a fraction of the configured rate
+        :param max_fraction: The highest the rate may probe, as a fraction of the configured rate
+        """
+        if not 0 < decrease_factor < 1:
+            raise ValueError("The decrease factor must be between 0 and 1")
+
+        if not 0 < min_fraction <= 1 <= max_fraction:
+            raise ValueError("The rate bounds must satisfy 0 < min <= 1 <= max")
+
+        self.decrease_factor = decrease_factor
+        self.increase_fraction = increase_fraction
+        self.increase_interval = increase_interval
+        self.decrease_cooldown = decrease_cooldown
+        self.min_fraction = min_fraction
+        self.max_fraction = max_fraction
+
+
+class AdaptiveRate:
+    """
+    The learned refill rate of one bucket
+    """
+
+    def __init__(self, configured_rate: float, options: AdaptiveOptions) -> None:
+        self.configured_rate = configured_rate
+        self.rate = configured_rate
+        self.options = options
+        self.throttles = 0
+        self.last_change = time.monotonic()
+        self.last_decrease = float("-inf")
+
+    def decrease(self) -> bool:
+        """
+        :return bool: Whether the rate changed
+        """
+        now = time.monotonic()
+        if now - self.last_decrease < self.options.decrease_cooldown:
+            return False
+
+        self.throttles += 1
+        self.last_change = now
+        self.last_decrease = now
+        self.rate = max(
+            self.rate * self.options.decrease_factor,
+            self.configured_rate * self.options.min_fraction,
+        )
+        return True
+
+    def increase(self) -> bool:
+        """
+        :return bool: Whether the rate changed
+        """
+        now = time.monotonic()
+        limit = self.configured_rate * self.options.max_fraction
+        if (
+            now - self.last_change < self.options.increase_interval
+            or self.rate >= limit
+        ):
+            return False
+
+        self.last_change = now
+        self.rate = min(
+            self.rate + self.configured_rate * self.options.increase_fraction, limit
+        )
+        return True
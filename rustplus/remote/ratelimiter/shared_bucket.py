@@ -0,0 +1,154 @@
+import contextlib
+import hashlib
+import mmap
+import os
+import struct
+import tempfile
+import time
+from pathlib import Path
+from typing import Union
+
+from .token_bucket import TokenBucket
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+
+class SharedTokenBucket(TokenBucket):
+    """
+    A token bucket whose level lives in a small memory mapped file, so that every
+    process on the host opening the same file draws from the same tokens. The file
+    is locked with flock while the level is checked and updated.
+    """
+
+    # current tokens, monotonic time of the last refresh
+    STATE = struct.Struct("<dd")
+
+    def __init__(
+        self,
+        path: Path,
+        current: float,
+        maximum: float,
+        refresh_rate: float,
+        refresh_amount: float,
+    ) -> None:
+        self.path = path
+        self._depth = 0
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+
+        with self.hold():
+            new_file = os.fstat(self._fd).st_size < self.STATE.size
+            if new_file:
+                os.ftruncate(self._fd, self.STATE.size)
+
+            self._map = mmap.mmap(self._fd, self.STATE.size)
+            state = (
+                (current, time.monotonic())
+                if new_file
+                else self.STATE.unpack_from(self._map, 0)
+            )
+
+            # The base class sets the level, so put back the one other processes see
+            super().__init__(current, maximum, refresh_rate, refresh_amount)
+            self.STATE.pack_into(self._map, 0, *state)
+
+    @property
+    def current(self) -> float:
+        return self.STATE.unpack_from(self._map, 0)[0]
+
+    @current.setter
+    def current(self, value: float) -> None:
+        struct.pack_into("<d", self._map, 0, value)
+
+    @property
+    def last_update(self) -> float:
+        return self.STATE.unpack_from(self._map, 0)[1]
+
+    @last_update.setter
+    def last_update(self, value: float) -> None:
+        struct.pack_into("<d", self._map, 8, value)
+
+    @contextlib.contextmanager
+    def hold(self):
+        # flock is per open file, so only the outermost hold takes and releases it
+        if self._depth == 0:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+        self._depth += 1
+        try:
+            yield
+        finally:
+            self._depth -= 1
+            if self._depth == 0:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def consume(self, amount: int = 1) -> None:
+        with self.hold():
+            super().consume(amount)
+
+    def give_back(self, amount: float) -> None:
+        with self.hold():
+            super().give_back(amount)
+
+    def refresh(self) -> None:
+        with self.hold():
+            # The monotonic clock restarts with the machine, so a level left from
+            # before a reboot is treated as long since refilled
+            if self.last_update > time.monotonic():
+                self.current = self.max
+            super().refresh()
+
+    def time_until(self, amount: float) -> float:
+        with self.hold():
+            return super().time_until(amount)
+
+    def close(self) -> None:
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+            os.close(self._fd)
+
+
+class SharedBucketStore:
+    """
+    Keeps rate limiter buckets in files under a directory, so that RateLimiters in
+    different processes on the same host share them. Give each RateLimiter a store
+    on the same directory:
+
+    ratelimiter = RateLimiter(shared_store=SharedBucketStore())
+    """
+
+    def __init__(self, directory: Union[str, Path, None] = None) -> None:
+        """
+        :param directory: Where the bucket files are kept, a folder in the temp directory by default
+        """
+        if fcntl is None:
+            raise NotImplementedError("Shared rate limit buckets need fcntl (POSIX)")
+
+        self.directory = Path(
+            directory
+            if directory is not None
+            else Path(tempfile.gettempdir()) / "rustplus-ratelimit"
+        )
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def create_bucket(
+        self,
+        key: str,
+        current: float,
+        maximum: float,
+        refresh_rate: float,
+        refresh_amount: float,
+    ) -> SharedTokenBucket:
+        """
+        Opens the bucket for the key, creating it with the given level if no process has yet
+        """
+        name = hashlib.sha1(key.encode("utf-8")).hexdigest()[:20]
+        return SharedTokenBucket(
+            self.directory / f"{name}.bucket",
+            current,
+            maximum,
+            refresh_rate,
+            refresh_amount,
+        )
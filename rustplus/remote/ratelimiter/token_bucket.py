@@ -0,0 +1,105 @@
+import asyncio
+import contextlib
+import time
+from collections import deque
+from typing import ContextManager, Deque, Tuple, Union
+
+
+class RequestPriority:
+    """
+    The lanes requests wait in for tokens. A lane is only served once every lane
+    above it is empty.
+    """
+
+    INTERACTIVE = 0
+    NORMAL = 1
+    BACKGROUND = 2
+
+    ALL = (INTERACTIVE, NORMAL, BACKGROUND)
+
+
+class _Waiter:
+    __slots__ = ("amount", "priority", "buckets", "future", "promoted")
+
+    def __init__(
+        self,
+        amount: float,
+        priority: int,
+        buckets: Tuple["TokenBucket", ...],
+        future: asyncio.Future,
+    ) -> None:
+        self.amount = amount
+        self.priority = priority
+        self.buckets = buckets
+        self.future = future
+        # Whether it has moved on from its own bucket to queue at the shared ones
+        self.promoted = False
+
+
+class TokenBucket:
+    def __init__(
+        self, current: float, maximum: float, refresh_rate: float, refresh_amount: float
+    ) -> None:
+        self.current = current
+        self.max = maximum
+        self.refresh_rate = refresh_rate
+        self.refresh_amount = refresh_amount
+        self.last_update = time.monotonic()
+        self.refresh_per_second = self.refresh_amount / self.refresh_rate
+
+        # Requests waiting on this bucket, a queue per priority in the order they asked
+        self.waiters: Tuple[Deque[_Waiter], ...] = tuple(
+            deque() for _ in RequestPriority.ALL
+        )
+        self.timer: Union[asyncio.TimerHandle, None] = None
+
+    def can_consume(self, amount) -> bool:
+        return (self.current - amount) >= 0
+
+    def consume(self, amount: int = 1) -> None:
+        self.current -= amount
+
+    def refresh(self) -> None:
+        time_now = time.monotonic()
+        time_delta = time_now - self.last_update
+        self.last_update = time_now
+        self.current = min(
+            self.current + time_delta * self.refresh_per_second, self.max
+        )
+
+    def time_until(self, amount: float) -> float:
+        """
+        Returns how many seconds until the amount of tokens will be available
+        """
+        self.refresh()
+        return max(0.0, (amount - self.current) / self.refresh_per_second)
+
+    def get_next_waiter(self) -> Union[_Waiter, None]:
+        for queue in self.waiters:
+            if queue:
+                return queue[0]
+        return None
+
+    def has_waiters(self, priority: int = RequestPriority.BACKGROUND) -> bool:
+        """
+        Returns whether anything of the given priority or higher is waiting
+        """
+        return any(self.waiters[lane] for lane in range(priority + 1))
+
+    def remove_waiter(self, waiter: _Waiter) -> None:
+        queue = self.waiters[waiter.priority]
+        if waiter in queue:
+            queue.remove(waiter)
+
+    def give_back(self, amount: float) -> None:
+        self.current = min(self.current + amount, self.max)
+
+    def hold(self) -> ContextManager:
+        """
+        Keeps the level from changing elsewhere while it is checked and updated. Local
+        buckets only change on the event loop, so there is nothing to lock.
+        """
+        return contextlib.nullcontext()
+
+    def close(self) -> None:
+        pass
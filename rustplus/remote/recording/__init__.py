@@ -0,0 +1 @@
+from .frame_recorder import FrameRecorder, FrameReplayer, FrameRecord, FrameDirection
@@ -0,0 +1,147 @@
+import asyncio
+import struct
+import time
+from pathlib import Path
+from typing import BinaryIO, Iterator, Union
+
+MAGIC = b"RPFR\x01"
+# direction, monotonic timestamp, payload length
+RECORD_HEADER = struct.Struct("<BdI")
+TEXT_FLAG = 0x80
+
+
+class FrameDirection:
+    RECEIVED = 0
+    SENT = 1
+
+
+class FrameRecord:
+    def __init__(
+        self, direction: int, timestamp: float, data: Union[bytes, str]
+    ) -> None:
+        self.direction = direction
+        self.timestamp = timestamp
+        self.data = data
+
+    def __str__(self) -> str:
+        return (
+            f"FrameRecord[direction={self.direction}, timestamp={self.timestamp}, "
+            f"length={len(self.data)}]"
+        )
+
+
+class FrameRecorder:
+    """
+    Appends every frame sent or received by a websocket to a length-prefixed log,
+    which can be played back with a FrameReplayer
+    """
+
+    def __init__(self, path: Union[str, Path]) -> None:
+        self.path = Path(path)
+        self.frames = 0
+
+        new_file = not self.path.exists() or self.path.stat().st_size == 0
+        self._file: Union[BinaryIO, None] = open(self.path, "ab")
+        if new_file:
+            self._file.write(MAGIC)
+
+    def record_received(self, data: Union[bytes, str]) -> None:
+        self._write(FrameDirection.RECEIVED, data)
+
+    def record_sent(self, data: Union[bytes, str]) -> None:
+        self._write(FrameDirection.SENT, data)
+
+    def _write(self, direction: int, data: Union[bytes, str]) -> None:
+        if self._file is None:
+            return
+
+        # Test server frames are base64 text, flag them so they replay as text
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+            direction |= TEXT_FLAG
+
+        self._file.write(RECORD_HEADER.pack(direction, time.monotonic(), len(data)))
+        self._file.write(data)
+        self.frames += 1
+
+    def flush(self) -> None:
+        if self._file is not None:
+            self._file.flush()
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self) -> "FrameRecorder":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+
+class FrameReplayer:
+    """
+    Feeds a recording made by a FrameRecorder back through a RustWebsocket, so that
+    decoding and dispatch can be reproduced without a live server
+    """
+
+    def __init__(self, path: Union[str, Path]) -> None:
+        self.path = Path(path)
+
+    def __iter__(self) -> Iterator[FrameRecord]:
+        with open(self.path, "rb") as file:
+            if file.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{self.path} is not a frame recording")
+
+            while True:
+                header = file.read(RECORD_HEADER.size)
+                if len(header) < RECORD_HEADER.size:
+                    return
+
+                direction, timestamp, length = RECORD_HEADER.unpack(header)
+                data = file.read(length)
+                if len(data) < length:
+                    return
+
+                yield FrameRecord(
+                    direction & ~TEXT_FLAG,
+                    timestamp,
+                    data.decode("utf-8") if direction & TEXT_FLAG else data,
+                )
+
+    def received_frames(self) -> Iterator[FrameRecord]:
+        return (
+            record for record in self if record.direction == FrameDirection.RECEIVED
+        )
+
+    async def replay(self, websocket, realtime: bool = True, speed: float = 1.0) -> int:
+        """
+        Plays the received frames into the websocket as if they had come from the server
+
+        :param websocket: The RustWebsocket to feed
+        :param realtime: Whether to keep the recorded gaps between frames, or go as fast as possible
+        :param speed: How many times faster than real time to play, when realtime is set
+        :return int: The number of frames replayed
+        """
+        frames = 0
+        start: Union[float, None] = None
+        replay_start = time.monotonic()
+
+        for record in self.received_frames():
+            if realtime:
+                if start is None:
+                    start = record.timestamp
+
+                delay = (record.timestamp - start) / speed - (
+                    time.monotonic() - replay_start
+                )
+                if delay > 0:
+                    await asyncio.sleep(delay)
+
+            await websocket.process_frame(record.data)
+            frames += 1
+
+        # Wait for the handlers so that the replay has finished once this returns
+        await websocket.dispatcher.join()
+        return frames
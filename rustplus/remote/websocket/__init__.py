@@ -1 +1,4 @@
 from .ws import RustWebsocket
+from .lazy_message import LazyAppMessage, MessageKind
+from .dispatcher import Dispatcher, DispatchOptions, OverflowPolicy
+from .reconnect_options import ReconnectOptions
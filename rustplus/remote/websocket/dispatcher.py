@@ -0,0 +1,165 @@
+import asyncio
+import logging
+from typing import Any, Callable, Coroutine, Dict, List, Tuple, Union
+
+
+class OverflowPolicy:
+    """
+    What the dispatcher does with a new message when its queue is full.
+
+    BLOCK makes the websocket wait for room before reading its next frame, so
+    responses queued behind a slow handler are not read either, and requests time
+    out. With a dispatcher shared by a pool, one slow socket holds up every socket.
+    """
+
+    BLOCK = "block"
+    DROP_OLDEST = "drop_oldest"
+    DROP_NEWEST = "drop_newest"
+
+
+class DispatchOptions:
+    def __init__(
+        self,
+        workers: int = 4,
+        max_queue_size: int = 1024,
+        overflow_policy: str = OverflowPolicy.DROP_OLDEST,
+    ) -> None:
+        if workers < 1:
+            raise ValueError("At least one dispatch worker is required")
+
+        if max_queue_size < 1:
+            raise ValueError("The dispatch queue must hold at least one message")
+
+        if overflow_policy not in (
+            OverflowPolicy.BLOCK,
+            OverflowPolicy.DROP_OLDEST,
+            OverflowPolicy.DROP_NEWEST,
+        ):
+            raise ValueError(f"Unknown overflow policy: {overflow_policy}")
+
+        self.workers = workers
+        self.max_queue_size = max_queue_size
+        self.overflow_policy = overflow_policy
+
+
+class Dispatcher:
+    """
+    Runs message handlers on a fixed pool of worker tasks fed by a bounded queue,
+    rather than creating a new task for every frame that is received.
+
+    Handlers are run concurrently when there is more than one worker, so ordering
+    between messages is only guaranteed with a single worker.
+    """
+
+    def __init__(
+        self, options: Union[DispatchOptions, None] = None, name: str = "Dispatch"
+    ) -> None:
+        self.options: DispatchOptions = (
+            options if options is not None else DispatchOptions()
+        )
+        self.name = name
+        self.logger: logging.Logger = logging.getLogger("rustplus.py")
+
+        self._queue: Union[asyncio.Queue, None] = None
+        self._workers: List[asyncio.Task] = []
+
+        self.max_queue_depth = 0
+        self.processed_messages = 0
+        self.dropped_messages = 0
+        self.failed_messages = 0
+
+    @property
+    def running(self) -> bool:
+        return len(self._workers) > 0
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def start(self) -> None:
+        if self.running:
+            return
+
+        # Created here rather than in __init__ so that the queue belongs to the running loop
+        self._queue = asyncio.Queue(self.options.max_queue_size)
+        self._workers = [
+            asyncio.create_task(
+                self._work(), name=f"[RustPlus.py] {self.name} Worker {index}"
+            )
+            for index in range(self.options.workers)
+        ]
+
+    async def stop(self) -> None:
+        for worker in self._workers:
+            worker.cancel()
+
+        for worker in self._workers:
+            try:
+                await worker
+            except asyncio.CancelledError:
+                pass
+
+        self._workers = []
+        self._queue = None
+
+    async def submit(
+        self, coroutine_function: Callable[..., Coroutine], *args: Any
+    ) -> bool:
+        """
+        Queues coroutine_function(*args) to be run by a worker.
+
+        :return bool: Whether the message was queued, False if it was dropped
+        """
+        if not self.running:
+            self.start()
+
+        item = (coroutine_function, args)
+
+        if self._queue.full():
+            if self.options.overflow_policy == OverflowPolicy.DROP_NEWEST:
+                self.dropped_messages += 1
+                return False
+
+            if self.options.overflow_policy == OverflowPolicy.DROP_OLDEST:
+                self._queue.get_nowait()
+                self._queue.task_done()
+                self.dropped_messages += 1
+
+        await self._queue.put(item)
+        self.max_queue_depth = max(self.max_queue_depth, self._queue.qsize())
+        return True
+
+    async def join(self) -> None:
+        """
+        Waits until every queued message has been handled
+        """
+        if self._queue is not None:
+            await self._queue.join()
+
+    def get_metrics(self) -> Dict[str, int]:
+        return {
+            "queue_depth": self.queue_depth,
+            "max_queue_depth": self.max_queue_depth,
+            "processed_messages": self.processed_messages,
+            "dropped_messages": self.dropped_messages,
+            "failed_messages": self.failed_messages,
+        }
+
+    async def _work(self) -> None:
+        queue = self._queue
+
+        while True:
+            item: Tuple[Callable[..., Coroutine], Tuple] = await queue.get()
+            coroutine_function, args = item
+
+            try:
+                await coroutine_function(*args)
+            except Exception as e:
+                self.failed_messages += 1
+                self.logger.exception(
+                    "An Error occurred whilst handling the message from the server %s",
+                    e,
+                )
+            finally:
+                self.processed_messages += 1
+                queue.task_done()
@@ -0,0 +1,172 @@
+from typing import Dict, Iterator, Tuple, Type, Union
+
+import betterproto
+
+from ..rustplus_proto import (
+    AppMessage,
+    AppResponse,
+    AppBroadcast,
+    AppTeamChanged,
+    AppNewTeamMessage,
+    AppEntityChanged,
+    AppClanChanged,
+    AppNewClanMessage,
+    AppCameraRays,
+)
+
+RESPONSE_FIELD = 1
+BROADCAST_FIELD = 2
+RESPONSE_SEQ_FIELD = 1
+RESPONSE_ERROR_FIELD = 5
+
+WIRE_VARINT = 0
+WIRE_FIXED64 = 1
+WIRE_LENGTH_DELIMITED = 2
+WIRE_FIXED32 = 5
+
+
+class MessageKind:
+    """
+    The branch of an AppMessage that a frame carries.
+    """
+
+    RESPONSE = "response"
+    ERROR = "error"
+    TEAM_CHANGED = "team_changed"
+    TEAM_MESSAGE = "team_message"
+    ENTITY_CHANGED = "entity_changed"
+    CLAN_CHANGED = "clan_changed"
+    CLAN_MESSAGE = "clan_message"
+    CAMERA_RAYS = "camera_rays"
+    UNKNOWN = "unknown"
+
+
+BROADCAST_FIELDS: Dict[int, Tuple[str, Type[betterproto.Message]]] = {
+    4: (MessageKind.TEAM_CHANGED, AppTeamChanged),
+    5: (MessageKind.TEAM_MESSAGE, AppNewTeamMessage),
+    6: (MessageKind.ENTITY_CHANGED, AppEntityChanged),
+    7: (MessageKind.CLAN_CHANGED, AppClanChanged),
+    8: (MessageKind.CLAN_MESSAGE, AppNewClanMessage),
+    10: (MessageKind.CAMERA_RAYS, AppCameraRays),
+}
+
+
+def read_varint(data: memoryview, position: int) -> Tuple[int, int]:
+    result = 0
+    shift = 0
+    while True:
+        byte = data[position]
+        position += 1
+        result |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return result, position
+        shift += 7
+
+
+def iter_fields(
+    data: memoryview,
+) -> Iterator[Tuple[int, int, Union[int, memoryview]]]:
+    """
+    Walks the top level fields of a protobuf message without decoding them.
+    Length delimited values are returned as views into the original buffer.
+    """
+    position = 0
+    end = len(data)
+
+    while position < end:
+        key, position = read_varint(data, position)
+        number, wire_type = key >> 3, key & 7
+
+        if wire_type == WIRE_VARINT:
+            value, position = read_varint(data, position)
+        elif wire_type == WIRE_LENGTH_DELIMITED:
+            length, position = read_varint(data, position)
+            value = data[position : position + length]
+            position += length
+        elif wire_type == WIRE_FIXED64:
+            value = data[position : position + 8]
+            position += 8
+        elif wire_type == WIRE_FIXED32:
+            value = data[position : position + 4]
+            position += 4
+        else:
+            raise ValueError(f"Unsupported wire type {wire_type}")
+
+        yield number, wire_type, value
+
+
+class LazyAppMessage:
+    """
+    Drop-in replacement for AppMessage that only reads the field tags of a frame up
+    front. The branch that is present is decoded the first time it is accessed, so
+    large payloads such as camera rays and maps stay as raw bytes until needed.
+    """
+
+    def __init__(self, data: Union[bytes, bytearray, memoryview]) -> None:
+        self._data = memoryview(data)
+        self._response_data: Union[memoryview, None] = None
+        self._broadcast_data: Union[memoryview, None] = None
+        self._branch_data: Union[memoryview, None] = None
+        self._response: Union[AppResponse, None] = None
+        self._broadcast: Union[AppBroadcast, None] = None
+
+        self.seq: int = 0
+        self.kind: str = MessageKind.UNKNOWN
+
+        for number, wire_type, value in iter_fields(self._data):
+            if wire_type != WIRE_LENGTH_DELIMITED:
+                continue
+            if number == RESPONSE_FIELD:
+                self._response_data = value
+            elif number == BROADCAST_FIELD:
+                self._broadcast_data = value
+
+        if self._response_data is not None:
+            self.kind = MessageKind.RESPONSE
+            for number, wire_type, value in iter_fields(self._response_data):
+                if number == RESPONSE_SEQ_FIELD and wire_type == WIRE_VARINT:
+                    self.seq = value
+                elif number == RESPONSE_ERROR_FIELD:
+                    self.kind = MessageKind.ERROR
+
+        elif self._broadcast_data is not None:
+            for number, wire_type, value in iter_fields(self._broadcast_data):
+                if number in BROADCAST_FIELDS and wire_type == WIRE_LENGTH_DELIMITED:
+                    self.kind = BROADCAST_FIELDS[number][0]
+                    self._branch_data = value
+                    break
+
+    @property
+    def response(self) -> AppResponse:
+        if self._response is None:
+            self._response = AppResponse()
+            if self._response_data is not None:
+                self._response.parse(bytes(self._response_data))
+        return self._response
+
+    @property
+    def broadcast(self) -> AppBroadcast:
+        if self._broadcast is None:
+            self._broadcast = AppBroadcast()
+            if self._broadcast_data is not None:
+                self._broadcast.parse(bytes(self._broadcast_data))
+        return self._broadcast
+
+    def branch_data(self) -> Union[bytes, None]:
+        """
+        Returns the undecoded bytes of the broadcast branch carried by this frame
+        """
+        if self._branch_data is None:
+            return None
+        return bytes(self._branch_data)
+
+    def to_message(self) -> AppMessage:
+        message = AppMessage()
+        message.parse(bytes(self._data))
+        return message
+
+    def __bytes__(self) -> bytes:
+        return bytes(self._data)
+
+    def __str__(self) -> str:
+        return str(self.to_message())
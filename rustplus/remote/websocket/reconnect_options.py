@@ -0,0 +1,49 @@
+import math
+import random
+from typing import Union
+
+
+class ReconnectOptions:
+    def __init__(
+        self,
+        initial_delay: float = 1,
+        max_delay: float = 60,
+        multiplier: float = 2,
+        jitter: float = 0.5,
+        max_attempts: Union[int, None] = None,
+    ) -> None:
+        """
+        :param initial_delay: Seconds to wait before the first reconnect attempt
+        :param max_delay: The upper bound on the wait between attempts
+        :param multiplier: How much the wait grows after each failed attempt
+        :param jitter: The fraction by which each wait is randomly shortened or lengthened
+        :param max_attempts: How many attempts to make before giving up, None to retry forever
+        """
+        if initial_delay < 0 or max_delay < initial_delay:
+            raise ValueError("Reconnect delays must satisfy 0 <= initial <= max")
+
+        if not 0 <= jitter <= 1:
+            raise ValueError("Reconnect jitter must be between 0 and 1")
+
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        self.multiplier = multiplier
+        self.jitter = jitter
+        self.max_attempts = max_attempts
+
+        # The attempt after which the delay stops growing, as raising the multiplier
+        # to the power of every attempt of a long outage would overflow
+        self._max_exponent = (
+            math.ceil(math.log(max_delay / initial_delay, multiplier))
+            if initial_delay > 0 and multiplier > 1
+            else 0
+        )
+
+    def get_delay(self, attempt: int) -> float:
+        if self.multiplier > 1:
+            attempt = min(attempt, self._max_exponent)
+        delay = min(self.max_delay, self.initial_delay * self.multiplier**attempt)
+        return delay * (1 + random.uniform(-self.jitter, self.jitter))
+
+    def should_retry(self, attempt: int) -> bool:
+        return self.max_attempts is None or attempt < self.max_attempts
@@ -1,16 +1,24 @@
 import shlex
 import base64
 import betterproto
-from websockets.exceptions import InvalidURI, InvalidHandshake, ConnectionClosedError
+from websockets.exceptions import InvalidURI, InvalidHandshake, ConnectionClosed
 from websockets.legacy.client import WebSocketClientProtocol
 from websockets.client import connect
 from asyncio import TimeoutError, Task, AbstractEventLoop
-from typing import Union, Coroutine, Optional, Set, Dict
+from collections import OrderedDict
+from pathlib import Path
+from typing import Union, Coroutine, Optional, Set, Dict, Callable
 import logging
 import asyncio
+import time
 
+from .dispatcher import Dispatcher, DispatchOptions
+from .lazy_message import LazyAppMessage, MessageKind
+from .reconnect_options import ReconnectOptions
+from ..cache import ResponseCache
 from ..camera import CameraManager
 from ..proxy import ProxyValueGrabber
+from ..recording import FrameRecorder
 from ..rustplus_proto import AppMessage, AppRequest, AppError
 from ...commands import CommandOptions, ChatCommand, ChatCommandTime
 from ...events import (
@@ -22,13 +30,15 @@ from ...events import (
 from ...events.clan_info_event import ClanInfoEventPayload
 from ...exceptions import RequestError
 from ...identification import ServerDetails, RegisteredListener
+from ...metrics import Metrics
 from ...structs import RustChatMessage, RustTeamInfo, RustClanInfo
-from ...utils import YieldingEvent, convert_time
-from ...utils.utils import error_present
+from ...utils import convert_time
+from ...utils.utils import error_present, get_request_type
 
 
 class RustWebsocket:
     RESPONSE_TIMEOUT = 5
+    ABANDONED_SEQ_HISTORY = 1024
 
     def __init__(
         self,
@@ -37,6 +47,11 @@ class RustWebsocket:
         use_fp_proxy: bool,
         use_test_server: bool,
         debug: bool,
+        lazy_decoding: bool = False,
+        dispatch_options: Union[DispatchOptions, None] = None,
+        reconnect_options: Union[ReconnectOptions, None] = None,
+        dispatcher: Union[Dispatcher, None] = None,
+        metrics: Union[Metrics, None] = None,
     ) -> None:
         self.server_details: ServerDetails = server_details
         self.command_options: Union[CommandOptions, None] = command_options
@@ -46,12 +61,55 @@ class RustWebsocket:
         self.debug: bool = debug
         self.use_test_server: bool = use_test_server
         self.use_fp_proxy: bool = use_fp_proxy
+        self.lazy_decoding: bool = lazy_decoding
+        # A dispatcher passed in is shared with other websockets, so is not ours to stop
+        self._owns_dispatcher: bool = dispatcher is None
+        self.dispatcher: Dispatcher = (
+            dispatcher
+            if dispatcher is not None
+            else Dispatcher(
+                dispatch_options, f"{server_details.get_server_string()} Dispatch"
+            )
+        )
 
-        self.responses: Dict[int, YieldingEvent] = {}
+        self.reconnect_options: Union[ReconnectOptions, None] = reconnect_options
+        self.on_reconnect: Union[Callable[[], Coroutine], None] = None
+        # Called with every response to send_and_get, or None when it timed out, and
+        # with the replies to messages sent without waiting for a response
+        self.on_response: Union[Callable[[Union[AppMessage, None]], None], None] = None
+        self.recorder: Union[FrameRecorder, None] = None
+        self.response_cache: Union[ResponseCache, None] = None
+        self.metrics: Union[Metrics, None] = metrics
+        # Rate limiter waits by seq, recorded against the request type once it is sent
+        self._ratelimit_waits: Dict[int, float] = {}
+        self._reconnect_task: Union[Task, None] = None
+
+        self.responses: Dict[int, asyncio.Future] = {}
+        self._abandoned_seqs: OrderedDict[int, None] = OrderedDict()
+        # Messages sent without waiting, whose replies still go to on_response
+        self._unawaited_seqs: OrderedDict[int, None] = OrderedDict()
+        self.late_responses = 0
+        self.timed_out_requests = 0
         self.open = False
 
     async def connect(self) -> bool:
+        if not await self._open_connection():
+            return False
+
+        self.dispatcher.start()
+        self.task = asyncio.create_task(
+            self.run(), name="[RustPlus.py] Websocket Polling Task"
+        )
+
+        self.open = True
+
+        return True
 
+    async def _open_connection(self) -> bool:
+        # Fetched over HTTP, which would otherwise block the event loop
+        value = await asyncio.get_running_loop().run_in_executor(
+            None, ProxyValueGrabber.get_value
+        )
         address = (
             (
                 f"{'wss' if self.server_details.secure else 'ws'}://"
@@ -59,7 +117,7 @@ class RustWebsocket:
             )
             if not self.use_fp_proxy
             else f"wss://companion-rust.facepunch.com/game/{self.server_details.ip}/{self.server_details.port}"
-        ) + f"?v={ProxyValueGrabber.get_value()}"
+        ) + f"?v={value}"
 
         try:
             self.connection = await connect(
@@ -75,78 +133,252 @@ class RustWebsocket:
         if self.debug:
             self.logger.info("Websocket connection established to %s", address)
 
-        self.task = asyncio.create_task(
-            self.run(), name="[RustPlus.py] Websocket Polling Task"
-        )
-
-        self.open = True
-
         return True
 
     async def disconnect(self) -> None:
-        if self.task and self.connection:
-            self.task.cancel()
+        self.open = False
+
+        for task in (self.task, self._reconnect_task):
+            if task is None:
+                continue
+
+            task.cancel()
             try:
-                await self.task
+                await task
             except asyncio.CancelledError:
                 pass  # Ignore the cancellation error
 
-            self.task = None
+        self.task = None
+        self._reconnect_task = None
 
-            self.open = False
+        if self.connection is not None:
             await self.connection.close()
             self.connection = None
 
+        self.stop_recording()
+
+        if self._owns_dispatcher:
+            await self.dispatcher.stop()
+
     async def run(self) -> None:
         while self.open:
             try:
                 data = await self.connection.recv()
 
-                await self.run_coroutine_non_blocking(
-                    self.run_proto_event(data, self.server_details)
-                )
-
-                if self.use_test_server:
-                    data = base64.b64decode(data)
-
-                app_message = AppMessage()
-                app_message.parse(data)
-
-            except ConnectionClosedError as e:
+            except ConnectionClosed as e:
                 if self.debug:
                     self.logger.exception("Connection Interrupted: %s", e)
                 else:
                     self.logger.warning("Connection Interrupted: %s", e)
-                break
+
+                self.connection = None
+                self._fail_pending_responses("Connection Interrupted")
+
+                if self.reconnect_options is None or not await self._reconnect():
+                    self.open = False
+                    break
+
+                continue
 
             except Exception as e:
                 self.logger.exception(
-                    "An Error occurred whilst parsing the message from the server: %s",
+                    "An Error occurred whilst receiving the message from the server: %s",
                     e,
                 )
                 continue
 
-            try:
-                await self.run_coroutine_non_blocking(self.handle_message(app_message))
-            except Exception as e:
-                self.logger.exception(
-                    "An Error occurred whilst handling the message from the server %s",
-                    e,
+            if self.recorder is not None:
+                self.recorder.record_received(data)
+
+            await self.process_frame(data)
+
+    async def process_frame(self, data: Union[str, bytes]) -> None:
+        """
+        Decodes a frame received from the server and hands it to whatever acts on it
+        """
+        app_message = None
+        try:
+            frame = base64.b64decode(data) if self.use_test_server else data
+
+            if self.metrics is not None and self.metrics.enabled:
+                start = time.perf_counter()
+                app_message = self.decode_message(frame)
+                self.metrics.observe(
+                    Metrics.DECODE_TIME,
+                    self.get_message_kind(app_message),
+                    time.perf_counter() - start,
+                )
+            else:
+                app_message = self.decode_message(frame)
+
+        except Exception as e:
+            self.logger.exception(
+                "An Error occurred whilst parsing the message from the server: %s",
+                e,
+            )
+
+        kind = self.get_message_kind(app_message) if app_message is not None else None
+        handle = (
+            self._handle_message_timed
+            if self.metrics is not None and self.metrics.enabled
+            else self.handle_message
+        )
+
+        try:
+            if kind in (MessageKind.RESPONSE, MessageKind.ERROR):
+                # Resolving a pending request is cheap, so skip the queue. This is
+                # done before anything is submitted, as submitting can wait for room
+                await handle(app_message)
+        except Exception as e:
+            self.logger.exception(
+                "An Error occurred whilst handling the message from the server %s",
+                e,
+            )
+
+        try:
+            if ProtobufEventPayload.HANDLER_LIST.get_handlers(self.server_details):
+                await self.dispatcher.submit(
+                    self.run_proto_event, data, self.server_details
                 )
 
-    async def send_and_get(self, request: AppRequest) -> AppMessage:
-        if not await self.send_message(request):
-            message = AppMessage()
-            error = AppError()
-            error.error = "Message Failed to send"
-            message.response.seq = request.seq
-            message.response.error = error
-            return message
-        return await self.get_response(request.seq)
+            if (
+                kind is not None
+                and kind not in (MessageKind.RESPONSE, MessageKind.ERROR)
+                and self.has_handlers(kind, app_message)
+            ):
+                await self.dispatcher.submit(handle, app_message)
+        except Exception as e:
+            self.logger.exception(
+                "An Error occurred whilst handling the message from the server %s",
+                e,
+            )
+
+    async def _reconnect(self) -> bool:
+        attempt = 0
+
+        while self.reconnect_options.should_retry(attempt):
+            delay = self.reconnect_options.get_delay(attempt)
+            self.logger.info(
+                "Reconnecting to %s in %.2f seconds (attempt %d)",
+                self.server_details.get_server_string(),
+                delay,
+                attempt + 1,
+            )
+            await asyncio.sleep(delay)
+
+            if await self._open_connection():
+                self.logger.info(
+                    "Reconnected to %s", self.server_details.get_server_string()
+                )
+
+                if self.on_reconnect is not None:
+                    # Run separately as replaying will wait on responses that only
+                    # this polling task can receive
+                    self._reconnect_task = asyncio.create_task(
+                        self._run_reconnect_callback(),
+                        name="[RustPlus.py] Reconnect Replay Task",
+                    )
+                return True
+
+            attempt += 1
+
+        self.logger.warning(
+            "Giving up reconnecting to %s after %d attempts",
+            self.server_details.get_server_string(),
+            attempt,
+        )
+        return False
+
+    async def _run_reconnect_callback(self) -> None:
+        try:
+            await self.on_reconnect()
+        except Exception as e:
+            self.logger.exception("An Error occurred whilst replaying state: %s", e)
+
+    def _fail_pending_responses(self, reason: str) -> None:
+        # Resolve anything still waiting with an error so that callers fail fast
+        # instead of sitting out their timeout on a dead connection
+        for seq, future in list(self.responses.items()):
+            if not future.done():
+                future.set_result(self._create_error_message(seq, reason))
+        self.responses.clear()
+
+    @staticmethod
+    def _create_error_message(seq: int, reason: str) -> AppMessage:
+        message = AppMessage()
+        error = AppError()
+        error.error = reason
+        message.response.seq = seq
+        message.response.error = error
+        return message
+
+    def start_recording(self, path: Union[str, Path]) -> FrameRecorder:
+        """
+        Starts appending every frame sent and received to the given file
+        """
+        self.stop_recording()
+        self.recorder = FrameRecorder(path)
+        return self.recorder
+
+    def stop_recording(self) -> None:
+        if self.recorder is not None:
+            self.recorder.close()
+            self.recorder = None
+
+    def record_ratelimit_wait(self, seq: int, seconds: float) -> None:
+        if self.metrics is not None and self.metrics.enabled:
+            self._ratelimit_waits[seq] = seconds
+
+    async def send_and_get(
+        self, request: AppRequest, timeout: Optional[float] = None
+    ) -> Union[AppMessage, None]:
+        if self.metrics is not None and self.metrics.enabled:
+            return await self._send_and_get_timed(request, timeout)
+
+        future = self._register_response(request.seq)
+
+        if not await self.send_message(request, True):
+            self.responses.pop(request.seq, None)
+            return self._create_error_message(request.seq, "Message Failed to send")
+
+        response = await self.get_response(request.seq, timeout, future)
+        if self.on_response is not None:
+            self.on_response(response)
+        return response
+
+    async def _send_and_get_timed(
+        self, request: AppRequest, timeout: Optional[float]
+    ) -> Union[AppMessage, None]:
+        request_type = get_request_type(request)
+        future = self._register_response(request.seq)
+
+        start = time.perf_counter()
+        if not await self.send_message(request, True):
+            self.responses.pop(request.seq, None)
+            self.metrics.increment(Metrics.REQUEST_ERRORS, request_type)
+            return self._create_error_message(request.seq, "Message Failed to send")
+
+        response = await self.get_response(request.seq, timeout, future)
+
+        if response is None:
+            self.metrics.increment(Metrics.REQUEST_TIMEOUTS, request_type)
+        else:
+            self.metrics.observe(
+                Metrics.REQUEST_RTT, request_type, time.perf_counter() - start
+            )
+            if self.get_message_kind(response) == MessageKind.ERROR:
+                self.metrics.increment(Metrics.REQUEST_ERRORS, request_type)
+
+        if self.on_response is not None:
+            self.on_response(response)
+        return response
 
     async def send_message(
         self, request: AppRequest, ignore_response: bool = False
     ) -> bool:
+        # Taken before anything can fail, so that waits are never left behind
+        wait = self._ratelimit_waits.pop(request.seq, None)
+
         if self.connection is None:
             self.logger.warning("No Current Websocket Connection")
             return False
@@ -155,88 +387,154 @@ class RustWebsocket:
             self.logger.info(f"Sending Message with seq {request.seq}: {request}")
 
         if not ignore_response:
-            self.responses[request.seq] = YieldingEvent()
+            self._register_response(request.seq)
+        elif self.on_response is not None and request.seq not in self.responses:
+            self._unawaited_seqs[request.seq] = None
+            while len(self._unawaited_seqs) > self.ABANDONED_SEQ_HISTORY:
+                self._unawaited_seqs.popitem(last=False)
+
+        if wait is not None and self.metrics is not None:
+            self.metrics.observe(
+                Metrics.RATELIMIT_WAIT, get_request_type(request), wait
+            )
 
         try:
             if self.use_test_server:
-                await self.connection.send(
-                    base64.b64encode(bytes(request)).decode("utf-8")
-                )
+                data = base64.b64encode(bytes(request)).decode("utf-8")
             else:
-                await self.connection.send(bytes(request))
+                data = bytes(request)
+
+            if self.recorder is not None:
+                self.recorder.record_sent(data)
+
+            await self.connection.send(data)
         except Exception as err:
             self.logger.warning("WebSocket connection error: %s", err)
+            if not ignore_response:
+                self.responses.pop(request.seq, None)
             return False
 
         return True
 
-    async def get_response(self, seq: int) -> Union[AppMessage, None]:
-
-        response = await self.responses[seq].wait(timeout=self.RESPONSE_TIMEOUT)
-        del self.responses[seq]
-
-        return response
+    async def get_response(
+        self,
+        seq: int,
+        timeout: Optional[float] = None,
+        future: Optional[asyncio.Future] = None,
+    ) -> Union[AppMessage, None]:
+        """
+        :param future: The future registered for the seq, so that a response failed by the connection dropping before this is awaited is still returned as that error, rather than mistaken for a timeout
+        :return AppMessage: The response, or None if it timed out
+        """
+        if future is None:
+            future = self.responses.get(seq, None)
+            if future is None:
+                return None
 
-    async def handle_message(self, app_message: AppMessage) -> None:
-        if self.debug:
-            self.logger.info(
-                f"Received Message with seq {app_message.response.seq}: {app_message}"
+        try:
+            return await asyncio.wait_for(
+                future, self.RESPONSE_TIMEOUT if timeout is None else timeout
             )
+        except TimeoutError:
+            self.timed_out_requests += 1
+            self._abandon_response(seq)
+            return None
+        except asyncio.CancelledError:
+            self._abandon_response(seq)
+            raise
+        finally:
+            self.responses.pop(seq, None)
+
+    def _register_response(self, seq: int) -> asyncio.Future:
+        if seq not in self.responses:
+            self.responses[seq] = asyncio.get_running_loop().create_future()
+        return self.responses[seq]
+
+    def _abandon_response(self, seq: int) -> None:
+        # Remember the seq so that a reply arriving after the caller gave up can be
+        # counted as late rather than mistaken for an unsolicited message
+        self._abandoned_seqs[seq] = None
+        while len(self._abandoned_seqs) > self.ABANDONED_SEQ_HISTORY:
+            self._abandoned_seqs.popitem(last=False)
+
+    def _resolve_response(self, app_message: Union[AppMessage, LazyAppMessage]) -> bool:
+        # The response itself is left undecoded for the caller awaiting it
+        future = self.responses.pop(self.get_message_seq(app_message), None)
+        if future is None:
+            return False
 
-        if error_present(app_message):
+        if not future.done():
+            future.set_result(app_message)
+        return True
 
-            event: YieldingEvent = self.responses.get(app_message.response.seq, None)
-            if event is not None:
-                if self.debug:
-                    self.logger.info(
-                        f"Running Response Event With Error: {app_message}"
-                    )
+    def _check_unawaited_response(
+        self, app_message: Union[AppMessage, LazyAppMessage]
+    ) -> bool:
+        seq = self.get_message_seq(app_message)
+        if seq not in self._unawaited_seqs:
+            return False
 
-                event.set_with_value(app_message)
-            else:
-                raise RequestError(app_message.response.error.error)
+        del self._unawaited_seqs[seq]
+        if self.on_response is not None:
+            self.on_response(app_message)
+        return True
 
-        prefix = self.get_prefix(
-            str(app_message.broadcast.team_message.message.message)
-        )
+    def _check_late_response(self, seq: int) -> bool:
+        if seq not in self._abandoned_seqs:
+            return False
 
-        if prefix is not None:
-            # Command
+        del self._abandoned_seqs[seq]
+        self.late_responses += 1
 
-            if self.debug:
-                self.logger.info(f"Attempting to run Command: {app_message}")
+        if self.debug:
+            self.logger.info(f"Received Late Response with seq {seq}")
+
+        return True
 
-            message = RustChatMessage(app_message.broadcast.team_message.message)
+    def decode_message(self, data: bytes) -> Union[AppMessage, LazyAppMessage]:
+        if self.lazy_decoding:
+            return LazyAppMessage(data)
 
-            parts = shlex.split(message.message)
-            command = parts[0][len(prefix) :]
+        app_message = AppMessage()
+        app_message.parse(data)
+        return app_message
 
-            data = ChatCommand.REGISTERED_COMMANDS[self.server_details].get(
-                command, None
+    async def _handle_message_timed(
+        self, app_message: Union[AppMessage, LazyAppMessage]
+    ) -> None:
+        start = time.perf_counter()
+        try:
+            await self.handle_message(app_message)
+        finally:
+            self.metrics.observe(
+                Metrics.HANDLER_TIME,
+                self.get_message_kind(app_message),
+                time.perf_counter() - start,
             )
 
-            dao = ChatCommand(
-                message.name,
-                message.steam_id,
-                ChatCommandTime(
-                    convert_time(message.time),
-                    message.time,
-                ),
-                command,
-                parts[1:],
+    async def handle_message(
+        self, app_message: Union[AppMessage, LazyAppMessage]
+    ) -> None:
+        kind = self.get_message_kind(app_message)
+
+        if self.debug:
+            self.logger.info(
+                f"Received Message with seq {self.get_message_seq(app_message)}: {app_message}"
             )
 
-            if data is not None:
-                await data.coroutine(dao)
-            else:
-                for command_name, data in ChatCommand.REGISTERED_COMMANDS[
-                    self.server_details
-                ].items():
-                    if command in data.aliases or data.callable_func(command):
-                        await data.coroutine(dao)
-                        break
-
-        if self.is_entity_broadcast(app_message):
+        if kind == MessageKind.ERROR:
+            if self._resolve_response(app_message):
+                if self.debug:
+                    self.logger.info(
+                        f"Running Response Event With Error: {app_message}"
+                    )
+            elif self._check_unawaited_response(app_message):
+                # Nobody awaits a message sent without waiting, so its error is raised here
+                raise RequestError(app_message.response.error.error)
+            elif not self._check_late_response(self.get_message_seq(app_message)):
+                raise RequestError(app_message.response.error.error)
+
+        elif kind == MessageKind.ENTITY_CHANGED:
             # Entity Event
             if self.debug:
                 self.logger.info(f"Running Entity Event: {app_message}")
@@ -251,22 +549,29 @@ class RustWebsocket:
                     )
                 )
 
-        elif self.is_camera_broadcast(app_message):
+        elif kind == MessageKind.CAMERA_RAYS:
             # Pipe packet into Camera Manager
             if self.debug:
                 self.logger.info(f"Updating Camera Packet: {app_message}")
 
             if CameraManager.ACTIVE_INSTANCE is not None:
+                # Lazily decoded frames hand over the raw rays, which are only
+                # decoded if a frame is actually rendered
                 await CameraManager.ACTIVE_INSTANCE.add_packet(
-                    app_message.broadcast.camera_rays
+                    app_message.branch_data()
+                    if isinstance(app_message, LazyAppMessage)
+                    else app_message.broadcast.camera_rays
                 )
 
-        elif self.is_team_broadcast(app_message):
+        elif kind == MessageKind.TEAM_CHANGED:
             # Team Event
             if self.debug:
                 self.logger.info(f"Running Team Event: {app_message}")
 
             # This means that the team of the current player has changed
+            if self.response_cache is not None:
+                self.response_cache.invalidate(self.server_details, "get_team_info")
+
             handlers = TeamEventPayload.HANDLER_LIST.get_handlers(self.server_details)
             team_event = TeamEventPayload(
                 app_message.broadcast.team_changed.player_id,
@@ -275,12 +580,15 @@ class RustWebsocket:
             for handler in handlers:
                 await handler.get_coro()(team_event)
 
-        elif self.is_clan_broadcast(app_message):
+        elif kind == MessageKind.CLAN_CHANGED:
             # Clan Event
             if self.debug:
                 self.logger.info(f"Running Clan Event: {app_message}")
 
             # This means that the clan of the current player has changed
+            if self.response_cache is not None:
+                self.response_cache.invalidate(self.server_details, "get_clan_info")
+
             handlers = ClanInfoEventPayload.HANDLER_LIST.get_handlers(
                 self.server_details
             )
@@ -290,10 +598,13 @@ class RustWebsocket:
             for handler in handlers:
                 await handler.get_coro()(clan_event)
 
-        elif self.is_message(app_message) or self.is_clan_message(app_message):
+        elif kind in (MessageKind.TEAM_MESSAGE, MessageKind.CLAN_MESSAGE):
             # Chat message event
 
-            is_clan = self.is_clan_message(app_message)
+            is_clan = kind == MessageKind.CLAN_MESSAGE
+
+            if not is_clan:
+                await self.handle_command(app_message)
 
             if self.debug:
                 self.logger.info(
@@ -313,14 +624,101 @@ class RustWebsocket:
             for handler in handlers:
                 await handler.get_coro()(chat_event)
 
-        else:
+        elif kind == MessageKind.RESPONSE:
             # This means that it wasn't sent by the server and is a message from the server in response to an action
-            event: YieldingEvent = self.responses.get(app_message.response.seq, None)
-            if event is not None:
+            if self._resolve_response(app_message):
                 if self.debug:
                     self.logger.info(f"Running Response Event: {app_message}")
+            elif not self._check_unawaited_response(app_message):
+                self._check_late_response(self.get_message_seq(app_message))
+
+    async def handle_command(
+        self, app_message: Union[AppMessage, LazyAppMessage]
+    ) -> None:
+        prefix = self.get_prefix(
+            str(app_message.broadcast.team_message.message.message)
+        )
+
+        if prefix is None:
+            return
+
+        if self.debug:
+            self.logger.info(f"Attempting to run Command: {app_message}")
+
+        message = RustChatMessage(app_message.broadcast.team_message.message)
+
+        parts = shlex.split(message.message)
+        command = parts[0][len(prefix) :]
+
+        data = ChatCommand.REGISTERED_COMMANDS[self.server_details].get(command, None)
+
+        dao = ChatCommand(
+            message.name,
+            message.steam_id,
+            ChatCommandTime(
+                convert_time(message.time),
+                message.time,
+            ),
+            command,
+            parts[1:],
+        )
+
+        if data is not None:
+            await data.coroutine(dao)
+        else:
+            for command_name, data in ChatCommand.REGISTERED_COMMANDS[
+                self.server_details
+            ].items():
+                if command in data.aliases or data.callable_func(command):
+                    await data.coroutine(dao)
+                    break
+
+    def has_handlers(
+        self, kind: str, app_message: Union[AppMessage, LazyAppMessage]
+    ) -> bool:
+        """
+        Whether anything would act on a broadcast of the given kind, so that
+        broadcasts nobody listens to are never scheduled
+        """
+        if kind == MessageKind.ENTITY_CHANGED:
+            return bool(
+                EntityEventPayload.HANDLER_LIST.get_handlers(self.server_details).get(
+                    str(app_message.broadcast.entity_changed.entity_id)
+                )
+            )
+
+        if kind == MessageKind.CAMERA_RAYS:
+            return CameraManager.ACTIVE_INSTANCE is not None
+
+        if kind == MessageKind.TEAM_CHANGED:
+            if self._has_cached("get_team_info"):
+                return True
+            return bool(TeamEventPayload.HANDLER_LIST.get_handlers(self.server_details))
+
+        if kind == MessageKind.CLAN_CHANGED:
+            if self._has_cached("get_clan_info"):
+                return True
+            return bool(
+                ClanInfoEventPayload.HANDLER_LIST.get_handlers(self.server_details)
+            )
+
+        if kind in (MessageKind.TEAM_MESSAGE, MessageKind.CLAN_MESSAGE):
+            if ChatEventPayload.HANDLER_LIST.get_handlers(self.server_details):
+                return True
 
-                event.set_with_value(app_message)
+            return (
+                kind == MessageKind.TEAM_MESSAGE
+                and self.command_options is not None
+                and bool(ChatCommand.REGISTERED_COMMANDS.get(self.server_details))
+            )
+
+        return False
+
+    def _has_cached(self, method: str) -> bool:
+        # A broadcast that makes a cached response stale must reach handle_message
+        return self.response_cache is not None and self.response_cache.has(
+            self.server_details, method
+        )
 
     def get_prefix(self, message: str) -> Optional[str]:
 
@@ -342,6 +740,33 @@ class RustWebsocket:
         for handler in handlers:
             await handler.get_coro()(data)
 
+    @staticmethod
+    def get_message_seq(app_message: Union[AppMessage, LazyAppMessage]) -> int:
+        if isinstance(app_message, LazyAppMessage):
+            return app_message.seq
+        return app_message.response.seq
+
+    @staticmethod
+    def get_message_kind(app_message: Union[AppMessage, LazyAppMessage]) -> str:
+        if isinstance(app_message, LazyAppMessage):
+            return app_message.kind
+
+        if error_present(app_message):
+            return MessageKind.ERROR
+        if RustWebsocket.is_entity_broadcast(app_message):
+            return MessageKind.ENTITY_CHANGED
+        if RustWebsocket.is_camera_broadcast(app_message):
+            return MessageKind.CAMERA_RAYS
+        if RustWebsocket.is_team_broadcast(app_message):
+            return MessageKind.TEAM_CHANGED
+        if RustWebsocket.is_clan_broadcast(app_message):
+            return MessageKind.CLAN_CHANGED
+        if RustWebsocket.is_message(app_message):
+            return MessageKind.TEAM_MESSAGE
+        if RustWebsocket.is_clan_message(app_message):
+            return MessageKind.CLAN_MESSAGE
+        return MessageKind.RESPONSE
+
     @staticmethod
     def is_message(app_message: AppMessage) -> bool:
         return betterproto.serialized_on_wire(
@@ -0,0 +1,7 @@
+from .executor import RenderExecutor
+from .map_drawing import render_base_map, draw_map, draw_static_layers
+from .map_renderer import MapRenderer
+from .tiles import MapTiles
+from .icons import prewarm_icons
+from .grid import GridCache
+from .avatars import AvatarService
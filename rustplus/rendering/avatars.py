@@ -0,0 +1,190 @@
+import asyncio
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from pathlib import Path
+from typing import Dict, Tuple, Union
+
+import requests
+from PIL import Image
+from requests.adapters import HTTPAdapter
+
+from .icons import scale_icon
+from ..utils import atomic_write
+from ..utils.utils import process_avatar
+
+
+class AvatarService:
+    """
+    Downloads players' Steam avatars and turns them into the round icons drawn on
+    maps. Downloads share a pool of keep-alive connections and run on their own
+    threads, so they never block the event loop and several run at once. Finished
+    icons are kept in memory, and on disk if a directory is given, for ttl seconds.
+
+    The endpoint is a URL with a {steam_id} placeholder, so tests can point it at a
+    local server:
+
+    service = AvatarService(endpoint="http://127.0.0.1:8000/avatar/{steam_id}")
+    """
+
+    DEFAULT_ENDPOINT = "https://companion-rust.facepunch.com/api/avatar/{steam_id}"
+    AVATAR_SIZE = (100, 100)
+    BORDER_SIZE = 5
+
+    _DEFAULT: Union["AvatarService", None] = None
+
+    @classmethod
+    def default(cls) -> "AvatarService":
+        """
+        Returns the service shared by every socket that is not given one
+        """
+        if cls._DEFAULT is None:
+            cls._DEFAULT = cls()
+        return cls._DEFAULT
+
+    def __init__(
+        self,
+        endpoint: str = DEFAULT_ENDPOINT,
+        ttl: float = 3600,
+        max_entries: int = 256,
+        directory: Union[str, Path, None] = None,
+        max_connections: int = 8,
+        timeout: float = 10,
+    ) -> None:
+        """
+        :param endpoint: The URL avatars are downloaded from, with a {steam_id} placeholder
+        :param ttl: Seconds before a player's icon is downloaded again
+        :param max_entries: How many icons to keep in memory
+        :param directory: Where to keep icons on disk, nowhere by default
+        :param max_connections: How many downloads may run at once
+        :param timeout: Seconds to wait for a download
+        """
+        if "{steam_id}" not in endpoint:
+            raise ValueError("The endpoint must contain a {steam_id} placeholder")
+
+        self.endpoint = endpoint
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self.directory = Path(directory) if directory is not None else None
+        if self.directory is not None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+
+        self.logger: logging.Logger = logging.getLogger("rustplus.py")
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_connections)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.executor = ThreadPoolExecutor(max_connections, "[RustPlus.py] Avatar")
+
+        # (steam id, online[, scale]) -> (expiry, icon)
+        self._icons: OrderedDict[Tuple, Tuple[float, Image.Image]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._pending: Dict[Tuple[int, bool], asyncio.Future] = {}
+
+    async def get_icon(
+        self, steam_id: int, online: bool, scale: float = 1
+    ) -> Image.Image:
+        """
+        :param scale: The size to scale the icon to, for maps drawn below full size
+        :return Image: The player's round avatar, bordered by whether they are online. It is shared, so must not be drawn on
+        """
+        if scale != 1:
+            key = (steam_id, online, scale)
+            icon = self._get_cached(key)
+            if icon is None:
+                icon = scale_icon(await self.get_icon(steam_id, online), scale)
+                # Kept only as long as the icon it was scaled from
+                with self._lock:
+                    entry = self._icons.get((steam_id, online))
+                if entry is not None:
+                    self._store(key, icon, time.monotonic() + self.ttl - entry[0])
+            return icon
+
+        key = (steam_id, online)
+        icon = self._get_cached(key)
+        if icon is not None:
+            return icon
+
+        # Players asked for while already downloading wait on that download
+        pending = self._pending.get(key)
+        if pending is None:
+            pending = asyncio.ensure_future(
+                asyncio.get_running_loop().run_in_executor(
+                    self.executor, self._load, steam_id, online
+                )
+            )
+            self._pending[key] = pending
+            pending.add_done_callback(lambda _: self._pending.pop(key, None))
+
+        return await asyncio.shield(pending)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._icons.clear()
+
+    def close(self) -> None:
+        self.executor.shutdown(wait=False)
+        self.session.close()
+
+    def _get_cached(self, key: Tuple) -> Union[Image.Image, None]:
+        with self._lock:
+            entry = self._icons.get(key)
+            if entry is None:
+                return None
+
+            if entry[0] <= time.monotonic():
+                del self._icons[key]
+                return None
+
+            self._icons.move_to_end(key)
+            return entry[1]
+
+    def _store(self, key: Tuple, icon: Image.Image, age: float) -> None:
+        with self._lock:
+            self._icons[key] = (time.monotonic() + self.ttl - age, icon)
+            self._icons.move_to_end(key)
+            while len(self._icons) > self.max_entries:
+                self._icons.popitem(last=False)
+
+    def _load(self, steam_id: int, online: bool) -> Image.Image:
+        """
+        Runs in the executor, reading the icon from disk or downloading it
+        """
+        path = None
+        if self.directory is not None:
+            path = self.directory / f"{steam_id}-{int(online)}.png"
+            try:
+                age = time.time() - path.stat().st_mtime
+                if age < self.ttl:
+                    icon = Image.open(path).convert("RGBA")
+                    self._store((steam_id, online), icon, age)
+                    return icon
+            except (OSError, ValueError):
+                pass
+
+        response = self.session.get(
+            self.endpoint.format(steam_id=steam_id), timeout=self.timeout
+        )
+        response.raise_for_status()
+
+        avatar = (
+            Image.open(BytesIO(response.content))
+            .resize(self.AVATAR_SIZE, Image.LANCZOS)
+            .convert("RGBA")
+        )
+        icon = process_avatar(avatar, self.BORDER_SIZE, online)
+        self._store((steam_id, online), icon, 0)
+
+        if path is not None:
+            data = BytesIO()
+            icon.save(data, "PNG")
+            try:
+                atomic_write(path, data.getvalue())
+            except OSError as e:
+                self.logger.warning("Could not cache avatar %s: %s", steam_id, e)
+
+        return icon
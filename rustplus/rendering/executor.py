@@ -0,0 +1,90 @@
+import asyncio
+import functools
+import weakref
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Any, Callable, Union
+
+
+class RenderExecutor:
+    """
+    Runs image rendering off the event loop, so that drawing a map or camera frame
+    never holds up the websocket. At most max_concurrent renders run at once, and
+    the rest wait their turn without blocking anything.
+
+    Any concurrent.futures executor can be given. A ProcessPoolExecutor sidesteps
+    the GIL for map renders, whose inputs are pickled across to it, while camera
+    frames always render on a thread, as the ray parser's state lives in this process.
+    """
+
+    _DEFAULT: Union["RenderExecutor", None] = None
+
+    @classmethod
+    def default(cls) -> "RenderExecutor":
+        """
+        Returns the executor shared by every socket that is not given one
+        """
+        if cls._DEFAULT is None:
+            cls._DEFAULT = cls()
+        return cls._DEFAULT
+
+    def __init__(
+        self, executor: Union[Executor, None] = None, max_concurrent: int = 2
+    ) -> None:
+        """
+        :param executor: Where renders run, a thread pool of max_concurrent workers by default
+        :param max_concurrent: How many renders may run at once
+        """
+        if max_concurrent < 1:
+            raise ValueError("At least one render must be allowed at a time")
+
+        self.max_concurrent = max_concurrent
+        self._owns_executor = executor is None
+        self.executor: Executor = (
+            executor
+            if executor is not None
+            else ThreadPoolExecutor(max_concurrent, "[RustPlus.py] Render")
+        )
+        # asyncio primitives belong to one loop, so each loop gets its own bound
+        self._semaphores: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+    async def run(self, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """
+        Calls func in the executor, once fewer than max_concurrent renders are running
+        """
+        return await self._run(self.executor, func, *args, **kwargs)
+
+    async def run_in_thread(
+        self, func: Callable[..., Any], *args: Any, **kwargs: Any
+    ) -> Any:
+        """
+        Like run, but for functions that must share this process's memory. They use
+        the executor if it is a thread pool, and the loop's default executor if not.
+        """
+        executor = (
+            self.executor if isinstance(self.executor, ThreadPoolExecutor) else None
+        )
+        return await self._run(executor, func, *args, **kwargs)
+
+    async def _run(
+        self,
+        executor: Union[Executor, None],
+        func: Callable[..., Any],
+        *args: Any,
+        **kwargs: Any,
+    ) -> Any:
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = self._semaphores[loop] = asyncio.Semaphore(self.max_concurrent)
+
+        async with semaphore:
+            return await loop.run_in_executor(
+                executor, functools.partial(func, *args, **kwargs)
+            )
+
+    def shutdown(self) -> None:
+        """
+        Stops the executor, if it was created by this RenderExecutor
+        """
+        if self._owns_executor:
+            self.executor.shutdown(wait=False)
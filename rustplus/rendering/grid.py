@@ -0,0 +1,138 @@
+import logging
+import mmap
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Tuple, Union
+
+from PIL import Image
+
+from ..utils import atomic_write
+from ..utils.utils import generate_grid_mask
+
+
+class GridCache:
+    """
+    Keeps the grid overlays drawn onto maps, which only depend on the map size, text
+    size, colour and the size the map is drawn at. The most recently used overlays
+    are kept in memory, up to max_bytes. Given a directory, the grid masks are also
+    kept on disk, so that other processes and later runs skip drawing them. The
+    masks carry no colour, so each size is drawn once whatever colours it is used in.
+
+    GridCache.set_default(GridCache(directory="grids"))
+    """
+
+    MASK_SUFFIX = ".grid"
+
+    _DEFAULT: Union["GridCache", None] = None
+
+    @classmethod
+    def default(cls) -> "GridCache":
+        """
+        Returns the cache get_map draws grids from, in memory only unless set_default is used
+        """
+        if cls._DEFAULT is None:
+            cls._DEFAULT = cls()
+        return cls._DEFAULT
+
+    @classmethod
+    def set_default(cls, cache: "GridCache") -> None:
+        cls._DEFAULT = cache
+
+    def __init__(
+        self,
+        directory: Union[str, Path, None] = None,
+        max_bytes: int = 96 * 1024 * 1024,
+    ) -> None:
+        """
+        :param directory: Where to keep the grid masks on disk, nowhere by default
+        :param max_bytes: How much memory the overlays may take, each is 4 bytes per pixel. The latest is kept even if larger
+        """
+        if max_bytes <= 0:
+            raise ValueError("The cache size must be positive")
+
+        self.directory = Path(directory) if directory is not None else None
+        if self.directory is not None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.logger: logging.Logger = logging.getLogger("rustplus.py")
+        self._overlays: OrderedDict[Tuple[int, int, str, int], Image.Image] = (
+            OrderedDict()
+        )
+        # Renders run on several threads at once
+        self._lock = threading.Lock()
+
+    def get(
+        self,
+        map_size: int,
+        text_size: int = 20,
+        color: str = "black",
+        size: Union[int, None] = None,
+    ) -> Image.Image:
+        """
+        :param size: The width and height of the overlay in pixels, map_size by default
+        :return Image: The RGBA grid overlay, which is shared so must not be drawn on
+        """
+        if size is None:
+            size = map_size
+
+        key = (map_size, text_size, color, size)
+        with self._lock:
+            overlay = self._overlays.get(key)
+            if overlay is not None:
+                self._overlays.move_to_end(key)
+                return overlay
+
+        overlay = Image.new("RGBA", (size, size), color)
+        overlay.putalpha(self._get_mask(map_size, text_size, size))
+
+        with self._lock:
+            if key not in self._overlays:
+                self._overlays[key] = overlay
+                self.current_bytes += self._get_bytes(overlay)
+            else:
+                self._overlays.move_to_end(key)
+            while self.current_bytes > self.max_bytes and len(self._overlays) > 1:
+                _, evicted = self._overlays.popitem(last=False)
+                self.current_bytes -= self._get_bytes(evicted)
+
+        return overlay
+
+    def clear(self) -> None:
+        with self._lock:
+            self._overlays.clear()
+            self.current_bytes = 0
+
+    @staticmethod
+    def _get_bytes(overlay: Image.Image) -> int:
+        return overlay.size[0] * overlay.size[1] * 4
+
+    def _get_mask(self, map_size: int, text_size: int, size: int) -> Image.Image:
+        if self.directory is None:
+            return generate_grid_mask(map_size, text_size, size=size)
+
+        name = f"{map_size}-{text_size}"
+        if size != map_size:
+            name += f"-{size}"
+        path = self.directory / f"{name}{self.MASK_SUFFIX}"
+        try:
+            with open(path, "rb") as file:
+                data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (FileNotFoundError, ValueError):  # ValueError: empty file
+            data = None
+
+        if data is not None:
+            with data:
+                if len(data) == size * size:
+                    return Image.frombytes("L", (size, size), data)
+
+        mask = generate_grid_mask(map_size, text_size, size=size)
+
+        try:
+            atomic_write(path, mask.tobytes())
+        except OSError as e:
+            self.logger.warning("Could not cache grid %s: %s", path.name, e)
+
+        return mask
@@ -0,0 +1,131 @@
+import functools
+import math
+from typing import Iterable, Union
+
+from PIL import Image
+
+from ..utils.utils import (
+    MARKER_ICONS,
+    MONUMENT_ICONS,
+    convert_marker,
+    get_monument_icon_file,
+    load_icon,
+)
+
+# Marker rotations are rounded to this many degrees, so that each icon has at
+# most 72 variants to cache
+ANGLE_STEP = 5
+# Markers drawn the same way whatever their rotation, cached once
+UNROTATED_MARKERS = {6}
+# Scales are rounded to this many steps per doubling, within about 2% of the
+# size asked for, so that nearby output sizes and tile zooms share icons
+SCALE_STEPS = 16
+# How many scaled icons of each kind are kept
+SCALED_CACHE_SIZE = 512
+
+# The icons returned here are shared, so they must only be pasted from, never drawn on.
+# Full size icons are few and slow to rasterize, so are kept for good. Icons for maps
+# drawn below full size are scaled from them, and kept in bounded caches
+
+
+def quantize_angle(angle: float) -> int:
+    return int(round(angle / ANGLE_STEP) * ANGLE_STEP) % 360
+
+
+def quantize_scale(scale: float) -> float:
+    if scale == 1:
+        return 1
+    return 2 ** (round(math.log2(scale) * SCALE_STEPS) / SCALE_STEPS)
+
+
+def scale_icon(icon: Image.Image, scale: float) -> Image.Image:
+    """
+    :return Image: The icon resized by scale, or the icon itself at a scale of 1
+    """
+    if scale == 1:
+        return icon
+
+    return icon.resize(
+        (max(1, round(icon.size[0] * scale)), max(1, round(icon.size[1] * scale))),
+        Image.LANCZOS,
+    )
+
+
+def get_monument_icon(token: str, scale: float = 1) -> Image.Image:
+    scale = quantize_scale(scale)
+    if scale == 1:
+        return _load_icon(get_monument_icon_file(token))
+    return _scale_icon(get_monument_icon_file(token), scale)
+
+
+def get_marker_icon(marker_type: int, angle: float, scale: float = 1) -> Image.Image:
+    angle = 0 if marker_type in UNROTATED_MARKERS else quantize_angle(angle)
+    scale = quantize_scale(scale)
+    if scale == 1:
+        return _rotate_marker(marker_type, angle)
+    return _scale_marker(marker_type, angle, scale)
+
+
+def get_vending_machine_icon(scale: float = 1) -> Image.Image:
+    scale = quantize_scale(scale)
+    if scale == 1:
+        return _load_vending_machine()
+    return _scale_vending_machine(scale)
+
+
+@functools.lru_cache(maxsize=None)
+def _load_vending_machine() -> Image.Image:
+    return load_icon("vending_machine.png").resize((100, 100))
+
+
+@functools.lru_cache(maxsize=SCALED_CACHE_SIZE)
+def _scale_vending_machine(scale: float) -> Image.Image:
+    return scale_icon(_load_vending_machine(), scale)
+
+
+@functools.lru_cache(maxsize=None)
+def _load_icon(file_name: str) -> Image.Image:
+    return load_icon(file_name)
+
+
+@functools.lru_cache(maxsize=SCALED_CACHE_SIZE)
+def _scale_icon(file_name: str, scale: float) -> Image.Image:
+    return scale_icon(_load_icon(file_name), scale)
+
+
+@functools.lru_cache(maxsize=None)
+def _rotate_marker(marker_type: int, angle: int) -> Image.Image:
+    return convert_marker(marker_type, angle)
+
+
+@functools.lru_cache(maxsize=SCALED_CACHE_SIZE)
+def _scale_marker(marker_type: int, angle: int, scale: float) -> Image.Image:
+    return scale_icon(_rotate_marker(marker_type, angle), scale)
+
+
+def prewarm_icons(
+    marker_angles: Union[Iterable[float], None] = range(0, 360, ANGLE_STEP)
+) -> None:
+    """
+    Rasterizes every monument icon and, unless marker_angles is None, every marker
+    at the given angles. This takes a second or two, so call it at startup rather
+    than on the first map render. For a ProcessPoolExecutor, pass it as the
+    initializer so that every worker is warmed:
+
+    RenderExecutor(ProcessPoolExecutor(2, initializer=prewarm_icons))
+
+    :param marker_angles: The marker rotations to prepare, every one by default
+    """
+    for file_name in set(MONUMENT_ICONS.values()) | {
+        "Swamp.svg",
+        "Underwater_Lab.svg",
+        "icon.png",
+    }:
+        _load_icon(file_name)
+
+    _load_vending_machine()
+
+    if marker_angles is not None:
+        for angle in marker_angles:
+            for marker_type in MARKER_ICONS:
+                get_marker_icon(marker_type, angle)
@@ -0,0 +1,362 @@
+import asyncio
+import logging
+import math
+from collections import Counter
+from io import BytesIO
+from typing import Any, Callable, Dict, List, Tuple, Union
+
+from PIL import Image
+
+from ..structs import RustError, RustMarker, RustTeamMember
+from ..structs.rust_map import RustMonument
+from ..utils import format_coord
+from .grid import GridCache
+from .icons import (
+    get_marker_icon,
+    get_monument_icon,
+    get_vending_machine_icon,
+    scale_icon,
+)
+
+# These take and return plain values only, so they can run in another process.
+# Maps are laid out in game units, one pixel per metre, and maps drawn smaller
+# scale every icon and position down by the same factor
+
+# An icon, and the top left corner to paste it at
+Sprite = Tuple[Image.Image, Tuple[int, int]]
+# left, top, right, bottom
+Box = Tuple[int, int, int, int]
+
+
+def render_base_map(
+    jpg_image: bytes,
+    width: int,
+    height: int,
+    map_size: int,
+    size: Union[int, None] = None,
+) -> Image.Image:
+    """
+    Decodes the map sent by the server, cuts off the ocean margin and scales it to
+    the size of the map in game units, or to size
+
+    :param size: The width and height of the map in pixels, map_size by default
+    :return Image: The map, in RGB
+    """
+    if size is None:
+        size = map_size
+
+    output = Image.open(BytesIO(jpg_image))
+    if width > 1000 and height > 1000:
+        # A JPEG can be decoded at 1/2, 1/4 or 1/8 of its size for much less work,
+        # which is used while the cropped map would still cover the requested size
+        output.draft(
+            "RGB",
+            (
+                math.ceil(size * width / (width - 1000)),
+                math.ceil(size * height / (height - 1000)),
+            ),
+        )
+    ratio = output.size[0] / width
+    output = output.crop(
+        tuple(round(edge * ratio) for edge in (500, 500, height - 500, width - 500))
+    )
+    return output.resize((size, size), Image.LANCZOS)
+
+
+def scale_position(position: Tuple[int, int], scale: float) -> Tuple[int, int]:
+    if scale == 1:
+        return position
+    return round(position[0] * scale), round(position[1] * scale)
+
+
+def draw_map(
+    base: Image.Image,
+    map_size: int,
+    monuments: List[RustMonument],
+    map_markers: List[Tuple[int, float, float, float]],
+    avatars: List[Sprite],
+    add_icons: bool,
+    add_events: bool,
+    add_vending_machines: bool,
+    add_grid: bool,
+    override_images: Dict[str, Image.Image],
+) -> Image.Image:
+    """
+    Draws the requested overlays onto a copy of the base map
+
+    :param base: The base map, at the size the map is drawn at
+    :param map_markers: The type, x, y and rotation of each marker, as betterproto enums do not pickle
+    :param avatars: Each team member's avatar, with where to paste it, at the base map's scale
+    :return Image: The finished map, in RGBA
+    """
+    output = draw_static_layers(
+        base, map_size, monuments, add_icons, add_grid, override_images
+    )
+
+    sprites = get_marker_sprites(
+        map_size,
+        map_markers,
+        add_events,
+        add_vending_machines,
+        base.size[0] / map_size,
+    )
+    paste_sprites(output, sprites + avatars)
+
+    return output
+
+
+def draw_static_layers(
+    base: Image.Image,
+    map_size: int,
+    monuments: List[RustMonument],
+    add_icons: bool,
+    add_grid: bool,
+    override_images: Dict[str, Image.Image],
+) -> Image.Image:
+    """
+    Draws the overlays that only change when the server wipes onto a copy of the base map
+
+    :param base: The base map, at the size the map is drawn at
+    :return Image: The map with the grid and monument icons, in RGBA
+    """
+    output = base.convert("RGBA")
+    size = output.size[0]
+    scale = size / map_size
+
+    if add_grid:
+        grid = GridCache.default().get(map_size, size=size)
+        output.paste(grid, scale_position((5, 5), scale), grid)
+
+    if add_icons:
+        paste_sprites(
+            output, get_monument_sprites(map_size, monuments, override_images, scale)
+        )
+
+    return output
+
+
+def get_monument_sprites(
+    map_size: int,
+    monuments: List[RustMonument],
+    override_images: Dict[str, Image.Image],
+    scale: float = 1,
+) -> List[Sprite]:
+    """
+    :param scale: The size the map is drawn at, as a fraction of map_size
+    :return List[Sprite]: The icons to draw for the monuments, with where to paste them
+    """
+    sprites = []
+
+    for monument in monuments:
+        if str(monument.token) == "DungeonBase":
+            continue
+        if "underwater-lab-base" in str(monument.token):
+            # An underwater lab's interior modules (moonpools, etc.) are
+            # reported as separate markers next to the lab; they aren't
+            # standalone monuments, so don't draw them.
+            continue
+
+        if monument.token in override_images:
+            icon = scale_icon(override_images[monument.token].resize((150, 150)), scale)
+        else:
+            icon = get_monument_icon(monument.token, scale)
+
+        sprites.append(
+            (
+                icon,
+                scale_position(
+                    format_coord(int(monument.x), int(monument.y), map_size), scale
+                ),
+            )
+        )
+
+    return sprites
+
+
+def get_marker_sprites(
+    map_size: int,
+    map_markers: List[Tuple[int, float, float, float]],
+    add_events: bool,
+    add_vending_machines: bool,
+    scale: float = 1,
+) -> List[Sprite]:
+    """
+    :param map_markers: The type, x, y and rotation of each marker
+    :param scale: The size the map is drawn at, as a fraction of map_size
+    :return List[Sprite]: The icons to draw for the markers, with where to paste them, in drawing order
+    """
+    sprites = []
+
+    if add_vending_machines:
+        vending_machine = get_vending_machine_icon(scale)
+
+    for marker_type, x, y, rotation in map_markers:
+        if add_events:
+            if marker_type in RustMarker.Events:
+                icon = get_marker_icon(marker_type, rotation, scale)
+                if marker_type == 6:
+                    y = min(max(y, 0), map_size)
+                    x = min(max(x, 0), map_size - 75 if x > map_size else x)
+                    position = (int(x), map_size - int(y))
+                else:
+                    position = format_coord(int(x), int(y), map_size)
+                sprites.append((icon, scale_position(position, scale)))
+
+        if add_vending_machines and marker_type == 3:
+            sprites.append(
+                (
+                    vending_machine,
+                    scale_position((int(x) - 50, map_size - int(y) - 50), scale),
+                ),
+            )
+
+    return sprites
+
+
+def get_sprite_box(sprite: Sprite) -> Box:
+    icon, position = sprite
+    return (
+        position[0],
+        position[1],
+        position[0] + icon.size[0],
+        position[1] + icon.size[1],
+    )
+
+
+def boxes_overlap(a: Box, b: Box) -> bool:
+    return a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]
+
+
+def paste_sprites(
+    image: Image.Image, sprites: List[Sprite], origin: Tuple[int, int] = (0, 0)
+) -> None:
+    """
+    Pastes the sprites that overlap image, in order
+
+    :param origin: Where the top left corner of image is on the map
+    """
+    box = origin + (origin[0] + image.size[0], origin[1] + image.size[1])
+    for icon, position in sprites:
+        if boxes_overlap(box, get_sprite_box((icon, position))):
+            image.paste(icon, (position[0] - origin[0], position[1] - origin[1]), icon)
+
+
+def get_changed_boxes(
+    old: List[Sprite], new: List[Sprite], size: Tuple[int, int]
+) -> List[Box]:
+    """
+    :param size: The size of the map the sprites are drawn on
+    :return List[Box]: Where sprites appeared, moved or disappeared between old and new, within the map
+    """
+
+    # Icons are cached, so a sprite that has not changed is the same icon in the
+    # same place. Both lists are alive, so the ids cannot have been reused
+    def key(sprite: Sprite) -> Tuple[int, Tuple[int, int]]:
+        return id(sprite[0]), sprite[1]
+
+    old_keys = Counter(key(sprite) for sprite in old)
+    new_keys = Counter(key(sprite) for sprite in new)
+    changed = (old_keys - new_keys) + (new_keys - old_keys)
+
+    boxes = []
+    for sprite in old + new:
+        sprite_key = key(sprite)
+        if changed[sprite_key] <= 0:
+            continue
+        changed[sprite_key] = 0
+
+        left, top, right, bottom = get_sprite_box(sprite)
+        box = (max(left, 0), max(top, 0), min(right, size[0]), min(bottom, size[1]))
+        if box[0] < box[2] and box[1] < box[3]:
+            boxes.append(box)
+
+    return boxes
+
+
+# The helpers below run on the event loop rather than in the render executor, and
+# are shared by get_map, MapRenderer and MapTiles
+
+
+async def request_map_data(
+    rust_socket,
+    add_markers: bool,
+    add_team_positions: bool,
+    timeout: Union[float, None],
+    add_map_info: bool = False,
+) -> Union[Dict[str, Any], RustError]:
+    """
+    Requests everything a map is drawn from at once
+
+    :param rust_socket: The RustSocket to request the data with
+    :param add_markers: To request the map markers, for events and vending machines
+    :param add_team_positions: To request the team info
+    :param add_map_info: To request the map itself too
+    :return Dict[str, Any]: The responses by method name, or the first error
+    """
+    calls = {"get_info": rust_socket.get_info}
+    if add_map_info:
+        calls["get_map_info"] = rust_socket.get_map_info
+    if add_markers:
+        calls["get_markers"] = rust_socket.get_markers
+    if add_team_positions:
+        calls["get_team_info"] = rust_socket.get_team_info
+
+    results = await rust_socket.request_together(calls, timeout)
+    for result in results.values():
+        if isinstance(result, RustError):
+            return result
+
+    return results
+
+
+async def get_avatar_sprites(
+    avatar_service,
+    members: List[RustTeamMember],
+    map_size: int,
+    scale: float = 1,
+) -> List[Sprite]:
+    """
+    Fetches the avatars of the members that are alive, at once
+
+    :param avatar_service: The AvatarService to fetch the avatars with
+    :return List[Sprite]: The avatars placed at their members' positions. One that
+    could not be fetched is logged and left out, rather than costing the whole map
+    """
+    members = [member for member in members if member.is_alive]
+    avatars = await asyncio.gather(
+        *(
+            avatar_service.get_icon(member.steam_id, member.is_online, scale)
+            for member in members
+        ),
+        return_exceptions=True,
+    )
+
+    sprites = []
+    for member, avatar in zip(members, avatars):
+        if isinstance(avatar, Exception):
+            logging.getLogger("rustplus.py").warning(
+                f"Could not fetch the avatar of {member.steam_id}: {avatar}"
+            )
+            continue
+
+        position = format_coord(int(member.x), int(member.y), map_size)
+        sprites.append((avatar, scale_position(position, scale)))
+
+    return sprites
+
+
+async def open_map_image(
+    render_executor, method: str, function: Callable[..., Image.Image], *args
+) -> Union[Image.Image, RustError]:
+    """
+    Decodes the map sent by the server in the render executor
+
+    :param method: The name the error is reported under
+    :param function: Decodes the map, e.g. render_base_map
+    :return Image: The decoded map, or an error if the server sent a broken image
+    """
+    try:
+        return await render_executor.run(function, *args)
+    except Exception as e:
+        logging.getLogger("rustplus.py").error(f"Error opening image: {e}")
+        return RustError(method, str(e))
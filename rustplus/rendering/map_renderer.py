@@ -0,0 +1,212 @@
+import asyncio
+import logging
+from typing import Dict, List, Optional, Union
+
+from PIL import Image
+
+from .map_drawing import (
+    Box,
+    Sprite,
+    draw_static_layers,
+    get_avatar_sprites,
+    get_changed_boxes,
+    get_marker_sprites,
+    open_map_image,
+    paste_sprites,
+    render_base_map,
+    request_map_data,
+)
+from ..remote.cache import MapCache
+from ..structs import RustError, RustInfo
+
+
+class MapRenderer:
+    """
+    Renders a server's map over and over, e.g. for a live map posted every minute.
+    The layers that only change on wipe (terrain, grid and monuments) are drawn once
+    and kept. Each render then only redraws the regions around markers and players
+    that appeared, moved or disappeared since the last one.
+
+    renderer = MapRenderer(socket, add_grid=True)
+    image = await renderer.render()
+    """
+
+    def __init__(
+        self,
+        rust_socket,
+        add_icons: bool = True,
+        add_events: bool = True,
+        add_vending_machines: bool = True,
+        add_team_positions: bool = True,
+        add_grid: bool = True,
+        override_images: Union[Dict[str, Image.Image], None] = None,
+        size: Union[int, None] = None,
+    ) -> None:
+        """
+        :param rust_socket: The RustSocket to request the map data with
+        :param add_icons: To add the monument icons
+        :param add_events: To add the Event icons
+        :param add_vending_machines: To add the vending icons
+        :param add_team_positions: To add the team positions
+        :param add_grid: To add the grid to the map
+        :param override_images: To override the images pre-supplied with RustPlus.py
+        :param size: The width and height of the image in pixels, one per metre of the map by default
+        """
+        self.rust_socket = rust_socket
+        self.add_icons = add_icons
+        self.add_events = add_events
+        self.add_vending_machines = add_vending_machines
+        self.add_team_positions = add_team_positions
+        self.add_grid = add_grid
+        self.override_images = override_images if override_images is not None else {}
+        self.size = size
+        self.logger: logging.Logger = logging.getLogger("rustplus.py")
+
+        self._static_key: Union[str, None] = None
+        self._static: Union[Image.Image, None] = None
+        self._frame: Union[Image.Image, None] = None
+        self._sprites: List[Sprite] = []
+        # The regions the last render redrew, in pixels of the image
+        self.dirty_boxes: List[Box] = []
+        self._lock = asyncio.Lock()
+
+    def invalidate(self) -> None:
+        """
+        Makes the next render start again from nothing
+        """
+        self._static_key = None
+        self._static = None
+        self._frame = None
+        self._sprites = []
+
+    async def render(
+        self, timeout: Optional[float] = None
+    ) -> Union[Image.Image, RustError]:
+        """
+        :param timeout: Seconds to wait for each response, defaults to RustWebsocket.RESPONSE_TIMEOUT
+        :return Image: The map as it is now, in RGBA
+        """
+        async with self._lock:
+            socket = self.rust_socket
+            results = await request_map_data(
+                socket,
+                self.add_events or self.add_vending_machines,
+                self.add_team_positions,
+                timeout,
+            )
+            if isinstance(results, RustError):
+                return results
+
+            server_info: RustInfo = results["get_info"]
+            map_size = server_info.size
+            scale = self.size / map_size if self.size is not None else 1
+
+            avatars = None
+            if self.add_team_positions:
+                avatars = asyncio.ensure_future(
+                    get_avatar_sprites(
+                        socket.avatar_service,
+                        results["get_team_info"].members,
+                        map_size,
+                        scale,
+                    )
+                )
+
+            key = MapCache.get_key(
+                socket.server_details.get_server_string(), server_info
+            )
+            full = key != self._static_key
+            if full:
+                error = await self._build_static(server_info, key, timeout)
+                if error is not None:
+                    if avatars is not None:
+                        avatars.cancel()
+                    return error
+
+            sprites = get_marker_sprites(
+                map_size,
+                [
+                    (int(marker.type), marker.x, marker.y, marker.rotation)
+                    for marker in results.get("get_markers", [])
+                ],
+                self.add_events,
+                self.add_vending_machines,
+                scale,
+            )
+
+            if avatars is not None:
+                sprites += await avatars
+
+            return await socket.render_executor.run_in_thread(
+                self._compose, full, sprites
+            )
+
+    async def _build_static(
+        self, server_info: RustInfo, key: str, timeout: Optional[float]
+    ) -> Union[RustError, None]:
+        socket = self.rust_socket
+        map_packet = await socket.get_map_info(timeout)
+        if isinstance(map_packet, RustError):
+            return map_packet
+
+        base = (
+            await socket.render_executor.run_in_thread(
+                socket.map_cache.get_base_image, key, self.size
+            )
+            if socket.map_cache is not None
+            else None
+        )
+        if base is None:
+            base = await open_map_image(
+                socket.render_executor,
+                "render",
+                render_base_map,
+                map_packet.jpg_image,
+                map_packet.width,
+                map_packet.height,
+                server_info.size,
+                self.size,
+            )
+            if isinstance(base, RustError):
+                return base
+
+            if socket.map_cache is not None:
+                await socket.render_executor.run_in_thread(
+                    socket.map_cache.set_base_image, key, base, self.size
+                )
+
+        self._static = await socket.render_executor.run(
+            draw_static_layers,
+            base,
+            server_info.size,
+            map_packet.monuments,
+            self.add_icons,
+            self.add_grid,
+            self.override_images,
+        )
+        self._static_key = key
+        self._frame = None
+        return None
+
+    def _compose(self, full: bool, sprites: List[Sprite]) -> Image.Image:
+        """
+        Runs in the render executor, bringing the kept frame up to date
+        """
+        if full or self._frame is None:
+            frame = self._static.copy()
+            paste_sprites(frame, sprites)
+            self.dirty_boxes = [(0, 0) + frame.size]
+        else:
+            frame = self._frame
+            self.dirty_boxes = get_changed_boxes(self._sprites, sprites, frame.size)
+
+            for box in self.dirty_boxes:
+                # Each region is redrawn from the static layers up, with every
+                # sprite that overlaps it, so overlapping sprites stay in order
+                region = self._static.crop(box)
+                paste_sprites(region, sprites, box[:2])
+                frame.paste(region, box[:2])
+
+        self._frame = frame
+        self._sprites = sprites
+        return frame.copy()
@@ -0,0 +1,361 @@
+import asyncio
+import logging
+import math
+from collections import OrderedDict
+from io import BytesIO
+from typing import Dict, List, Optional, Tuple, Union
+
+from PIL import Image
+
+from .map_drawing import (
+    Sprite,
+    boxes_overlap,
+    get_avatar_sprites,
+    get_changed_boxes,
+    get_marker_sprites,
+    get_monument_sprites,
+    open_map_image,
+    paste_sprites,
+    request_map_data,
+    scale_position,
+)
+from ..remote.cache import MapCache
+from ..structs import RustError, RustInfo, RustTeamMember
+from ..structs.rust_map import RustMonument
+from ..utils.utils import generate_grid_mask
+
+# zoom, x, y
+TileKey = Tuple[int, int, int]
+
+
+class MapTiles:
+    """
+    Serves a server's map as XYZ tiles, for pan and zoom in a web map. At zoom z the
+    map is 256 * 2^z pixels across, split into 2^z by 2^z tiles. Tiles are only drawn
+    when asked for, straight from the map's JPEG with the same layers as get_map, and
+    the most recently used are kept. Each refresh fetches the markers and team
+    again, and only the tiles that something moved into or out of are redrawn.
+
+    tiles = MapTiles(socket)
+    await tiles.refresh()
+    image = await tiles.get_tile(2, 1, 3)
+    """
+
+    TILE_SIZE = 256
+
+    def __init__(
+        self,
+        rust_socket,
+        add_icons: bool = True,
+        add_events: bool = True,
+        add_vending_machines: bool = True,
+        add_team_positions: bool = True,
+        add_grid: bool = True,
+        override_images: Union[Dict[str, Image.Image], None] = None,
+        max_tiles: int = 256,
+        max_zoom: Union[int, None] = None,
+    ) -> None:
+        """
+        :param rust_socket: The RustSocket to request the map data with
+        :param add_icons: To add the monument icons
+        :param add_events: To add the Event icons
+        :param add_vending_machines: To add the vending icons
+        :param add_team_positions: To add the team positions
+        :param add_grid: To add the grid to the map
+        :param override_images: To override the images pre-supplied with RustPlus.py
+        :param max_tiles: How many tiles to keep in memory, each is about 512KB
+        :param max_zoom: The deepest zoom served, by default the first at which the map is at least one pixel per metre
+        """
+        if max_tiles < 1:
+            raise ValueError("At least one tile must be kept")
+        if max_zoom is not None and max_zoom < 0:
+            raise ValueError("The maximum zoom cannot be negative")
+
+        self.rust_socket = rust_socket
+        self.add_icons = add_icons
+        self.add_events = add_events
+        self.add_vending_machines = add_vending_machines
+        self.add_team_positions = add_team_positions
+        self.add_grid = add_grid
+        self.override_images = override_images if override_images is not None else {}
+        self.max_tiles = max_tiles
+        self.logger: logging.Logger = logging.getLogger("rustplus.py")
+
+        self._zoom_limit = max_zoom
+        self._max_zoom = max_zoom
+        self._static_key: Union[str, None] = None
+        # The map image with its ocean margin cut off, at the resolution it was sent
+        self._source: Union[Image.Image, None] = None
+        self._map_size = 0
+        self._monuments: List[RustMonument] = []
+        self._markers: List[Tuple[int, float, float, float]] = []
+        self._members: List[RustTeamMember] = []
+
+        # Per zoom, the monuments and the markers and players as last refreshed
+        self._static_sprites: Dict[int, List[Sprite]] = {}
+        self._sprites: Dict[int, List[Sprite]] = {}
+        # key -> [the tile without markers or players, the finished tile or None]
+        self._tiles: OrderedDict[TileKey, List[Union[Image.Image, None]]] = (
+            OrderedDict()
+        )
+        self._pending: Dict[TileKey, asyncio.Future] = {}
+        # The refresh loading the map for get_tile, which concurrent calls share
+        self._loading: Union[asyncio.Future, None] = None
+        # Bumped by every refresh, so renders that raced one are not kept
+        self._version = 0
+        self._lock = asyncio.Lock()
+
+    @property
+    def max_zoom(self) -> Union[int, None]:
+        """
+        The deepest zoom served, None until the map is loaded unless it was given
+        """
+        return self._max_zoom
+
+    def invalidate(self) -> None:
+        """
+        Drops every tile, making the next refresh load the map again
+        """
+        self._static_key = None
+        self._source = None
+        self._static_sprites.clear()
+        self._sprites.clear()
+        self._tiles.clear()
+        self._version += 1
+
+    async def refresh(self, timeout: Optional[float] = None) -> Union[RustError, None]:
+        """
+        Fetches the markers and team again, dropping the tiles they have changed. If
+        the server has wiped, every tile is dropped and the new map loaded.
+
+        :param timeout: Seconds to wait for each response, defaults to RustWebsocket.RESPONSE_TIMEOUT
+        :return RustError: The error, if the data could not be fetched
+        """
+        async with self._lock:
+            socket = self.rust_socket
+            results = await request_map_data(
+                socket,
+                self.add_events or self.add_vending_machines,
+                self.add_team_positions,
+                timeout,
+            )
+            if isinstance(results, RustError):
+                return results
+
+            server_info: RustInfo = results["get_info"]
+            key = MapCache.get_key(
+                socket.server_details.get_server_string(), server_info
+            )
+            if key != self._static_key:
+                error = await self._load_map(server_info, key, timeout)
+                if error is not None:
+                    return error
+
+            self._markers = [
+                (int(marker.type), marker.x, marker.y, marker.rotation)
+                for marker in results.get("get_markers", [])
+            ]
+            self._members = (
+                results["get_team_info"].members if self.add_team_positions else []
+            )
+            # Bumped both before and after the avatars are awaited, as renders
+            # started in between would draw the old sprites
+            self._version += 1
+            # Only zooms that have been drawn have tiles to drop
+            sprites = {
+                zoom: await self._get_sprites(zoom) for zoom in list(self._sprites)
+            }
+            self._version += 1
+
+            for zoom, new in sprites.items():
+                size = self.TILE_SIZE << zoom
+                boxes = get_changed_boxes(self._sprites[zoom], new, (size, size))
+                self._sprites[zoom] = new
+
+                for (tile_zoom, x, y), entry in self._tiles.items():
+                    if tile_zoom != zoom or entry[1] is None:
+                        continue
+                    tile_box = self._get_tile_box(x, y)
+                    if any(boxes_overlap(tile_box, box) for box in boxes):
+                        entry[1] = None
+
+            return None
+
+    async def get_tile(
+        self, zoom: int, x: int, y: int, timeout: Optional[float] = None
+    ) -> Union[Image.Image, RustError]:
+        """
+        Gets a tile, refreshing first if the map has not been loaded yet
+
+        :param zoom: The zoom level, from 0 to max_zoom
+        :param x: The column of the tile, from the left
+        :param y: The row of the tile, from the top
+        :param timeout: Seconds to wait for each response, defaults to RustWebsocket.RESPONSE_TIMEOUT
+        :return Image: The 256px tile, in RGBA. It is shared, so must not be drawn on
+        """
+        if self._static_key is None:
+            if self._loading is None:
+                self._loading = asyncio.ensure_future(self.refresh(timeout))
+                self._loading.add_done_callback(self._finish_loading)
+
+            error = await asyncio.shield(self._loading)
+            if error is not None:
+                return error
+
+        if not 0 <= zoom <= self._max_zoom:
+            raise ValueError(f"The zoom must be between 0 and {self._max_zoom}")
+        if not (0 <= x < 1 << zoom and 0 <= y < 1 << zoom):
+            raise ValueError(f"There is no tile {x}, {y} at zoom {zoom}")
+
+        key = (zoom, x, y)
+        entry = self._tiles.get(key)
+        if entry is not None and entry[1] is not None:
+            self._tiles.move_to_end(key)
+            return entry[1]
+
+        # Tiles asked for while already being drawn wait on that render
+        pending = self._pending.get(key)
+        if pending is None:
+            pending = asyncio.ensure_future(self._render_tile(key))
+            self._pending[key] = pending
+            pending.add_done_callback(lambda _: self._pending.pop(key, None))
+
+        return await asyncio.shield(pending)
+
+    def _finish_loading(self, loading: asyncio.Future) -> None:
+        if self._loading is loading:
+            self._loading = None
+
+    async def _load_map(
+        self, server_info: RustInfo, key: str, timeout: Optional[float]
+    ) -> Union[RustError, None]:
+        map_packet = await self.rust_socket.get_map_info(timeout)
+        if isinstance(map_packet, RustError):
+            return map_packet
+
+        source = await open_map_image(
+            self.rust_socket.render_executor,
+            "get_tile",
+            _decode_map,
+            map_packet.jpg_image,
+            map_packet.width,
+            map_packet.height,
+        )
+        if isinstance(source, RustError):
+            return source
+
+        self.invalidate()
+        self._static_key = key
+        self._source = source
+        self._map_size = server_info.size
+        self._monuments = map_packet.monuments
+        self._max_zoom = (
+            self._zoom_limit
+            if self._zoom_limit is not None
+            else max(0, math.ceil(math.log2(self._map_size / self.TILE_SIZE)))
+        )
+        return None
+
+    async def _get_sprites(self, zoom: int) -> List[Sprite]:
+        """
+        :return List[Sprite]: The markers and players at the zoom, as last refreshed
+        """
+        scale = (self.TILE_SIZE << zoom) / self._map_size
+        sprites = get_marker_sprites(
+            self._map_size,
+            self._markers,
+            self.add_events,
+            self.add_vending_machines,
+            scale,
+        )
+
+        sprites += await get_avatar_sprites(
+            self.rust_socket.avatar_service, self._members, self._map_size, scale
+        )
+        return sprites
+
+    async def _render_tile(self, key: TileKey) -> Image.Image:
+        version = self._version
+        zoom = key[0]
+
+        sprites = self._sprites.get(zoom)
+        if sprites is None:
+            sprites = await self._get_sprites(zoom)
+            if version == self._version:
+                self._sprites[zoom] = sprites
+
+        entry = self._tiles.get(key)
+        static, tile = await self.rust_socket.render_executor.run_in_thread(
+            self._draw_tile, key, entry[0] if entry is not None else None, sprites
+        )
+
+        if version == self._version:
+            self._tiles[key] = [static, tile]
+            self._tiles.move_to_end(key)
+            while len(self._tiles) > self.max_tiles:
+                self._tiles.popitem(last=False)
+
+        return tile
+
+    def _draw_tile(
+        self, key: TileKey, static: Union[Image.Image, None], sprites: List[Sprite]
+    ) -> Tuple[Image.Image, Image.Image]:
+        """
+        Runs in the render executor, drawing the static layers too if they are not kept
+        """
+        zoom, x, y = key
+        if static is None:
+            static = self._draw_static_tile(zoom, x, y)
+
+        tile = static.copy()
+        paste_sprites(tile, sprites, self._get_tile_box(x, y)[:2])
+        return static, tile
+
+    def _draw_static_tile(self, zoom: int, x: int, y: int) -> Image.Image:
+        size = self.TILE_SIZE << zoom
+        scale = size / self._map_size
+        left, top, right, bottom = self._get_tile_box(x, y)
+
+        # Only the part of the map under the tile is resampled
+        ratio = self._source.size[0] / size
+        tile = self._source.resize(
+            (self.TILE_SIZE, self.TILE_SIZE),
+            Image.LANCZOS,
+            box=(left * ratio, top * ratio, right * ratio, bottom * ratio),
+            reducing_gap=3.0,
+        ).convert("RGBA")
+
+        if self.add_grid:
+            offset = scale_position((5, 5), scale)[0]
+            grid = Image.new("RGBA", tile.size, "black")
+            grid.putalpha(
+                generate_grid_mask(
+                    self._map_size,
+                    size=size,
+                    box=(left - offset, top - offset, right - offset, bottom - offset),
+                )
+            )
+            tile.paste(grid, (0, 0), grid)
+
+        if self.add_icons:
+            sprites = self._static_sprites.get(zoom)
+            if sprites is None:
+                sprites = self._static_sprites[zoom] = get_monument_sprites(
+                    self._map_size, self._monuments, self.override_images, scale
+                )
+            paste_sprites(tile, sprites, (left, top))
+
+        return tile
+
+    def _get_tile_box(self, x: int, y: int) -> Tuple[int, int, int, int]:
+        return (
+            x * self.TILE_SIZE,
+            y * self.TILE_SIZE,
+            (x + 1) * self.TILE_SIZE,
+            (y + 1) * self.TILE_SIZE,
+        )
+
+
+def _decode_map(jpg_image: bytes, width: int, height: int) -> Image.Image:
+    output = Image.open(BytesIO(jpg_image)).convert("RGB")
+    return output.crop((500, 500, height - 500, width - 500))
@@ -1,27 +1,36 @@
 import asyncio
+import contextlib
+import contextvars
 from collections import defaultdict
 from datetime import datetime
-from importlib import resources
-from io import BytesIO
-from typing import List, Union
+from typing import List, Union, Optional, Set, Callable, Coroutine, Any, Dict, Tuple
 import logging
+import time
 from PIL import Image
 
 from .commands import CommandOptions
 from .identification import ServerDetails
+from .metrics import Metrics
+from .remote.cache import ResponseCache, MapCache
 from .remote.camera import CameraManager
 from .remote.rustplus_proto import (
+    AppMessage,
     AppRequest,
     AppEmpty,
     AppSendMessage,
     AppSetEntityValue,
     AppPromoteToLeader,
     AppCameraSubscribe,
-    AppMapMonument,
     AppFlag,
     AppGetNexusAuth,
 )
-from .remote.websocket import RustWebsocket
+from .remote.websocket import (
+    RustWebsocket,
+    Dispatcher,
+    DispatchOptions,
+    MessageKind,
+    ReconnectOptions,
+)
 from .structs import (
     RustTime,
     RustInfo,
@@ -40,18 +49,71 @@ from .structs.rust_error import RustError
 from .utils import (
     convert_time,
     translate_id_to_stack,
-    generate_grid,
-    fetch_avatar_icon,
-    format_coord,
-    convert_marker,
-    convert_monument_to_image,
 )
-from .remote.ratelimiter import RateLimiter
+from .remote.ratelimiter import RateLimiter, RequestPriority
+from .rendering import RenderExecutor, AvatarService, render_base_map, draw_map
+from .rendering.map_drawing import (
+    get_avatar_sprites,
+    open_map_image,
+    request_map_data,
+)
+from .utils.single_flight import single_flight
 from .utils.utils import error_present
 
 
+class TokenReservation:
+    """
+    Tokens taken from the rate limiter up front, which requests made by the owning
+    socket in the same context draw from instead of the limiter
+    """
+
+    def __init__(self, owner: "RustSocket", tokens: float) -> None:
+        self.owner = owner
+        self.remaining = tokens
+
+    def draw(self, owner: "RustSocket", tokens: float) -> bool:
+        if owner is not self.owner or self.remaining < tokens:
+            return False
+
+        self.remaining -= tokens
+        return True
+
+
+_RESERVATION: contextvars.ContextVar[Union[TokenReservation, None]] = (
+    contextvars.ContextVar("rustplus_token_reservation", default=None)
+)
+_PRIORITY: contextvars.ContextVar[Union[int, None]] = contextvars.ContextVar(
+    "rustplus_request_priority", default=None
+)
+
+
 class RustSocket:
 
+    REQUEST_COSTS: Dict[str, float] = {
+        "get_time": 1,
+        "get_info": 1,
+        "get_team_chat": 1,
+        "get_team_info": 1,
+        "get_markers": 1,
+        "get_map_info": 5,
+        "get_entity_info": 1,
+        "get_contents": 1,
+        "check_subscription_to_entity": 1,
+        "get_camera_manager": 1,
+        "get_clan_info": 1,
+        "get_clan_chat": 1,
+        "get_nexus_auth": 1,
+        "send_team_message": 2,
+        "send_clan_message": 2,
+        "set_clan_motd": 1,
+        "set_entity_value": 1,
+        "set_subscription_to_entity": 1,
+        "promote_to_team_leader": 1,
+    }
+
+    # The errors the server replies with when a request is over its rate limit
+    THROTTLE_ERRORS = ("rate_limit",)
+
     def __init__(
         self,
         server_details: ServerDetails,
@@ -60,6 +122,15 @@ class RustSocket:
         use_fp_proxy: bool = False,
         use_test_server: bool = False,
         debug: bool = False,
+        lazy_decoding: bool = False,
+        dispatch_options: Union[DispatchOptions, None] = None,
+        reconnect_options: Union[ReconnectOptions, None] = None,
+        dispatcher: Union[Dispatcher, None] = None,
+        metrics: Union[Metrics, None] = None,
+        response_cache: Union[ResponseCache, None] = None,
+        map_cache: Union[MapCache, None] = None,
+        render_executor: Union[RenderExecutor, None] = None,
+        avatar_service: Union[AvatarService, None] = None,
     ) -> None:
         self.server_details = server_details
         self.command_options = command_options
@@ -82,8 +153,26 @@ class RustSocket:
             use_fp_proxy,
             use_test_server,
             debug,
+            lazy_decoding,
+            dispatch_options,
+            reconnect_options,
+            dispatcher,
+            metrics,
+        )
+        self.ws.on_reconnect = self._replay_subscriptions
+        self.ws.response_cache = response_cache
+        self.response_cache = response_cache
+        self.map_cache = map_cache
+        self.render_executor = (
+            render_executor if render_executor is not None else RenderExecutor.default()
+        )
+        self.avatar_service = (
+            avatar_service if avatar_service is not None else AvatarService.default()
         )
         self.seq = 1
+        self.entity_subscriptions: Set[int] = set()
+        # Read requests currently on the wire, which identical calls wait on
+        self.in_flight: Dict[tuple, Any] = {}
 
         if ratelimiter:
             self.ratelimiter = ratelimiter
@@ -98,20 +187,96 @@ class RustSocket:
             RateLimiter.SOCKET_REFRESH_AMOUNT,
         )
 
-    async def _handle_ratelimit(self, tokens) -> None:
-        while True:
-            if await self.ratelimiter.can_consume(self.server_details, tokens):
-                await self.ratelimiter.consume(self.server_details, tokens)
-                break
+        if self.ratelimiter.adaptive_options is not None:
+            self.ws.on_response = self._observe_response
 
-            await asyncio.sleep(
-                await self.ratelimiter.get_estimated_delay_time(
-                    self.server_details, tokens
-                )
-            )
+    def _observe_response(self, response: Union[AppMessage, None]) -> None:
+        # Feeds the adaptive rate limiter, which learns the server's real limits
+        if response is None:
+            return
+
+        # Checking the kind first leaves a lazily decoded success undecoded
+        if (
+            self.ws.get_message_kind(response) == MessageKind.ERROR
+            and response.response.error.error in self.THROTTLE_ERRORS
+        ):
+            self.ratelimiter.report_throttled(self.server_details)
+        else:
+            self.ratelimiter.report_success(self.server_details)
 
-    async def _generate_request(self, tokens=1) -> AppRequest:
-        await self._handle_ratelimit(tokens)
+    def _get_cached(self, method: str, use_cache: bool, force_refresh: bool) -> Any:
+        if self.response_cache is None or not use_cache or force_refresh:
+            return None
+        return self.response_cache.get(self.server_details, method)
+
+    def _store_cached(self, method: str, value: Any, use_cache: bool) -> Any:
+        if self.response_cache is not None and use_cache:
+            self.response_cache.set(self.server_details, method, value)
+        return value
+
+    async def request_together(
+        self,
+        calls: Dict[str, Callable[[Optional[float]], Coroutine]],
+        timeout: Optional[float] = None,
+    ) -> Dict[str, Any]:
+        """
+        Makes every call at once, with the tokens for all of them taken together.
+        Calls that a cache will answer are not counted.
+
+        results = await socket.request_together({"get_info": socket.get_info, "get_markers": socket.get_markers})
+
+        :param calls: Methods of this socket that take a timeout, by the name of the method
+        :param timeout: Seconds to wait for each response, defaults to RustWebsocket.RESPONSE_TIMEOUT
+        :return Dict[str, Any]: The result of each call, by the same names
+        """
+        for name in calls:
+            if name not in self.REQUEST_COSTS:
+                raise ValueError(f"{name} cannot be requested together")
+
+        async with self.reserve_tokens(
+            sum(self._get_uncached_cost(name) for name in calls)
+        ):
+            results = await asyncio.gather(*(call(timeout) for call in calls.values()))
+        return dict(zip(calls, results))
+
+    def _get_uncached_cost(self, method: str) -> float:
+        """
+        :return float: The tokens a call to the method is expected to need, nothing if it will be answered from a cache
+        """
+        if self.response_cache is not None and self.response_cache.is_fresh(
+            self.server_details, method
+        ):
+            return 0
+
+        if method == "get_map_info" and self.map_cache is not None:
+            # Most likely on disk, and if not the rate limiter is waited on as usual
+            return 0
+
+        return self.REQUEST_COSTS[method]
+
+    async def _handle_ratelimit(
+        self, tokens, priority: int = RequestPriority.NORMAL
+    ) -> None:
+        reservation = _RESERVATION.get()
+        if reservation is not None and reservation.draw(self, tokens):
+            return
+
+        # A priority set with RustSocket.priority() overrides the request's own
+        context_priority = _PRIORITY.get()
+        if context_priority is not None:
+            priority = context_priority
+
+        await self.ratelimiter.acquire(self.server_details, tokens, priority)
+
+    async def _generate_request(
+        self, tokens=1, priority: int = RequestPriority.NORMAL
+    ) -> AppRequest:
+        if self.ws.metrics is not None and self.ws.metrics.enabled:
+            start = time.perf_counter()
+            await self._handle_ratelimit(tokens, priority)
+            self.ws.record_ratelimit_wait(self.seq, time.perf_counter() - start)
+        else:
+            await self._handle_ratelimit(tokens, priority)
 
         app_request = AppRequest()
         app_request.seq = self.seq
@@ -121,15 +286,118 @@ class RustSocket:
 
         return app_request
 
+    @contextlib.asynccontextmanager
+    async def reserve_tokens(self, tokens: float):
+        """
+        Takes the given number of tokens from the rate limiter in one step. Requests made
+        by this socket inside the block, including in tasks started from it, draw from the
+        reservation rather than waiting on the rate limiter individually.
+
+        :param tokens: The combined cost of the requests that will be made
+        """
+        await self._handle_ratelimit(tokens)
+
+        token = _RESERVATION.set(TokenReservation(self, tokens))
+        try:
+            yield
+        finally:
+            _RESERVATION.reset(token)
+
+    @staticmethod
+    @contextlib.contextmanager
+    def priority(priority: int):
+        """
+        Sets the rate limiter priority of every request made inside the block, including
+        in tasks started from it. Background requests give way to everything else and
+        leave a reserve of tokens, so they suit polling loops:
+
+        with socket.priority(RequestPriority.BACKGROUND):
+            markers = await socket.get_markers()
+
+        :param priority: A RequestPriority
+        """
+        if priority not in RequestPriority.ALL:
+            raise ValueError(f"Unknown request priority {priority}")
+
+        token = _PRIORITY.set(priority)
+        try:
+            yield
+        finally:
+            _PRIORITY.reset(token)
+
+    async def pipeline(self, *calls: Callable[[], Coroutine]) -> List[Any]:
+        """
+        Sends several requests back to back, without waiting for each response, and
+        resolves them together. Their combined cost is reserved from the rate limiter up
+        front, leaving out calls that a cache or an identical call in flight will answer.
+        Pipelines costing more than the rate limiter can hold at once are reserved in
+        batches, each sent as soon as its tokens are available.
+
+        results = await socket.pipeline(socket.get_info, socket.get_time, partial(socket.get_entity_info, eid))
+
+        :param calls: Methods of this socket, or functools.partial objects wrapping them
+        :return List[Any]: The result of each call, in the order they were given
+        """
+        capacity = self.ratelimiter.get_capacity(self.server_details)
+        batches: List[Tuple[float, List[Callable[[], Coroutine]]]] = []
+        flights: Set[tuple] = set()
+
+        for call in calls:
+            func = getattr(call, "func", call)
+            name = getattr(func, "__name__", None)
+            if name not in self.REQUEST_COSTS:
+                raise ValueError(f"{name} cannot be pipelined")
+
+            cost = self._get_uncached_cost(name)
+            get_flight_key = getattr(func, "get_flight_key", None)
+            if get_flight_key is not None:
+                key = get_flight_key(
+                    self, *getattr(call, "args", ()), **getattr(call, "keywords", {})
+                )
+                if key in flights or key in self.in_flight:
+                    # Joins an identical call rather than sending a request
+                    cost = 0
+                flights.add(key)
+
+            if not batches or batches[-1][0] + cost > capacity:
+                batches.append((0, []))
+            batches[-1] = (batches[-1][0] + cost, batches[-1][1] + [call])
+
+        tasks: List[asyncio.Future] = []
+        try:
+            for tokens, batch in batches:
+                async with self.reserve_tokens(tokens):
+                    # The tasks copy the context, and with it the reservation
+                    tasks.extend(asyncio.ensure_future(call()) for call in batch)
+
+            return list(await asyncio.gather(*tasks))
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
+
     async def connect(self) -> bool:
         if await self.ws.connect():
-            await self.get_time()  # Wake up the connection
+            await self.get_time(use_cache=False)  # Wake up the connection
             return True
         return False
 
     async def disconnect(self) -> None:
         await self.ws.disconnect()
 
+    async def _replay_subscriptions(self) -> None:
+        """
+        Restores the server side state that is lost when the connection drops
+        """
+        await self.get_time(use_cache=False)  # Wake up the connection
+
+        for eid in list(self.entity_subscriptions):
+            await self.set_subscription_to_entity(eid)
+
+        camera = CameraManager.ACTIVE_INSTANCE
+        if camera is not None and camera.rust_socket is self and camera.is_open:
+            await camera.resubscribe()
+
     @staticmethod
     async def hang() -> None:
         """
@@ -142,16 +410,28 @@ class RustSocket:
         while True:
             await asyncio.sleep(1)
 
-    async def get_time(self) -> Union[RustTime, RustError]:
+    @single_flight("use_cache", "force_refresh")
+    async def get_time(
+        self,
+        timeout: Optional[float] = None,
+        use_cache: bool = True,
+        force_refresh: bool = False,
+    ) -> Union[RustTime, RustError]:
         """
         Gets the current in-game time from the server.
 
+        :param timeout: Seconds to wait for the response, defaults to RustWebsocket.RESPONSE_TIMEOUT
+        :param use_cache: Whether a response cached by the socket's ResponseCache may be returned, and this one cached
+        :param force_refresh: Whether to fetch a new response even if a cached one is fresh, caching it in its place
         :returns RustTime: The Time
         """
+        cached = self._get_cached("get_time", use_cache, force_refresh)
+        if cached is not None:
+            return cached
 
         packet = await self._generate_request()
         packet.get_time = AppEmpty()
-        response = await self.ws.send_and_get(packet)
+        response = await self.ws.send_and_get(packet, timeout)
 
         if response is None:
             return RustError("get_time", "No response received")
@@ -159,13 +439,17 @@ class RustSocket:
         if error_present(response):
             return RustError("get_time", response.response.error.error)
 
-        return RustTime(
-            response.response.time.day_length_minutes,
-            convert_time(response.response.time.sunrise),
-            convert_time(response.response.time.sunset),
-            convert_time(response.response.time.time),
-            response.response.time.time,
-            response.response.time.time_scale,
+        return self._store_cached(
+            "get_time",
+            RustTime(
+                response.response.time.day_length_minutes,
+                convert_time(response.response.time.sunrise),
+                convert_time(response.response.time.sunset),
+                convert_time(response.response.time.time),
+                response.response.time.time,
+                response.response.time.time_scale,
+            ),
+            use_cache,
         )
 
     async def send_team_message(self, message: str) -> None:
@@ -175,21 +459,34 @@ class RustSocket:
         :param message: The string message to send
         """
 
-        packet = await self._generate_request(tokens=2)
+        packet = await self._generate_request(2, RequestPriority.INTERACTIVE)
         send_message = AppSendMessage()
         send_message.message = message
         packet.send_team_message = send_message
 
         await self.ws.send_message(packet, True)
 
-    async def get_info(self) -> Union[RustInfo, RustError]:
+    @single_flight("use_cache", "force_refresh")
+    async def get_info(
+        self,
+        timeout: Optional[float] = None,
+        use_cache: bool = True,
+        force_refresh: bool = False,
+    ) -> Union[RustInfo, RustError]:
         """
         Gets information on the Rust Server
+        :param timeout: Seconds to wait for the response, defaults to RustWebsocket.RESPONSE_TIMEOUT
+        :param use_cache: Whether a response cached by the socket's ResponseCache may be returned, and this one cached
+        :param force_refresh: Whether to fetch a new response even if a cached one is fresh, caching it in its place
         :return: RustInfo - The info of the server
         """
+        cached = self._get_cached("get_info", use_cache, force_refresh)
+        if cached is not None:
+            return cached
+
         packet = await self._generate_request()
         packet.get_info = AppEmpty()
-        response = await self.ws.send_and_get(packet)
+        response = await self.ws.send_and_get(packet, timeout)
 
         if response is None:
             return RustError("get_info", "No response received")
@@ -197,17 +494,23 @@ class RustSocket:
         if error_present(response):
             return RustError("get_info", response.response.error.error)
 
-        return RustInfo(response.response.info)
+        return self._store_cached(
+            "get_info", RustInfo(response.response.info), use_cache
+        )
 
-    async def get_team_chat(self) -> Union[List[RustChatMessage], RustError]:
+    @single_flight()
+    async def get_team_chat(
+        self, timeout: Optional[float] = None
+    ) -> Union[List[RustChatMessage], RustError]:
         """
         Gets the team chat from the server
 
+        :param timeout: Seconds to wait for the response, defaults to RustWebsocket.RESPONSE_TIMEOUT
         :return List[RustChatMessage]: The chat messages in the team chat
         """
         packet = await self._generate_request()
         packet.get_team_chat = AppEmpty()
-        response = await self.ws.send_and_get(packet)
+        response = await self.ws.send_and_get(packet, timeout)
 
         if response is None:
             return RustError("get_team_chat", "No response received")
@@ -219,15 +522,28 @@ class RustSocket:
             RustChatMessage(message) for message in response.response.team_chat.messages
         ]
 
-    async def get_team_info(self) -> Union[RustTeamInfo, RustError]:
+    @single_flight("use_cache", "force_refresh")
+    async def get_team_info(
+        self,
+        timeout: Optional[float] = None,
+        use_cache: bool = True,
+        force_refresh: bool = False,
+    ) -> Union[RustTeamInfo, RustError]:
         """
         Gets Information on the members of your team
 
+        :param timeout: Seconds to wait for the response, defaults to RustWebsocket.RESPONSE_TIMEOUT
+        :param use_cache: Whether a response cached by the socket's ResponseCache may be returned, and this one cached
+        :param force_refresh: Whether to fetch a new response even if a cached one is fresh, caching it in its place
         :return RustTeamInfo: The info of your team
         """
+        cached = self._get_cached("get_team_info", use_cache, force_refresh)
+        if cached is not None:
+            return cached
+
         packet = await self._generate_request()
         packet.get_team_info = AppEmpty()
-        response = await self.ws.send_and_get(packet)
+        response = await self.ws.send_and_get(packet, timeout)
 
         if response is None:
             return RustError("get_team_info", "No response received")
@@ -235,17 +551,23 @@ class RustSocket:
         if error_present(response):
             return RustError("get_team_info", response.response.error.error)
 
-        return RustTeamInfo(response.response.team_info)
+        return self._store_cached(
+            "get_team_info", RustTeamInfo(response.response.team_info), use_cache
+        )
 
-    async def get_markers(self) -> Union[List[RustMarker], RustError]:
+    @single_flight()
+    async def get_markers(
+        self, timeout: Optional[float] = None
+    ) -> Union[List[RustMarker], RustError]:
         """
         Gets all the map markers from the server
 
+        :param timeout: Seconds to wait for the response, defaults to RustWebsocket.RESPONSE_TIMEOUT
         :return List[RustMarker]: All the markers on the map
         """
         packet = await self._generate_request()
         packet.get_map_markers = AppEmpty()
-        response = await self.ws.send_and_get(packet)
+        response = await self.ws.send_and_get(packet, timeout)
 
         if response is None:
             return RustError("get_markers", "No response received")
@@ -263,6 +585,8 @@ class RustSocket:
         add_team_positions: bool = False,
         override_images: dict = None,
         add_grid: bool = False,
+        timeout: Optional[float] = None,
+        size: Optional[int] = None,
     ) -> Union[Image.Image, RustError]:
         """
         Gets an image of the map from the server with the specified additions
@@ -273,128 +597,128 @@ class RustSocket:
         :param add_team_positions: To add the team positions
         :param override_images: To override the images pre-supplied with RustPlus.py
         :param add_grid: To add the grid to the map
+        :param timeout: Seconds to wait for the response, defaults to RustWebsocket.RESPONSE_TIMEOUT
+        :param size: The width and height of the image in pixels, one per metre of the map by default. Smaller maps are decoded and drawn at that size, which is much faster than resizing the full map
         :return Image: PIL Image
         """
 
         if override_images is None:
             override_images = {}
 
-        server_info = await self.get_info()
-        if isinstance(server_info, RustError):
-            return server_info
+        results = await request_map_data(
+            self,
+            add_events or add_vending_machines,
+            add_team_positions,
+            timeout,
+            add_map_info=True,
+        )
+        if isinstance(results, RustError):
+            return results
 
+        server_info: RustInfo = results["get_info"]
+        map_packet: RustMap = results["get_map_info"]
+        map_markers: List[RustMarker] = results.get("get_markers", [])
         map_size = server_info.size
+        monuments = map_packet.monuments
+        scale = size / map_size if size is not None else 1
 
-        packet = await self._generate_request(5)
-        packet.get_map = AppEmpty()
-        response = await self.ws.send_and_get(packet)
-
-        if response is None:
-            return RustError("get_map", "No response received")
-
-        if error_present(response):
-            return RustError("get_map", response.response.error.error)
-
-        map_packet = response.response.map
-        monuments: List[AppMapMonument] = map_packet.monuments
-
-        try:
-            output = Image.open(BytesIO(map_packet.jpg_image))
-        except Exception as e:
-            self.logger.error(f"Error opening image: {e}")
-            return RustError("get_map", str(e))
+        avatars = None
+        if add_team_positions:
+            # Started now, so that the downloads overlap rendering the map
+            avatars = asyncio.ensure_future(
+                get_avatar_sprites(
+                    self.avatar_service,
+                    results["get_team_info"].members,
+                    map_size,
+                    scale,
+                )
+            )
 
-        output = output.crop(
-            (500, 500, map_packet.height - 500, map_packet.width - 500)
+        map_key = (
+            MapCache.get_key(self.server_details.get_server_string(), server_info)
+            if self.map_cache is not None
+            else None
         )
-        output = output.resize((map_size, map_size), Image.LANCZOS).convert("RGBA")
-
-        if add_grid:
-            output.paste(grid := generate_grid(map_size), (5, 5), grid)
-
-        if add_icons or add_events or add_vending_machines:
-            map_markers = (
-                await self.get_markers() if add_events or add_vending_machines else []
+        base = (
+            await self.render_executor.run_in_thread(
+                self.map_cache.get_base_image, map_key, size
             )
+            if map_key
+            else None
+        )
 
-            if isinstance(map_markers, RustError):
-                return map_markers
-
-            if add_icons:
-                for monument in monuments:
-                    if str(monument.token) == "DungeonBase":
-                        continue
-                    if "underwater-lab-base" in str(monument.token):
-                        # An underwater lab's interior modules (moonpools, etc.) are
-                        # reported as separate markers next to the lab; they aren't
-                        # standalone monuments, so don't draw them.
-                        continue
-
-                    if monument.token in override_images:
-                        icon = override_images[monument.token].resize((150, 150))
-                    else:
-                        icon = convert_monument_to_image(monument.token)
-
-                    output.paste(
-                        icon,
-                        (format_coord(int(monument.x), int(monument.y), map_size)),
-                        icon,
-                    )
-
-            if add_vending_machines:
-                with resources.path("rustplus.icons", "vending_machine.png") as path:
-                    vending_machine = Image.open(path).convert("RGBA")
-                    vending_machine = vending_machine.resize((100, 100))
-
-            for marker in map_markers:
-                if add_events:
-                    if marker.type in RustMarker.Events:
-                        icon = convert_marker(int(marker.type), marker.rotation)
-                        if marker.type == 6:
-                            x, y = marker.x, marker.y
-                            y = min(max(y, 0), map_size)
-                            x = min(max(x, 0), map_size - 75 if x > map_size else x)
-                            output.paste(icon, (int(x), map_size - int(y)), icon)
-                        else:
-                            output.paste(
-                                icon,
-                                (format_coord(int(marker.x), int(marker.y), map_size)),
-                                icon,
-                            )
-
-                if add_vending_machines and marker.type == 3:
-                    output.paste(
-                        vending_machine,
-                        (int(marker.x) - 50, map_size - int(marker.y) - 50),
-                        vending_machine,
-                    )
+        if base is None:
+            base = await open_map_image(
+                self.render_executor,
+                "get_map",
+                render_base_map,
+                map_packet.jpg_image,
+                map_packet.width,
+                map_packet.height,
+                map_size,
+                size,
+            )
+            if isinstance(base, RustError):
+                if avatars is not None:
+                    avatars.cancel()
+                return base
+
+            if map_key is not None:
+                await self.render_executor.run_in_thread(
+                    self.map_cache.set_base_image, map_key, base, size
+                )
 
-        if add_team_positions:
-            team = await self.get_team_info()
-            if team is not None:
-                for member in team.members:
-                    if not member.is_alive:
-                        continue
-
-                    output.paste(
-                        avatar := await fetch_avatar_icon(
-                            member.steam_id, member.is_online
-                        ),
-                        format_coord(int(member.x), int(member.y), server_info.size),
-                        avatar,
-                    )
+        avatar_positions = await avatars if avatars is not None else []
+
+        output = await self.render_executor.run(
+            draw_map,
+            base,
+            map_size,
+            monuments,
+            [
+                (int(marker.type), marker.x, marker.y, marker.rotation)
+                for marker in map_markers
+            ],
+            avatar_positions,
+            add_icons,
+            add_events,
+            add_vending_machines,
+            add_grid,
+            override_images,
+        )
 
         return output
 
-    async def get_map_info(self) -> Union[RustMap, RustError]:
+    @single_flight("use_cache", "force_refresh")
+    async def get_map_info(
+        self,
+        timeout: Optional[float] = None,
+        use_cache: bool = True,
+        force_refresh: bool = False,
+    ) -> Union[RustMap, RustError]:
         """
         Gets the raw map data from the server
 
+        :param timeout: Seconds to wait for the response, defaults to RustWebsocket.RESPONSE_TIMEOUT
+        :param use_cache: Whether a response cached by the socket's ResponseCache may be returned, and this one cached
+        :param force_refresh: Whether to fetch a new response even if a cached one is fresh, caching it in its place
         :return RustMap: The raw map of the server
         """
+        cached = self._get_cached("get_map_info", use_cache, force_refresh)
+        if cached is not None:
+            return cached
+
+        map_key = await self._get_map_key(timeout) if use_cache else None
+        if map_key is not None and not force_refresh:
+            app_map = await self.render_executor.run_in_thread(
+                self.map_cache.get_map, map_key
+            )
+            if app_map is not None:
+                return self._store_cached("get_map_info", RustMap(app_map), use_cache)
+
         packet = await self._generate_request(tokens=5)
         packet.get_map = AppEmpty()
-        response = await self.ws.send_and_get(packet)
+        response = await self.ws.send_and_get(packet, timeout)
 
         if response is None:
             return RustError("get_map_info", "No response received")
@@ -402,21 +726,43 @@ class RustSocket:
         if error_present(response):
             return RustError("get_map_info", response.response.error.error)
 
-        return RustMap(response.response.map)
+        if map_key is not None:
+            await self.render_executor.run_in_thread(
+                self.map_cache.set_map, map_key, response.response.map
+            )
 
+        return self._store_cached(
+            "get_map_info", RustMap(response.response.map), use_cache
+        )
+
+    async def _get_map_key(self, timeout: Optional[float]) -> Union[str, None]:
+        """
+        :return str: The MapCache key of the server's current map, or None without a MapCache
+        """
+        if self.map_cache is None:
+            return None
+
+        server_info = await self.get_info(timeout)
+        if isinstance(server_info, RustError):
+            return None
+
+        return MapCache.get_key(self.server_details.get_server_string(), server_info)
+
+    @single_flight("eid")
     async def get_entity_info(
-        self, eid: int = None
+        self, eid: int = None, timeout: Optional[float] = None
     ) -> Union[RustEntityInfo, RustError]:
         """
         Gets entity info from the server
 
         :param eid: The Entities ID
+        :param timeout: Seconds to wait for the response, defaults to RustWebsocket.RESPONSE_TIMEOUT
         :return RustEntityInfo: The entity Info
         """
         packet = await self._generate_request()
         packet.get_entity_info = AppEmpty()
         packet.entity_id = eid
-        response = await self.ws.send_and_get(packet)
+        response = await self.ws.send_and_get(packet, timeout)
 
         if response is None:
             return RustError("get_entity_info", "No response received")
@@ -434,7 +780,7 @@ class RustSocket:
         :param value: The value to set
         :return None:
         """
-        packet = await self._generate_request()
+        packet = await self._generate_request(priority=RequestPriority.INTERACTIVE)
         set_value = AppSetEntityValue()
         set_value.value = value
         packet.set_entity_value = set_value
@@ -456,19 +802,28 @@ class RustSocket:
         packet.set_subscription = flag
         packet.entity_id = eid
 
+        if value:
+            self.entity_subscriptions.add(eid)
+        else:
+            self.entity_subscriptions.discard(eid)
+
         await self.ws.send_message(packet, True)
 
-    async def check_subscription_to_entity(self, eid: int) -> Union[bool, RustError]:
+    @single_flight("eid")
+    async def check_subscription_to_entity(
+        self, eid: int, timeout: Optional[float] = None
+    ) -> Union[bool, RustError]:
         """
         Checks if you are subscribed to an entity
 
         :param eid: The Entities ID
+        :param timeout: Seconds to wait for the response, defaults to RustWebsocket.RESPONSE_TIMEOUT
         :return bool: If you are subscribed
         """
         packet = await self._generate_request()
         packet.check_subscription = AppEmpty()
         packet.entity_id = eid
-        response = await self.ws.send_and_get(packet)
+        response = await self.ws.send_and_get(packet, timeout)
 
         if response is None:
             return RustError("check_subscription_to_entity", "No response received")
@@ -493,18 +848,24 @@ class RustSocket:
         packet.promote_to_leader = promote_packet
 
         await self.ws.send_message(packet, True)
+        if self.response_cache is not None:
+            self.response_cache.invalidate(self.server_details, "get_team_info")
 
     async def get_contents(
-        self, eid: int = None, combine_stacks: bool = False
+        self,
+        eid: int = None,
+        combine_stacks: bool = False,
+        timeout: Optional[float] = None,
     ) -> Union[RustContents, RustError]:
         """
         Gets the contents of a storage monitor-attached container
 
         :param eid: The EntityID Of the storage Monitor
         :param combine_stacks: Whether to combine alike stacks together
+        :param timeout: Seconds to wait for the response, defaults to RustWebsocket.RESPONSE_TIMEOUT
         :return RustContents: The contents on the monitor
         """
-        returned_data = await self.get_entity_info(eid)
+        returned_data = await self.get_entity_info(eid, timeout)
 
         if isinstance(returned_data, RustError):
             return returned_data
@@ -551,13 +912,16 @@ class RustSocket:
 
         return RustContents(difference, bool(returned_data.has_protection), items)
 
-    async def get_camera_manager(self, cam_id: str) -> Union[CameraManager, RustError]:
+    async def get_camera_manager(
+        self, cam_id: str, timeout: Optional[float] = None
+    ) -> Union[CameraManager, RustError]:
         """
         Gets a camera manager for a given camera ID
 
         NOTE: This will override the current camera manager if one exists for the given ID so you cannot have multiple
 
         :param cam_id: The ID of the camera
+        :param timeout: Seconds to wait for the response, defaults to RustWebsocket.RESPONSE_TIMEOUT
         :return CameraManager: The camera manager
         :raises RequestError: If the camera is not found, or you cannot access it. See reason for more info
         """
@@ -565,7 +929,7 @@ class RustSocket:
         subscribe = AppCameraSubscribe()
         subscribe.camera_id = cam_id
         packet.camera_subscribe = subscribe
-        response = await self.ws.send_and_get(packet)
+        response = await self.ws.send_and_get(packet, timeout)
 
         if response is None:
             return RustError("get_camera_manager", "No response received")
@@ -575,15 +939,28 @@ class RustSocket:
 
         return CameraManager(self, cam_id, response.response.camera_subscribe_info)
 
-    async def get_clan_info(self) -> Union[RustClanInfo, RustError]:
+    @single_flight("use_cache", "force_refresh")
+    async def get_clan_info(
+        self,
+        timeout: Optional[float] = None,
+        use_cache: bool = True,
+        force_refresh: bool = False,
+    ) -> Union[RustClanInfo, RustError]:
         """
         Gets the clan information for the player's current clan.
 
+        :param timeout: Seconds to wait for the response, defaults to RustWebsocket.RESPONSE_TIMEOUT
+        :param use_cache: Whether a response cached by the socket's ResponseCache may be returned, and this one cached
+        :param force_refresh: Whether to fetch a new response even if a cached one is fresh, caching it in its place
         :return RustClanInfo: The clan information
         """
+        cached = self._get_cached("get_clan_info", use_cache, force_refresh)
+        if cached is not None:
+            return cached
+
         packet = await self._generate_request(tokens=1)
         packet.get_clan_info = AppEmpty()
-        response = await self.ws.send_and_get(packet)
+        response = await self.ws.send_and_get(packet, timeout)
 
         if response is None:
             return RustError("get_clan_info", "No response received")
@@ -591,17 +968,25 @@ class RustSocket:
         if error_present(response):
             return RustError("get_clan_info", response.response.error.error)
 
-        return RustClanInfo(response.response.clan_info.clan_info)
+        return self._store_cached(
+            "get_clan_info",
+            RustClanInfo(response.response.clan_info.clan_info),
+            use_cache,
+        )
 
-    async def get_clan_chat(self) -> Union[List[RustClanMessage], RustError]:
+    @single_flight()
+    async def get_clan_chat(
+        self, timeout: Optional[float] = None
+    ) -> Union[List[RustClanMessage], RustError]:
         """
         Gets the clan chat for the player's current clan.
 
+        :param timeout: Seconds to wait for the response, defaults to RustWebsocket.RESPONSE_TIMEOUT
         :return List[RustClanMessage]: The clan chat
         """
         packet = await self._generate_request(tokens=1)
         packet.get_clan_chat = AppEmpty()
-        response = await self.ws.send_and_get(packet)
+        response = await self.ws.send_and_get(packet, timeout)
 
         if response is None:
             return RustError("get_clan_chat", "No response received")
@@ -620,7 +1005,7 @@ class RustSocket:
         :param message: The string message to send
         """
 
-        packet = await self._generate_request(tokens=2)
+        packet = await self._generate_request(2, RequestPriority.INTERACTIVE)
         send_message = AppSendMessage()
         send_message.message = message
         packet.send_clan_message = send_message
@@ -640,12 +1025,17 @@ class RustSocket:
         packet.set_clan_motd = send_message
 
         await self.ws.send_message(packet, True)
+        if self.response_cache is not None:
+            self.response_cache.invalidate(self.server_details, "get_clan_info")
 
-    async def get_nexus_auth(self, app_key: str) -> Union[RustAuthDetails, RustError]:
+    async def get_nexus_auth(
+        self, app_key: str, timeout: Optional[float] = None
+    ) -> Union[RustAuthDetails, RustError]:
         """
         Gets the auth for a server. Does not require that the player token of this RustSocket is set correctly.
 
         :param app_key: The app key to use. I do not know how you would get this currently, without owning the server.
+        :param timeout: Seconds to wait for the response, defaults to RustWebsocket.RESPONSE_TIMEOUT
         """
 
         packet = await self._generate_request()
@@ -653,7 +1043,7 @@ class RustSocket:
         send_message.app_key = app_key
         packet.get_nexus_auth = send_message
 
-        response = await self.ws.send_and_get(packet)
+        response = await self.ws.send_and_get(packet, timeout)
 
         if response is None:
             return RustError("get_nexus_auth", "No response received")
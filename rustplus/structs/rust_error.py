@@ -23,6 +23,10 @@ class RustError(Serializable):
     def __str__(self) -> str:
         return f"Error Propagating from {self._method}: {self._reason}"
 
+    def __reduce__(self):
+        # __getattr__ below would otherwise be hit while unpickling, before _method is set
+        return RustError, (self._method, self._reason)
+
     def __getattr__(self, attr_name: str) -> Any:
         if attr_name in self.__dict__:
             return self.__dict__[attr_name]
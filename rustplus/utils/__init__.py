@@ -12,3 +12,4 @@ from .utils import (
 from .grab_items import translate_stack_to_id, translate_id_to_stack
 from .yielding_event import YieldingEvent
 from .emojis import Emoji
+from .atomic_write import atomic_write
@@ -0,0 +1,25 @@
+import os
+import tempfile
+from pathlib import Path
+from typing import Union
+
+
+def atomic_write(path: Union[str, Path], data: bytes) -> None:
+    """
+    Writes the data to a temporary file beside path and renames it into place, so
+    readers, in this process or another, never see part of it
+
+    :raises OSError: If the file could not be written, in which case nothing is left behind
+    """
+    path = Path(path)
+    fd, temp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as file:
+            file.write(data)
+        os.replace(temp, path)
+    except BaseException:
+        try:
+            os.remove(temp)
+        except FileNotFoundError:
+            pass
+        raise
@@ -0,0 +1,66 @@
+import asyncio
+import functools
+import inspect
+from typing import Dict, Hashable, Tuple
+
+
+class _Flight:
+    def __init__(self, task: asyncio.Task) -> None:
+        self.task = task
+        self.waiters = 0
+
+
+def single_flight(*key_params: str):
+    """
+    This is a decorator for methods that only read from the server. While a call is
+    in flight, further calls with the same values for the key parameters wait on it
+    and receive its result, rather than sending an identical request of their own.
+    Other parameters, such as the timeout, are taken from the first call.
+
+    The instance must have an `in_flight` dict to keep the running calls in.
+    """
+
+    def decorator(func):
+        signature = inspect.signature(func)
+
+        def get_flight_key(self, *args, **kwargs) -> Tuple[Hashable, ...]:
+            bound = signature.bind(self, *args, **kwargs)
+            bound.apply_defaults()
+            return (func.__name__,) + tuple(
+                bound.arguments[param] for param in key_params
+            )
+
+        @functools.wraps(func)
+        async def wrapper(self, *args, **kwargs):
+            key = get_flight_key(self, *args, **kwargs)
+
+            in_flight: Dict[Tuple[Hashable, ...], _Flight] = self.in_flight
+            flight = in_flight.get(key)
+            if flight is None:
+                flight = _Flight(asyncio.ensure_future(func(self, *args, **kwargs)))
+                in_flight[key] = flight
+
+                def land(_: asyncio.Task, landed: _Flight = flight) -> None:
+                    if in_flight.get(key) is landed:
+                        del in_flight[key]
+
+                flight.task.add_done_callback(land)
+
+            flight.waiters += 1
+            try:
+                # Shielded, so that one caller giving up does not cancel it for the rest
+                return await asyncio.shield(flight.task)
+            except asyncio.CancelledError:
+                if flight.waiters == 1 and not flight.task.done():
+                    # Nobody is left waiting, so the request is not worth finishing
+                    flight.task.cancel()
+                    in_flight.pop(key, None)
+                raise
+            finally:
+                flight.waiters -= 1
+
+        # Lets callers tell whether a call would join one already in flight
+        wrapper.get_flight_key = get_flight_key
+        return wrapper
+
+    return decorator
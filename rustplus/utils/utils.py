@@ -1,9 +1,11 @@
+import asyncio
+import functools
 import logging
 import string
 from importlib import resources
-from typing import Tuple
+from typing import Tuple, Union
 
-import requests
+import betterproto
 from PIL import ImageFont, Image, ImageDraw
 from pathlib import Path
 from resvg import render, usvg
@@ -12,8 +14,33 @@ from io import BytesIO
 ICONS_PATH = "rustplus.icons"
 FONT_PATH = "rustplus.utils.fonts"
 GRID_DIAMETER = 146.28571428571428
+# The smallest grid label drawn on maps rendered below full size
+MIN_GRID_TEXT_SIZE = 8
 PLAYER_MARKER_ONLINE_COLOR = (201, 242, 155, 255)
 PLAYER_MARKER_OFFLINE_COLOR = (128, 128, 128, 255)
+# The AppRequest fields that say what is being requested
+REQUEST_TYPES = (
+    "get_info",
+    "get_time",
+    "get_map",
+    "get_team_info",
+    "get_team_chat",
+    "send_team_message",
+    "get_entity_info",
+    "set_entity_value",
+    "check_subscription",
+    "set_subscription",
+    "get_map_markers",
+    "promote_to_leader",
+    "get_clan_info",
+    "set_clan_motd",
+    "get_clan_chat",
+    "send_clan_message",
+    "get_nexus_auth",
+    "camera_subscribe",
+    "camera_unsubscribe",
+    "camera_input",
+)
 
 
 def error_present(app_message) -> bool:
@@ -23,6 +50,16 @@ def error_present(app_message) -> bool:
     return app_message.response.error.error != ""
 
 
+def get_request_type(app_request) -> str:
+    """
+    Returns the name of the AppRequest field that was set, as they are not a oneof
+    """
+    for name in REQUEST_TYPES:
+        if betterproto.serialized_on_wire(getattr(app_request, name)):
+            return name
+    return ""
+
+
 def convert_time(time) -> str:
     hours, minutes = divmod(time * 60, 60)
 
@@ -52,43 +89,82 @@ def convert_event_type_to_name(event: int) -> str:
         return "Patrol Helicopter"
 
 
-def generate_grid(
+# The column labels of the grid, A to ZZ
+GRID_LETTERS: Tuple[str, ...] = tuple(string.ascii_uppercase) + tuple(
+    a + b for a in string.ascii_uppercase for b in string.ascii_uppercase
+)
+
+
+@functools.lru_cache(maxsize=None)
+def get_grid_font(text_size: int) -> ImageFont.FreeTypeFont:
+    with resources.path(FONT_PATH, "PermanentMarker.ttf") as path:
+        return ImageFont.truetype(str(path), text_size)
+
+
+def generate_grid_mask(
     map_size: int,
     text_size: int = 20,
     text_padding: int = 5,
-    color: str = "black",
+    size: Union[int, None] = None,
+    box: Union[Tuple[int, int, int, int], None] = None,
 ) -> Image.Image:
-    img = Image.new("RGBA", (map_size, map_size), (0, 0, 0, 0))
+    """
+    :param size: The width and height of the mask in pixels, map_size by default
+    :param box: The left, top, right and bottom of the part of the mask to draw, all of it by default
+    :return Image: The grid lines and cell labels as an "L" mask, to paste a colour through
+    """
+    if size is None:
+        size = map_size
+    scale = size / map_size
+    if box is None:
+        box = (0, 0, size, size)
+    left, top, right, bottom = box
+
+    img = Image.new("L", (right - left, bottom - top), 0)
     d = ImageDraw.Draw(img)
-
-    with resources.path(FONT_PATH, "PermanentMarker.ttf") as path:
-        font = ImageFont.truetype(str(path), text_size)
-
-    letters = list(string.ascii_uppercase)
-    letters.extend(
-        a + b for a in string.ascii_uppercase for b in string.ascii_uppercase
-    )
+    # Labels are kept legible on small maps, even if they then crowd their cells
+    font_size = max(round(text_size * scale), MIN_GRID_TEXT_SIZE)
+    font = get_grid_font(font_size)
 
     num_cells = int(map_size / GRID_DIAMETER)
+    cells = [i * GRID_DIAMETER * scale for i in range(num_cells + 1)]
+    end = cells[-1]
+
+    # Each border is drawn once, as a line across the whole grid
+    for cell in cells:
+        d.line(((cell - left, -top), (cell - left, end - top)), fill=255)
+        d.line(((-left, cell - top), (end - left, cell - top)), fill=255)
+
+    # Labels are at most four characters, so those starting further than that from
+    # the box cannot reach into it
+    padding = text_padding * scale
+    columns = [
+        i for i in range(num_cells) if left - 4 * font_size < cells[i] + padding < right
+    ]
+    rows = [
+        j for j in range(num_cells) if top - 2 * font_size < cells[j] + padding < bottom
+    ]
+    for i in columns:
+        for j in rows:
+            text_pos = (cells[i] + padding - left, cells[j] + padding - top)
+            d.text(text_pos, GRID_LETTERS[i] + str(j), fill=255, font=font)
 
-    for i in range(num_cells):
-        for j in range(num_cells):
-            start = (i * GRID_DIAMETER, j * GRID_DIAMETER)
-            end = ((i + 1) * GRID_DIAMETER, (j + 1) * GRID_DIAMETER)
-            d.rectangle((start, end), outline=color)
+    return img
 
-            text = letters[i] + str(j)
-            text_pos = (start[0] + text_padding, start[1] + text_padding)
-            d.text(text_pos, text, fill=color, font=font)
 
+def generate_grid(
+    map_size: int,
+    text_size: int = 20,
+    text_padding: int = 5,
+    color: str = "black",
+) -> Image.Image:
+    img = Image.new("RGBA", (map_size, map_size), color)
+    img.putalpha(generate_grid_mask(map_size, text_size, text_padding))
     return img
 
 
 def convert_coordinates(coords: Tuple[int, int], map_size: int) -> Tuple[str, int]:
-    grids = list(string.ascii_uppercase)
-    grids.extend(a + b for a in string.ascii_uppercase for b in string.ascii_uppercase)
-
-    return grids[int(coords[0] // GRID_DIAMETER)], int(
+    return GRID_LETTERS[int(coords[0] // GRID_DIAMETER)], int(
         (map_size - coords[1]) // GRID_DIAMETER
     )
 
@@ -102,61 +178,106 @@ def format_coord(x: int, y: int, map_size: int) -> Tuple[int, int]:
 
 
 async def fetch_avatar_icon(steam_id: int, online: bool) -> Image.Image:
-    avatar = (
-        Image.open(
-            requests.get(
-                f"https://companion-rust.facepunch.com/api/avatar/{steam_id}",
-                stream=True,
-            ).raw
-        )
-        .resize((100, 100), Image.LANCZOS)
-        .convert("RGBA")
-    )
+    from ..rendering.avatars import AvatarService
 
-    return await avatar_processing(avatar, 5, online)
+    return await AvatarService.default().get_icon(steam_id, online)
 
 
-async def avatar_processing(
+@functools.lru_cache(maxsize=None)
+def get_circle_mask(size: Tuple[int, int]) -> Image.Image:
+    mask = Image.new("L", size, 0)
+    ImageDraw.Draw(mask).ellipse([0, 0, size[0], size[1]], fill=255)
+    return mask
+
+
+@functools.lru_cache(maxsize=None)
+def get_avatar_border(size: Tuple[int, int], player_online: bool) -> Image.Image:
+    border_image = Image.new("RGBA", size, (0, 0, 0, 0))
+    border_layer = Image.new(
+        "RGBA",
+        size,
+        PLAYER_MARKER_ONLINE_COLOR if player_online else PLAYER_MARKER_OFFLINE_COLOR,
+    )
+    border_image.paste(border_layer, mask=get_circle_mask(size))
+    return border_image
+
+
+def process_avatar(
     image: Image.Image, border_size: int, player_online: bool = False
 ) -> Image.Image:
+    """
+    Crops an avatar to a circle with a border showing whether the player is online
+    """
     size_with_border = (
         image.size[0] + 2 * border_size,
         image.size[1] + 2 * border_size,
     )
 
-    border_image = Image.new("RGBA", size_with_border, (0, 0, 0, 0))
-
-    mask = Image.new("L", size_with_border, 0)
-    draw = ImageDraw.Draw(mask)
-
-    draw.ellipse([0, 0, size_with_border[0], size_with_border[1]], fill=255)
-
-    border_layer = Image.new(
-        "RGBA",
-        size_with_border,
-        PLAYER_MARKER_ONLINE_COLOR if player_online else PLAYER_MARKER_OFFLINE_COLOR,
+    border_image = get_avatar_border(size_with_border, player_online).copy()
+    border_image.paste(
+        image, (border_size, border_size), get_circle_mask(tuple(image.size))
     )
-    border_image.paste(border_layer, mask=mask)
 
-    image_mask = Image.new("L", image.size, 0)
-    draw = ImageDraw.Draw(image_mask)
-    draw.ellipse([0, 0, image.size[0], image.size[1]], fill=255)
+    return border_image
 
-    border_image.paste(image, (border_size, border_size), image_mask)
 
-    return border_image
+async def avatar_processing(
+    image: Image.Image, border_size: int, player_online: bool = False
+) -> Image.Image:
+    return process_avatar(image, border_size, player_online)
+
+
+MARKER_ICONS = {
+    2: "explosion.png",
+    4: "chinook.png",
+    5: "cargo.png",
+    6: "crate.png",
+    8: "patrol.png",
+}
+MONUMENT_ICONS = {
+    "ferryterminal": "Ferry_Terminal.svg",
+    "train_tunnel_display_name": "Tunnel_Entrance.svg",
+    "train_tunnel_link_display_name": "Tunnel_Entrance.svg",
+    "apartmentcomplex": "Apartments_Complex.svg",
+    "harbor_display_name": "Harbor.svg",
+    "harbor_2_display_name": "Harbor.svg",
+    "large_fishing_village_display_name": "Fishing_Village.svg",
+    "fishing_village_display_name": "Fishing_Village.svg",
+    "AbandonedMilitaryBase": "Military_Base.svg",
+    "power_plant_display_name": "Powerplant.svg",
+    "missile_silo_monument": "Missile_Silo.svg",
+    "outpost": "Outpost.svg",
+    "bandit_camp": "Bandit_Camp.svg",
+    "stables_a": "Stables.svg",
+    "stables_b": "Stables.svg",
+    "mining_quarry_stone_display_name": "Stone_Quarry.svg",
+    "mining_quarry_sulfur_display_name": "Sulfur_Quarry.svg",
+    "mining_quarry_hqm_display_name": "HQM_Quarry.svg",
+    "satellite_dish_display_name": "Satellite_Dish.svg",
+    "dome_monument_name": "Dome.svg",
+    "junkyard_display_name": "Junkyard.svg",
+    "sewer_display_name": "Sewer_Branch.svg",
+    "oil_rig_small": "Oil_Rig_Small.svg",
+    "large_oil_rig": "Oil_Rig_Large.svg",
+    "lighthouse_display_name": "Lighthouse.svg",
+    "mining_outpost_display_name": "Mining_Outpost.svg",
+    "supermarket": "Supermarket.svg",
+    "arctic_base_a": "Arctic_Research_Base.svg",
+    "arctic_base_b": "Arctic_Research_Base.svg",
+    "launchsite": "Launch_Site.svg",
+    "water_treatment_plant_display_name": "Water_Treatment.svg",
+    "excavator": "Excavator.svg",
+    "train_yard_display_name": "Trainyard.svg",
+    "airfield_display_name": "Airfield.svg",
+    "military_tunnels_display_name": "Military_Tunnels.svg",
+    "gas_station": "Gas_Station.svg",
+    "jungle_ziggurat": "Jungle_Ziggurat.svg",
+    "radtown": "Radtown.svg",
+}
 
 
 def convert_marker(marker_type: int, angle) -> Image.Image:
-    name_to_file = {
-        2: "explosion.png",
-        4: "chinook.png",
-        5: "cargo.png",
-        6: "crate.png",
-        8: "patrol.png",
-    }
-
-    with resources.path(ICONS_PATH, name_to_file[marker_type]) as path:
+    with resources.path(ICONS_PATH, MARKER_ICONS[marker_type]) as path:
         icon = Image.open(path).convert("RGBA")
 
     if marker_type == 6:
@@ -182,77 +303,35 @@ def convert_marker(marker_type: int, angle) -> Image.Image:
     return icon
 
 
-def convert_monument_to_image(name: str) -> Image.Image:
-    name_to_file = {
-        "ferryterminal": "Ferry_Terminal.svg",
-        "train_tunnel_display_name": "Tunnel_Entrance.svg",
-        "train_tunnel_link_display_name": "Tunnel_Entrance.svg",
-        "apartmentcomplex": "Apartments_Complex.svg",
-        "harbor_display_name": "Harbor.svg",
-        "harbor_2_display_name": "Harbor.svg",
-        "large_fishing_village_display_name": "Fishing_Village.svg",
-        "fishing_village_display_name": "Fishing_Village.svg",
-        "AbandonedMilitaryBase": "Military_Base.svg",
-        "power_plant_display_name": "Powerplant.svg",
-        "missile_silo_monument": "Missile_Silo.svg",
-        "outpost": "Outpost.svg",
-        "bandit_camp": "Bandit_Camp.svg",
-        "stables_a": "Stables.svg",
-        "stables_b": "Stables.svg",
-        "mining_quarry_stone_display_name": "Stone_Quarry.svg",
-        "mining_quarry_sulfur_display_name": "Sulfur_Quarry.svg",
-        "mining_quarry_hqm_display_name": "HQM_Quarry.svg",
-        "satellite_dish_display_name": "Satellite_Dish.svg",
-        "dome_monument_name": "Dome.svg",
-        "junkyard_display_name": "Junkyard.svg",
-        "sewer_display_name": "Sewer_Branch.svg",
-        "oil_rig_small": "Oil_Rig_Small.svg",
-        "large_oil_rig": "Oil_Rig_Large.svg",
-        "lighthouse_display_name": "Lighthouse.svg",
-        "mining_outpost_display_name": "Mining_Outpost.svg",
-        "supermarket": "Supermarket.svg",
-        "arctic_base_a": "Arctic_Research_Base.svg",
-        "arctic_base_b": "Arctic_Research_Base.svg",
-        "launchsite": "Launch_Site.svg",
-        "water_treatment_plant_display_name": "Water_Treatment.svg",
-        "excavator": "Excavator.svg",
-        "train_yard_display_name": "Trainyard.svg",
-        "airfield_display_name": "Airfield.svg",
-        "military_tunnels_display_name": "Military_Tunnels.svg",
-        "gas_station": "Gas_Station.svg",
-        "jungle_ziggurat": "Jungle_Ziggurat.svg",
-        "radtown": "Radtown.svg",
-    }
-
-    if name in name_to_file:
-        file_name = name_to_file[name]
-        with resources.path(ICONS_PATH, file_name) as path:
-            if file_name.endswith(".png"):
-                return Image.open(path).convert("RGBA")
-            elif file_name.endswith(".svg"):
-                return svg_to_pil(path, (150, 150))
-            else:
-                logging.getLogger("rustplus.py").info(
-                    f"{name} - Has no icon, report this as an issue"
-                )
-                with resources.path(ICONS_PATH, "icon.png") as path:
-                    return Image.open(path).convert("RGBA")
-
-    elif "swamp" in name:
-        with resources.path(ICONS_PATH, "Swamp.svg") as path:
-            return svg_to_pil(path, (150, 150))
-    elif "underwater_lab" in name:
+def get_monument_icon_file(name: str) -> str:
+    """
+    :return str: The file in rustplus.icons drawn for the monument token
+    """
+    if name in MONUMENT_ICONS:
+        return MONUMENT_ICONS[name]
+
+    if "swamp" in name:
+        return "Swamp.svg"
+
+    if "underwater_lab" in name:
         # Same story with swamp, no rust+ specific token so prefab name is sent instead
-        with resources.path(ICONS_PATH, "Underwater_Lab.svg") as path:
+        return "Underwater_Lab.svg"
+
+    logging.getLogger("rustplus.py").info(
+        f"{name} - Has no icon, report this as an issue"
+    )
+    return "icon.png"
+
+
+def load_icon(file_name: str) -> Image.Image:
+    with resources.path(ICONS_PATH, file_name) as path:
+        if file_name.endswith(".svg"):
             return svg_to_pil(path, (150, 150))
-    else:
-        logging.getLogger("rustplus.py").info(
-            f"{name} - Has no icon, report this as an issue"
-        )
-        with resources.path(ICONS_PATH, "icon.png") as path:
-            icon = Image.open(path).convert("RGBA")
+        return Image.open(path).convert("RGBA")
 
-    return icon
+
+def convert_monument_to_image(name: str) -> Image.Image:
+    return load_icon(get_monument_icon_file(name))
 
 
 def svg_to_pil(filepath: str | Path, size: tuple[int, int]) -> Image.Image:
@@ -0,0 +1,82 @@
+import asyncio
+
+import pytest
+
+from rustplus.remote.websocket import DispatchOptions, Dispatcher, OverflowPolicy
+
+
+async def _fill(dispatcher: Dispatcher, handle) -> asyncio.Event:
+    """
+    Blocks the only worker, then fills its queue with messages 0 and 1
+    """
+    release = asyncio.Event()
+
+    async def block() -> None:
+        await release.wait()
+
+    await dispatcher.submit(block)
+    # Let the worker take the blocking message off the queue
+    await asyncio.sleep(0)
+    assert await dispatcher.submit(handle, 0)
+    assert await dispatcher.submit(handle, 1)
+    return release
+
+
+def _dispatcher(overflow_policy: str) -> Dispatcher:
+    return Dispatcher(DispatchOptions(1, 2, overflow_policy))
+
+
+@pytest.mark.parametrize(
+    "overflow_policy, queued, handled",
+    [
+        (OverflowPolicy.DROP_OLDEST, True, [1, 2]),
+        (OverflowPolicy.DROP_NEWEST, False, [0, 1]),
+    ],
+)
+def test_a_full_queue_drops_by_its_policy(overflow_policy, queued, handled):
+    async def test():
+        dispatcher = _dispatcher(overflow_policy)
+        result = []
+
+        async def handle(message: int) -> None:
+            result.append(message)
+
+        release = await _fill(dispatcher, handle)
+
+        assert await dispatcher.submit(handle, 2) is queued
+        assert dispatcher.dropped_messages == 1
+        assert dispatcher.queue_depth == 2
+
+        release.set()
+        await dispatcher.join()
+        await dispatcher.stop()
+
+        assert result == handled
+        assert dispatcher.failed_messages == 0
+
+    asyncio.run(test())
+
+
+def test_a_full_queue_blocks_until_there_is_room():
+    async def test():
+        dispatcher = _dispatcher(OverflowPolicy.BLOCK)
+        result = []
+
+        async def handle(message: int) -> None:
+            result.append(message)
+
+        release = await _fill(dispatcher, handle)
+        submit = asyncio.ensure_future(dispatcher.submit(handle, 2))
+        await asyncio.sleep(0.01)
+        assert not submit.done()
+
+        release.set()
+        assert await asyncio.wait_for(submit, 1)
+        await dispatcher.join()
+        await dispatcher.stop()
+
+        assert result == [0, 1, 2]
+        assert dispatcher.dropped_messages == 0
+        assert dispatcher.max_queue_depth == 2
+
+    asyncio.run(test())
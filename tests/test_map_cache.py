@@ -0,0 +1,52 @@
+import pytest
+from PIL import Image
+
+from rustplus.remote.cache import MapCache
+from rustplus.remote.rustplus_proto import AppMap
+
+KEY = "0" * 40
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return MapCache(tmp_path)
+
+
+def test_base_image_round_trip(cache):
+    image = Image.new("RGB", (30, 20), "red")
+    cache.set_base_image(KEY, image, 30)
+
+    cached = cache.get_base_image(KEY, 30)
+
+    assert cached.size == (30, 20)
+    assert cached.getpixel((0, 0)) == (255, 0, 0)
+    assert cache.get_base_image(KEY) is None
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        b"",
+        b"\x01\x00",
+        MapCache.IMAGE_HEADER.pack(30, 20) + b"\x00" * 10,
+        MapCache.IMAGE_HEADER.pack(30, 20) + b"\x00" * (30 * 20 * 3 + 1),
+    ],
+    ids=["empty", "truncated header", "truncated pixels", "too long"],
+)
+def test_corrupt_base_image_is_a_miss_and_removed(cache, data):
+    path = cache.directory / (KEY + MapCache.IMAGE_SUFFIX)
+    path.write_bytes(data)
+
+    assert cache.get_base_image(KEY) is None
+    assert not path.exists()
+
+
+def test_empty_map_is_a_miss_and_removed(cache):
+    cache.set_map(KEY, AppMap(width=10, height=10, jpg_image=b"jpg"))
+    assert cache.get_map(KEY).jpg_image == b"jpg"
+
+    path = cache.directory / (KEY + MapCache.MAP_SUFFIX)
+    path.write_bytes(b"")
+
+    assert cache.get_map(KEY) is None
+    assert not path.exists()
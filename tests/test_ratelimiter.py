@@ -0,0 +1,97 @@
+import asyncio
+
+import pytest
+
+from rustplus import ServerDetails
+from rustplus.remote.ratelimiter import RateLimiter, RequestPriority
+
+PLAYER_A = ServerDetails("1.1.1.1", 28082, 1, 1)
+PLAYER_B = ServerDetails("1.1.1.1", 28082, 2, 2)
+
+
+def _limiter(current: float, tokens_per_second: float) -> RateLimiter:
+    limiter = RateLimiter(background_reserve=0)
+    for player in (PLAYER_A, PLAYER_B):
+        limiter.add_socket(player, current, 5, 1, tokens_per_second)
+    return limiter
+
+
+def test_waiters_are_served_by_priority_then_in_order():
+    async def test():
+        limiter = _limiter(0, 100)
+        served = []
+
+        async def acquire(name: str, priority: int) -> None:
+            await limiter.acquire(PLAYER_A, 1, priority)
+            served.append(name)
+
+        # Started from the lowest priority up, so order alone would serve them backwards
+        await asyncio.gather(
+            acquire("background", RequestPriority.BACKGROUND),
+            acquire("normal 1", RequestPriority.NORMAL),
+            acquire("normal 2", RequestPriority.NORMAL),
+            acquire("interactive", RequestPriority.INTERACTIVE),
+        )
+
+        assert served == ["interactive", "normal 1", "normal 2", "background"]
+
+    asyncio.run(test())
+
+
+def test_a_cancelled_waiter_leaves_the_queue():
+    async def test():
+        limiter = _limiter(0, 0.001)
+        bucket = limiter.socket_buckets[PLAYER_A]
+
+        waiting = asyncio.ensure_future(limiter.acquire(PLAYER_A, 5))
+        await asyncio.sleep(0)
+        assert bucket.has_waiters()
+
+        waiting.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiting
+
+        assert not bucket.has_waiters()
+        assert bucket.timer is None
+
+    asyncio.run(test())
+
+
+def test_a_waiter_cancelled_once_granted_gives_its_tokens_back():
+    async def test():
+        limiter = _limiter(0, 0.001)
+        buckets = limiter._get_buckets(PLAYER_A)
+        socket_bucket, server_bucket = buckets
+
+        waiting = asyncio.ensure_future(limiter.acquire(PLAYER_A, 2))
+        await asyncio.sleep(0)
+
+        # Grant the tokens, then cancel before the waiting task resumes to take them
+        socket_bucket.current = 2
+        server_tokens = server_bucket.current
+        limiter._wake(buckets)
+        assert socket_bucket.current == pytest.approx(0, abs=0.01)
+        waiting.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiting
+
+        assert socket_bucket.current == pytest.approx(2, abs=0.01)
+        assert server_bucket.current == pytest.approx(server_tokens, abs=0.1)
+
+    asyncio.run(test())
+
+
+def test_a_player_out_of_tokens_does_not_hold_up_another_on_the_server():
+    async def test():
+        limiter = _limiter(5, 0.001)
+        await limiter.acquire(PLAYER_A, 5)
+
+        waiting = asyncio.ensure_future(limiter.acquire(PLAYER_A, 5))
+        await asyncio.sleep(0)
+
+        await asyncio.wait_for(limiter.acquire(PLAYER_B, 5), 1)
+        assert not waiting.done()
+
+        waiting.cancel()
+
+    asyncio.run(test())
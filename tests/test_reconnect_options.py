@@ -0,0 +1,29 @@
+from rustplus import ReconnectOptions
+
+
+def test_delay_grows_up_to_the_maximum():
+    options = ReconnectOptions(initial_delay=1, max_delay=60, multiplier=2, jitter=0)
+
+    assert [options.get_delay(attempt) for attempt in range(7)] == [
+        1,
+        2,
+        4,
+        8,
+        16,
+        32,
+        60,
+    ]
+
+
+def test_delay_after_a_very_long_outage_does_not_overflow():
+    options = ReconnectOptions(initial_delay=0.1, max_delay=30, multiplier=1.5)
+
+    for attempt in (1_000, 10**6, 10**12):
+        assert 15 <= options.get_delay(attempt) <= 45
+
+
+def test_jitter_stays_within_its_fraction():
+    options = ReconnectOptions(initial_delay=10, max_delay=10, jitter=0.25)
+
+    for _ in range(100):
+        assert 7.5 <= options.get_delay(3) <= 12.5
@@ -0,0 +1,56 @@
+from rustplus import ServerDetails
+from rustplus.remote.cache import ResponseCache
+
+
+def test_servers_sharing_a_cache_do_not_see_each_others_responses():
+    cache = ResponseCache()
+    server_a = ServerDetails("1.1.1.1", 28082, 1, 1)
+    server_b = ServerDetails("2.2.2.2", 28082, 1, 1)
+
+    cache.set(server_a, "get_info", "info a")
+
+    assert cache.get(server_a, "get_info") == "info a"
+    assert cache.get(server_b, "get_info") is None
+    assert not cache.is_fresh(server_b, "get_info")
+    assert not cache.has(server_b, "get_info")
+
+    cache.set(server_b, "get_info", "info b")
+    cache.invalidate(server_a, "get_info")
+
+    assert cache.get(server_a, "get_info") is None
+    assert cache.get(server_b, "get_info") == "info b"
+
+
+def test_players_on_one_server_do_not_share_team_info():
+    cache = ResponseCache()
+    player_a = ServerDetails("1.1.1.1", 28082, 1, 1)
+    player_b = ServerDetails("1.1.1.1", 28082, 2, 2)
+
+    cache.set(player_a, "get_team_info", "team a")
+
+    assert cache.get(player_b, "get_team_info") is None
+
+
+def test_invalidation_only_touches_the_given_server():
+    cache = ResponseCache()
+    server_a = ServerDetails("1.1.1.1", 28082, 1, 1)
+    server_b = ServerDetails("2.2.2.2", 28082, 1, 1)
+
+    for server in (server_a, server_b):
+        cache.set(server, "get_team_info", "team")
+        cache.set(server, "get_info", "info")
+
+    cache.invalidate(server_a, "get_team_info")
+
+    assert not cache.has(server_a, "get_team_info")
+    assert cache.has(server_a, "get_info")
+    assert cache.has(server_b, "get_team_info")
+
+    cache.invalidate(server_b)
+
+    assert not cache.has(server_b, "get_info")
+    assert cache.get(server_a, "get_info") == "info"
+
+    cache.invalidate(method="get_info")
+
+    assert cache.entries == {}
@@ -0,0 +1,74 @@
+import asyncio
+
+import pytest
+
+from rustplus.exceptions import WorkerError
+from rustplus.pool.sharded_pool import ShardedRustSocketPool, _Shard
+from rustplus.remote.mock_server import MockRustServer
+from rustplus.structs import RustEntityInfo, RustMarker
+
+
+async def _run_with_pool(test):
+    async with MockRustServer() as server:
+        server_details = server.get_server_details()
+        pool = ShardedRustSocketPool(workers=1)
+        pool.add_socket(server_details)
+
+        assert await pool.start() == {server_details: True}
+        try:
+            await test(pool.get_socket(server_details))
+        finally:
+            await asyncio.wait_for(pool.stop(), 30)
+
+
+def test_get_markers_through_a_sharded_pool():
+    async def test(socket):
+        markers = await socket.get_markers()
+
+        assert len(markers) == 3
+        assert all(isinstance(marker, RustMarker) for marker in markers)
+        assert [marker.type for marker in markers] == [1, 3, 5]
+
+        # The shard is still answering after the first result
+        assert len(await socket.get_markers()) == 3
+
+    asyncio.run(_run_with_pool(test))
+
+
+def test_get_entity_info_through_a_sharded_pool():
+    async def test(socket):
+        info = await socket.get_entity_info(1)
+
+        assert isinstance(info, RustEntityInfo)
+        assert info.type == 1
+        assert info.value is False
+
+    asyncio.run(_run_with_pool(test))
+
+
+class _UnreadableConnection:
+    def recv(self):
+        raise TypeError("Enum.__new__() takes 1 positional argument but 2 were given")
+
+
+def test_unreadable_message_fails_pending_calls():
+    async def test():
+        loop = asyncio.get_running_loop()
+        pool = ShardedRustSocketPool(workers=1)
+        pool._loop = loop
+
+        shard = _Shard(0, [])
+        shard.connection = _UnreadableConnection()
+        shard.connected = loop.create_future()
+        shard.stopped = loop.create_future()
+        pending = shard.pending[0] = loop.create_future()
+
+        await loop.run_in_executor(None, pool._read, shard)
+        await asyncio.wait_for(shard.stopped, 1)
+
+        with pytest.raises(WorkerError):
+            await pending
+        with pytest.raises(WorkerError):
+            await pool._call(shard, 0, "get_time", (), {})
+
+    asyncio.run(test())
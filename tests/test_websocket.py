@@ -0,0 +1,35 @@
+import asyncio
+
+from rustplus import ServerDetails
+from rustplus.remote.rustplus_proto import AppEmpty, AppRequest
+from rustplus.remote.websocket import RustWebsocket
+
+
+class _DroppingConnection:
+    """
+    Sends the message, then loses the connection before the response arrives
+    """
+
+    def __init__(self, ws: RustWebsocket) -> None:
+        self.ws = ws
+
+    async def send(self, data) -> None:
+        self.ws._fail_pending_responses("Connection Interrupted")
+
+
+def test_a_dropped_connection_is_not_reported_as_a_timeout():
+    async def test():
+        ws = RustWebsocket(
+            ServerDetails("1.1.1.1", 28082, 1, 1), None, False, False, False
+        )
+        ws.connection = _DroppingConnection(ws)
+
+        request = AppRequest(seq=1, get_time=AppEmpty())
+        response = await ws.send_and_get(request, timeout=5)
+
+        assert response is not None
+        assert response.response.error.error == "Connection Interrupted"
+        assert ws.timed_out_requests == 0
+        assert ws.responses == {}
+
+    asyncio.run(test())